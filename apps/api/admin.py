@@ -4,7 +4,7 @@ from .models import Dog, Breed
 
 @admin.register(Dog)
 class DogAdmin(admin.ModelAdmin):
-    pass
+    list_select_related = ('breed',)
 
 
 @admin.register(Breed)
@@ -0,0 +1,333 @@
+from functools import wraps
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .catalog import breed_catalog
+from .conditional import (aqueryset_window_state, conditional_response, dog_etag, has_preconditions, list_etag,
+                          set_validators, window_state)
+from .controllers import BreedDetail, DogDetail, DogList, get_breed_validators, with_dog_count, with_dog_counts
+from .fieldsets import get_representation
+from .models import Dog, Breed
+from .pagination import BreedPagination
+from .representations import dog_representation, breed_representation
+from .response_cache import cache_response, response_cache
+from .search import get_search_limit, get_search_query, is_search_requested, ranked_search
+from .serializers import DogSerializer, BreedSerializer
+from .stats import build_breed_stats, has_unknown_breeds, stat_rows
+from .streaming import astreaming_response, is_stream_requested
+
+
+def run_in_thread(method):
+    """
+    Асинхронный обработчик, выполняющий синхронный метод контроллера в потоке.
+
+    Так обрабатываются операции в транзакции — условные запросы с блокировкой строки
+    и массовые операции: асинхронный ORM Django не поддерживает `transaction.atomic`.
+    """
+    @wraps(method)
+    async def handler(self, request, *args, **kwargs):
+        return await sync_to_async(method)(self, request, *args, **kwargs)
+    return handler
+
+
+async def aget_dog_validators(dog_id, version, updated_at, breed_id):
+    breed = await breed_catalog.aget(breed_id)
+    return dog_etag(dog_id, version, updated_at, breed), max(updated_at, breed.updated_at)
+
+
+async def get_breed_context(data):
+    """
+    Контекст DogSerializer с породой из тела запроса, полученной из кэша справочника
+    без блокирующих запросов в цикле событий.
+    """
+    try:
+        pk = int(str(data['breed_id']))
+    except (KeyError, TypeError, ValueError):
+        return {'breeds': {}}
+    return {'breeds': {pk: await breed_catalog.aget(pk)}}
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с асинхронным dispatch для работы под ASGI.
+
+    DRF вызывает обработчики синхронно, поэтому под ASGI Django выполняет каждый запрос к APIView
+    в потоке. Здесь обработчики — корутины, и запрос обрабатывается в цикле событий;
+    синхронные обработчики (например, OPTIONS) тоже поддерживаются.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """
+        `initial` без блокирующих запросов в цикле событий.
+
+        Пользователь сессии загружается асинхронно через `request.auser()`. Basic-аутентификация
+        проверяет пароль запросом к базе, поэтому с заголовком Authorization проверки выполняются в потоке.
+        """
+        if 'HTTP_AUTHORIZATION' in request.META:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            return
+        django_request = request._request
+        if hasattr(django_request, 'auser'):
+            django_request.user = await django_request.auser()
+        self.initial(request, *args, **kwargs)
+
+
+class AsyncDogDetail(AsyncAPIView, DogDetail):
+    """
+    Асинхронный вариант DogDetail.
+
+    Чтение, безусловные PUT и DELETE выполняются асинхронным ORM. Условные запросы на изменение
+    блокируют строку в транзакции, а PATCH выполняется одним `UPDATE ... RETURNING` через raw(),
+    у которого нет асинхронного API, — эти операции выполняет код DogDetail в потоке.
+    """
+
+    @cache_response('dog:{dog_id}', 'dog:*', 'breeds')
+    async def get(self, request, dog_id, format=None):
+        """
+        Получение собаки по её ID.
+        """
+        representation = get_representation(request, dog_representation)
+        queryset = representation.values(Dog.objects.filter(pk=dog_id), 'version', 'updated_at', 'breed_id')
+        row = await queryset.afirst()
+        if row is None:
+            raise NotFound()
+        etag, last_modified = await aget_dog_validators(dog_id, *row[-3:])
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(Response(await representation.ato_representation(row)), etag, last_modified)
+
+    async def put(self, request, dog_id, format=None):
+        """
+        Обновление данных собаки по её ID.
+        """
+        if has_preconditions(request):
+            return await sync_to_async(super().put)(request, dog_id, format)
+        dog = await aget_object_or_404(Dog, pk=dog_id)
+        serializer = DogSerializer(dog, data=request.data, context=await get_breed_context(request.data))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        for attr, value in serializer.validated_data.items():
+            setattr(dog, attr, value)
+        await dog.asave()
+        validators = await aget_dog_validators(dog.pk, dog.version, dog.updated_at, dog.breed_id)
+        return set_validators(Response(serializer.data), *validators)
+
+    patch = run_in_thread(DogDetail.patch)
+
+    async def delete(self, request, dog_id, format=None):
+        """
+        Удаление собаки по её ID.
+        """
+        if has_preconditions(request):
+            return await sync_to_async(super().delete)(request, dog_id, format)
+        deleted, _ = await Dog.objects.filter(pk=dog_id).adelete()
+        if not deleted:
+            raise NotFound()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncDogList(AsyncAPIView, DogList):
+    """
+    Асинхронный вариант DogList. Массовые операции выполняются кодом DogList в потоке.
+    """
+
+    @cache_response('dogs', 'breeds', unless=is_stream_requested)
+    async def get(self, request):
+        """
+        Получение списка собак постранично или, с `?stream=1`, потоком через асинхронный курсор.
+        """
+        queryset = self.get_queryset(request)
+        representation = get_representation(request, dog_representation)
+        if is_search_requested(request):
+            return await self.asearch(request, queryset, representation)
+        paginator = self.get_paginator(request)
+        if is_stream_requested(request):
+            return astreaming_response(request, queryset.order_by(*paginator.ordering), representation)
+
+        catalog_state = (await breed_catalog.asnapshot()).state
+        if has_preconditions(request):
+            state = await aqueryset_window_state(paginator.get_window(queryset, request))
+            response = conditional_response(request, list_etag(request, 'dogs', state, catalog_state))
+            if response is not None:
+                return response
+
+        key_start = len(representation.columns)
+        queryset = representation.values(queryset, *paginator.key_columns, 'updated_at')
+        data = await paginator.apaginate_queryset(queryset, request, transform=representation.amany,
+                                                  key_start=key_start)
+        state = window_state(paginator.window, key_start + len(paginator.key_columns) - 1, -1)
+        response = paginator.get_paginated_response(data)
+        return set_validators(response, list_etag(request, 'dogs', state, catalog_state))
+
+    async def asearch(self, request, queryset, representation=dog_representation):
+        """
+        Поиск собак по имени (`?q=`), как в DogList.search.
+        """
+        queryset = ranked_search(queryset, 'name', get_search_query(request), get_search_limit(request))
+        rows = [row async for row in representation.values(queryset, 'id', 'updated_at')]
+        state = window_state(rows, -2, -1)
+        etag = list_etag(request, 'dogs', state, (await breed_catalog.asnapshot()).state)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(Response(await representation.amany(rows)), etag)
+
+    async def post(self, request):
+        """
+        Создание новой собаки или массовое создание собак.
+        """
+        if isinstance(request.data, list):
+            return await sync_to_async(self.bulk_create)(request)
+
+        serializer = DogSerializer(data=request.data, context=await get_breed_context(request.data))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.instance = await Dog.objects.acreate(**serializer.validated_data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    patch = run_in_thread(DogList.patch)
+    delete = run_in_thread(DogList.delete)
+
+
+class AsyncBreedDetail(AsyncAPIView):
+    """
+    Асинхронный вариант BreedDetail. Изменение и удаление пород выполняются кодом BreedDetail в потоке:
+    они редки, а условные запросы блокируют строку в транзакции.
+    """
+    get_object = BreedDetail.get_object
+    check_preconditions = BreedDetail.check_preconditions
+    retrieve = BreedDetail.retrieve
+
+    @cache_response('breed:{breed_id}', 'breeds')
+    async def get(self, request, breed_id):
+        """
+        Получение породы по её ID.
+        """
+        snapshot = await breed_catalog.asnapshot()
+        breed = snapshot.by_id.get(int(breed_id))
+        if breed is not None:
+            counted = await Breed.objects.filter(pk=breed.pk).values_list('dog_count', 'updated_at').afirst()
+            if counted is None:
+                raise NotFound()
+            breed, data = with_dog_count(breed, snapshot.representation_by_id[breed.pk], *counted)
+        else:
+            breed = await Breed.objects.filter(pk=breed_id).afirst()
+            if breed is None:
+                raise NotFound()
+            data = BreedSerializer(breed).data
+
+        etag, last_modified = get_breed_validators(breed)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(Response(data), etag, last_modified)
+
+    put = run_in_thread(BreedDetail.update)
+    patch = run_in_thread(BreedDetail.partial_update)
+    delete = run_in_thread(BreedDetail.destroy)
+
+
+class AsyncBreedList(AsyncAPIView):
+    """
+    Асинхронный вариант BreedList.
+    """
+
+    @cache_response('breeds', 'breed-counts')
+    async def get(self, request):
+        """
+        Получение списка пород постранично, по названию, или поиск по названию с `?q=`.
+        """
+        if is_search_requested(request):
+            queryset = ranked_search(Breed.objects.all(), 'name', get_search_query(request), get_search_limit(request))
+            rows = [row async for row in breed_representation.values(queryset, 'updated_at')]
+            etag = list_etag(request, 'breeds', window_state(rows, breed_representation.columns.index('id'), -1))
+            response = conditional_response(request, etag)
+            if response is not None:
+                return response
+            return set_validators(Response(await breed_representation.amany(rows)), etag)
+
+        paginator = BreedPagination()
+        snapshot = await breed_catalog.asnapshot()
+        data = paginator.paginate_sequence(snapshot.representations, request, snapshot.index_after)
+        if data is not None:
+            ids = [item['id'] for item in data]
+            counts = Breed.objects.filter(pk__in=ids).order_by().values_list('pk', 'dog_count')
+            data = with_dog_counts(data, {pk: dog_count async for pk, dog_count in counts})
+        else:
+            queryset = breed_representation.values(Breed.objects.all())
+            data = await paginator.apaginate_queryset(queryset, request, transform=breed_representation.amany)
+
+        etag = list_etag(request, 'breeds', snapshot.state, [item['dog_count'] for item in data])
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(paginator.get_paginated_response(data), etag)
+
+    async def post(self, request):
+        """
+        Создание новой породы.
+        """
+        serializer = BreedSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.instance = await Breed.objects.acreate(**serializer.validated_data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AsyncBreedStatsList(AsyncAPIView):
+    """
+    Асинхронный вариант BreedStatsList.
+    """
+
+    @cache_response('dogs', 'breeds')
+    async def get(self, request):
+        """
+        Статистика всех пород из сводной таблицы.
+        """
+        rows = [row async for row in stat_rows()]
+        snapshot = await breed_catalog.asnapshot()
+        if has_unknown_breeds(snapshot, rows):
+            snapshot = await breed_catalog.asnapshot(refresh=True)
+        etag = list_etag(request, 'breed-stats', rows, snapshot.state)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(Response(build_breed_stats(snapshot, rows)), etag)
+
+
+class AsyncResponseCacheStats(AsyncAPIView):
+    """
+    Асинхронный вариант ResponseCacheStats.
+    """
+
+    async def get(self, request):
+        return Response(await sync_to_async(response_cache.stats)())
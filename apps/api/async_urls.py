@@ -0,0 +1,14 @@
+from django.urls import path
+
+from .async_controllers import (AsyncDogList, AsyncDogDetail, AsyncBreedList, AsyncBreedDetail, AsyncBreedStatsList,
+                                AsyncResponseCacheStats)
+
+# Те же маршруты и имена, что в urls.py, но с асинхронными контроллерами (API_ASYNC_VIEWS=True).
+urlpatterns = [
+    path('api/dogs/', AsyncDogList.as_view(), name='dog-list'),
+    path('api/dogs/<int:dog_id>', AsyncDogDetail.as_view(), name='dog-detail'),
+    path('api/breeds/', AsyncBreedList.as_view(), name='breed-list'),
+    path('api/breeds/stats/', AsyncBreedStatsList.as_view(), name='breed-stats'),
+    path('api/breeds/<int:breed_id>', AsyncBreedDetail.as_view(), name='breed-detail'),
+    path('api/cache/stats/', AsyncResponseCacheStats.as_view(), name='response-cache-stats'),
+]
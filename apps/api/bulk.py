@@ -0,0 +1,275 @@
+import copy
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+from rest_framework.pagination import _positive_int
+
+from .catalog import breed_catalog
+from .filters import filter_dogs
+from .models import Dog
+from .serializers import DogSerializer
+from .updates import versioned_update
+
+MODE_ATOMIC = 'atomic'
+MODE_BEST_EFFORT = 'best_effort'
+BULK_MODES = (MODE_ATOMIC, MODE_BEST_EFFORT)
+
+
+class BulkOptions:
+    """
+    Параметры массовой операции из строки запроса.
+
+    Атрибуты:
+        mode (str): 'atomic' — все элементы в одной транзакции, любая ошибка отменяет операцию;
+        'best_effort' — корректные элементы сохраняются, ошибочные возвращаются в отчёте.
+        batch_size (int): Размер пачки для одного INSERT/UPDATE.
+    """
+
+    def __init__(self, request):
+        self.mode = request.query_params.get('mode', MODE_ATOMIC)
+        if self.mode not in BULK_MODES:
+            raise serializers.ValidationError({'mode': [f'Допустимые значения: {", ".join(BULK_MODES)}.']})
+        try:
+            self.batch_size = _positive_int(
+                request.query_params['batch_size'],
+                strict=True,
+                cutoff=settings.API_BULK_MAX_BATCH_SIZE
+            )
+        except (KeyError, ValueError):
+            self.batch_size = settings.API_BULK_BATCH_SIZE
+
+    @property
+    def atomic(self):
+        return self.mode == MODE_ATOMIC
+
+
+def check_bulk_size(items):
+    if len(items) > settings.API_BULK_MAX_ITEMS:
+        raise serializers.ValidationError(
+            {'non_field_errors': [f'Не больше {settings.API_BULK_MAX_ITEMS} элементов за запрос.']}
+        )
+
+
+def get_breeds(items):
+    """
+    Породы для проверки `breed_id` всех элементов сразу.
+
+    Берутся из кэша справочника; если в запросе встретился неизвестный ID, справочник
+    перечитывается один раз на весь запрос, а не для каждого элемента.
+    """
+    snapshot = breed_catalog.snapshot()
+    requested = set()
+    for item in items:
+        try:
+            requested.add(int(str(item['breed_id'])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    if not requested.issubset(snapshot.by_id):
+        snapshot = breed_catalog.snapshot(refresh=True)
+    return {pk: copy.copy(breed) for pk, breed in snapshot.by_id.items()}
+
+
+def validate_items(serializer, items):
+    """
+    Проверяет каждый элемент отдельно.
+
+    Возвращает список пар (индекс, validated_data) для корректных элементов
+    и список ошибок вида {'index': ..., 'errors': {...}}.
+    """
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': serializers.as_serializer_error(exc)})
+    return valid, errors
+
+
+def bulk_create_dogs(items, options):
+    """
+    Массовое создание собак.
+
+    Все `breed_id` проверяются по одному снимку справочника пород, строки вставляются через
+    `bulk_create` пачками по `options.batch_size`. В режиме 'atomic' при любой ошибке ничего
+    не создаётся; в режиме 'best_effort' каждая пачка пишется в своей точке сохранения, и ошибка
+    базы отклоняет только её элементы.
+
+    Возвращает список созданных объектов и список ошибок по элементам.
+    """
+    check_bulk_size(items)
+    serializer = DogSerializer(context={'breeds': get_breeds(items)})
+    valid, errors = validate_items(serializer, items)
+    if options.atomic and errors:
+        return [], errors
+
+    if options.atomic:
+        # Один вызов с batch_size: INSERT по пачкам, но счётчики собак пород меняются один раз на запрос.
+        return Dog.objects.bulk_create([Dog(**attrs) for _, attrs in valid], batch_size=options.batch_size), errors
+
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(valid), options.batch_size):
+            batch = valid[start:start + options.batch_size]
+            dogs = [Dog(**attrs) for _, attrs in batch]
+            try:
+                with transaction.atomic():
+                    created.extend(Dog.objects.bulk_create(dogs))
+            except DatabaseError as exc:
+                errors.extend({'index': index, 'errors': {'non_field_errors': [str(exc)]}} for index, _ in batch)
+
+    errors.sort(key=lambda error: error['index'])
+    return created, errors
+
+
+def chunked(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def parse_id(value):
+    """
+    Целочисленный ID или None, если значение им не является.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def group_changes(serializer, items):
+    """
+    Группирует элементы массового обновления по одинаковым изменениям.
+
+    Каждый уникальный набор изменений проверяется сериализатором один раз. Возвращает список групп
+    `(validated_data, [(индекс, id), ...])` и список ошибок по элементам.
+    """
+    writable = {name for name, field in serializer.fields.items() if not field.read_only}
+    validated = {}
+    groups = {}
+    errors = []
+    seen = set()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Ожидался объект.']}})
+            continue
+        changes = dict(item)
+        pk = parse_id(changes.pop('id', None))
+        if pk is None:
+            errors.append({'index': index, 'errors': {'id': ['Требуется целочисленный id.']}})
+            continue
+        if pk in seen:
+            errors.append({'index': index, 'errors': {'id': ['Повторяющийся id.']}})
+            continue
+        seen.add(pk)
+        unknown = sorted(set(changes) - writable)
+        if unknown or not changes:
+            detail = {name: ['Неизвестное поле.'] for name in unknown} or {'non_field_errors': ['Нет изменений.']}
+            errors.append({'index': index, 'errors': detail})
+            continue
+
+        key = json.dumps(changes, sort_keys=True, default=str)
+        if key not in validated:
+            try:
+                validated[key] = (serializer.run_validation(changes), None)
+            except serializers.ValidationError as exc:
+                validated[key] = (None, serializers.as_serializer_error(exc))
+        attrs, detail = validated[key]
+        if detail is not None:
+            errors.append({'index': index, 'errors': detail})
+            continue
+        groups.setdefault(key, (attrs, []))[1].append((index, pk))
+
+    return list(groups.values()), errors
+
+
+def bulk_update_dogs(items, options):
+    """
+    Массовое частичное обновление собак.
+
+    Элементы — объекты с `id` и изменяемыми полями. Одинаковые изменения объединяются в один
+    `UPDATE ... WHERE id IN (...)` на пачку из `options.batch_size` ID, поэтому число запросов
+    зависит от числа различных изменений, а не от числа строк. Несуществующие ID выявляются
+    одним SELECT на пачку и попадают в ошибки.
+
+    Вместо списка можно передать `{"ids": [...], "changes": {...}}` — одно изменение для всех ID.
+
+    Возвращает число обновлённых строк и список ошибок по элементам.
+    """
+    if isinstance(items, dict):
+        ids, changes = items.get('ids'), items.get('changes')
+        if not isinstance(ids, list) or not isinstance(changes, dict):
+            raise serializers.ValidationError({'non_field_errors': ['Ожидался список или {"ids": [...], "changes": {...}}.']})
+        items = [{**changes, 'id': pk} for pk in ids]
+    if not isinstance(items, list):
+        raise serializers.ValidationError({'non_field_errors': ['Ожидался список.']})
+    check_bulk_size(items)
+    serializer = DogSerializer(partial=True, context={'breeds': get_breeds(items)})
+    groups, errors = group_changes(serializer, items)
+
+    requested = [pk for _, members in groups for _, pk in members]
+    existing = set()
+    for chunk in chunked(requested, options.batch_size):
+        existing.update(Dog.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    for _, members in groups:
+        errors.extend({'index': index, 'errors': {'id': ['Собака не найдена.']}}
+                      for index, pk in members if pk not in existing)
+    errors.sort(key=lambda error: error['index'])
+    if options.atomic and errors:
+        return 0, errors
+
+    updated = 0
+    with transaction.atomic():
+        for attrs, members in groups:
+            pks = [pk for _, pk in members if pk in existing]
+            if options.atomic:
+                updated += sum(versioned_update(Dog.objects.filter(pk__in=chunk), attrs)
+                               for chunk in chunked(pks, options.batch_size))
+                continue
+            try:
+                with transaction.atomic():
+                    updated += sum(versioned_update(Dog.objects.filter(pk__in=chunk), attrs)
+                                   for chunk in chunked(pks, options.batch_size))
+            except DatabaseError as exc:
+                errors.extend({'index': index, 'errors': {'non_field_errors': [str(exc)]}}
+                              for index, pk in members if pk in existing)
+
+    errors.sort(key=lambda error: error['index'])
+    return updated, errors
+
+
+def bulk_delete_dogs(data, options):
+    """
+    Массовое удаление собак по списку ID (`{"ids": [...]}`) или по фильтру (`{"filter": {...}}`).
+
+    Удаление по фильтру — один запрос, по списку — один запрос на пачку ID; на PostgreSQL это DELETE,
+    возвращающий число удалённых собак по породам для их счётчиков (см. `DogQuerySet.delete`). На других
+    бэкендах удаляемые строки сначала блокируются и читаются их ID и породы. Возвращает число удалённых строк.
+    """
+    if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+        raise serializers.ValidationError({'non_field_errors': ['Укажите либо "ids", либо "filter".']})
+
+    if 'filter' in data:
+        if not isinstance(data['filter'], dict) or not data['filter']:
+            raise serializers.ValidationError({'filter': ['Требуется непустой объект фильтра.']})
+        deleted, _ = filter_dogs(Dog.objects.all(), data['filter']).delete()
+        return deleted
+
+    ids = data['ids']
+    if not isinstance(ids, list) or not ids:
+        raise serializers.ValidationError({'ids': ['Требуется непустой список ID.']})
+    check_bulk_size(ids)
+    pks = [parse_id(value) for value in ids]
+    if None in pks:
+        raise serializers.ValidationError({'ids': ['Все ID должны быть целыми числами.']})
+
+    deleted = 0
+    with transaction.atomic():
+        for chunk in chunked(pks, options.batch_size):
+            deleted += Dog.objects.filter(pk__in=chunk).delete()[0]
+    return deleted
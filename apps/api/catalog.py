@@ -0,0 +1,198 @@
+import copy
+import threading
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Breed
+
+
+class BreedCatalogSnapshot:
+    """
+    Неизменяемый снимок справочника пород.
+
+    Атрибуты:
+        breeds (list): Породы в порядке (name, id), как их возвращает база.
+        representations (list): Представления пород в том же порядке, без числа собак (см. NestedBreedSerializer).
+        by_id (dict): Порода по её ID.
+        representation_by_id (dict): Представление породы по её ID.
+        state (tuple): Число пород, сумма их ID и время последнего изменения — для ETag списков.
+        pending (tuple): Ожидающие коммита сбросы (см. `BreedCatalog.pending_invalidations`), если снимок
+        прочитан в транзакции, изменившей породы; такой снимок содержит её незакоммиченные изменения.
+    """
+
+    def __init__(self, breeds, representations, shared_version):
+        self.breeds = breeds
+        self.representations = representations
+        self.shared_version = shared_version
+        self.pending = ()
+        self.by_id = {breed.pk: breed for breed in breeds}
+        self.representation_by_id = {breed.pk: data for breed, data in zip(breeds, representations)}
+        self.index_by_id = {breed.pk: index for index, breed in enumerate(breeds)}
+        self.state = (
+            len(breeds),
+            sum(self.by_id),
+            max((breed.updated_at for breed in breeds), default=None)
+        )
+
+    def index_after(self, position):
+        """
+        Индекс, с которого начинается страница после курсора `(name, id)`,
+        или None, если породы из курсора уже нет в снимке.
+        """
+        name, pk = position
+        index = self.index_by_id.get(pk)
+        if index is None or self.breeds[index].name != name:
+            return None
+        return index + 1
+
+
+class BreedCatalog:
+    """
+    Кэш справочника пород в памяти процесса.
+
+    Таблица пород маленькая и почти не меняется, поэтому она целиком загружается одним запросом
+    и отдаётся из памяти до первого изменения. Сигналы `post_save`/`post_delete` модели Breed
+    сбрасывают снимок. Если задан `API_BREED_CACHE_ALIAS`, номер версии справочника хранится
+    в общем кэше Django (например, Redis), и другие воркеры перечитывают таблицу, увидев новую версию.
+    """
+    version_key = 'api:breed-catalog:version'
+
+    def __init__(self):
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared_cache(self):
+        alias = settings.API_BREED_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def get_shared_version(self):
+        cache = self.shared_cache
+        if cache is None:
+            return None
+        version = cache.get(self.version_key)
+        if version is None:
+            # Начальное значение уникально, чтобы версия, вытесненная из кэша, не совпала со старой.
+            cache.add(self.version_key, time.time_ns(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def snapshot(self, refresh=False):
+        """
+        Актуальный снимок справочника; при необходимости перечитывает таблицу.
+        """
+        shared_version = self.get_shared_version()
+        snapshot = self._snapshot
+        if (snapshot is not None and not refresh and snapshot.shared_version == shared_version
+                and self.is_pending(snapshot.pending)):
+            return snapshot
+        return self.load(shared_version)
+
+    async def asnapshot(self, refresh=False):
+        """
+        Асинхронный вариант `snapshot`. Готовый снимок процесса возвращается сразу; чтение таблицы
+        и общего кэша — блокирующие операции, они выполняются в потоке.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not refresh and self.shared_cache is None and not snapshot.pending:
+            return snapshot
+        return await sync_to_async(self.snapshot)(refresh)
+
+    def load(self, shared_version):
+        from .serializers import NestedBreedSerializer
+
+        generation = self._generation
+        # Снимок живёт до следующего изменения пород, поэтому читается с основной базы, а не с реплики,
+        # которая может ещё не получить это изменение.
+        breeds = list(Breed.objects.using(DEFAULT_DB_ALIAS).order_by('name', 'id'))
+        representations = [dict(NestedBreedSerializer(breed).data) for breed in breeds]
+        snapshot = BreedCatalogSnapshot(breeds, representations, shared_version)
+        snapshot.pending = self.pending_invalidations()
+        with self._lock:
+            # Снимок, прочитанный до сброса, мог устареть — сохраняем его только если сброса не было.
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def get(self, pk):
+        """
+        Копия породы по ID или None. Неизвестный ID один раз перечитывает таблицу:
+        порода могла быть создана другим процессом.
+        """
+        breed = self.snapshot().by_id.get(pk)
+        if breed is None:
+            breed = self.snapshot(refresh=True).by_id.get(pk)
+        return copy.copy(breed) if breed is not None else None
+
+    async def aget(self, pk):
+        breed = (await self.asnapshot()).by_id.get(pk)
+        if breed is None:
+            breed = (await self.asnapshot(refresh=True)).by_id.get(pk)
+        return copy.copy(breed) if breed is not None else None
+
+    def representations(self):
+        return self.snapshot().representation_by_id
+
+    def invalidate(self):
+        """
+        Сбрасывает снимок процесса сразу, а после коммита транзакции ещё раз
+        и увеличивает общую версию, чтобы другие воркеры не закэшировали незакоммиченные данные.
+        Снимок, прочитанный в транзакции до коммита, не отдаётся после её отката и другим потокам
+        (см. `pending_invalidations`).
+        """
+        self.clear()
+        # Отдельный объект на каждый сброс: по нему снимок узнаёт, что сброс откатили.
+        transaction.on_commit(partial(self.publish))
+
+    def pending_invalidations(self):
+        """
+        Сбросы, ожидающие коммита транзакции основной базы в этом потоке.
+
+        Снимок, прочитанный в такой транзакции, содержит её незакоммиченные изменения. После коммита его
+        сбрасывает `publish`, а при откате транзакции или точки сохранения Django удаляет ожидающие
+        обработчики `on_commit` — хуков отката в Django нет, поэтому снимок актуален, пока ждут коммита
+        все сбросы, которые ждали его при чтении снимка. Если формат очереди `on_commit` в этой версии
+        Django неизвестен, снимок, прочитанный в транзакции, не переиспользуется.
+        """
+        connection = connections[DEFAULT_DB_ALIAS]
+        if not connection.in_atomic_block:
+            return ()
+        pending = []
+        for entry in connection.run_on_commit:
+            # Внутренний формат Django: (savepoint_ids, func) до 4.2, (savepoint_ids, func, robust) начиная с неё.
+            func = entry[1] if isinstance(entry, tuple) and len(entry) >= 2 else None
+            if func is None:
+                # Формат неизвестен: снимок считается прочитанным в изменившей породы транзакции
+                # и не переиспользуется — лишнее чтение таблицы вместо риска отдать откаченные данные.
+                return (object(),)
+            if isinstance(func, partial) and func.func == self.publish:
+                pending.append(func)
+        return tuple(pending)
+
+    def is_pending(self, invalidations):
+        pending = {id(func) for func in self.pending_invalidations()} if invalidations else ()
+        return all(id(func) in pending for func in invalidations)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def publish(self):
+        self.clear()
+        cache = self.shared_cache
+        if cache is None:
+            return
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), timeout=None)
+
+
+breed_catalog = BreedCatalog()
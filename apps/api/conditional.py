@@ -0,0 +1,88 @@
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+PRECONDITION_HEADERS = ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_UNMODIFIED_SINCE', 'HTTP_IF_MODIFIED_SINCE')
+
+WINDOW_AGGREGATES = {'count': Count('pk'), 'id_sum': Sum('pk'), 'updated_at': Max('updated_at')}
+
+
+def make_etag(*parts):
+    """
+    Строгий ETag из значений, однозначно определяющих представление ресурса.
+    """
+    digest = hashlib.sha1(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def dog_etag(dog_id, version, updated_at, breed):
+    """
+    ETag собаки; учитывает версию породы, так как она входит в представление собаки.
+    """
+    return make_etag('dog', dog_id, version, updated_at, breed.pk, breed.version, breed.updated_at)
+
+
+def breed_etag(breed):
+    return make_etag('breed', breed.pk, breed.version, breed.updated_at, breed.dog_count)
+
+
+def list_etag(request, name, window_state, *tokens):
+    """
+    ETag страницы списка.
+
+    Учитывает строку запроса, формат ответа и состояние окна выборки: число строк, сумму их ID
+    и время последнего изменения. Окно — строки страницы и одна следующая, поэтому удаление,
+    добавление или изменение любой строки страницы меняет ETag.
+    """
+    return make_etag(name, request.get_full_path(), request.accepted_renderer.format, window_state, *tokens)
+
+
+def window_state(rows, id_index, updated_index):
+    """
+    Состояние окна выборки по уже прочитанным строкам.
+    """
+    return len(rows), sum(row[id_index] for row in rows), max((row[updated_index] for row in rows), default=None)
+
+
+def queryset_window_state(window):
+    """
+    Состояние окна выборки одним агрегирующим запросом, без чтения самих строк. Совпадает с `window_state`
+    по тем же строкам: PostgreSQL возвращает сумму bigint как numeric, поэтому она приводится к int.
+    """
+    return aggregated_window_state(window.aggregate(**WINDOW_AGGREGATES))
+
+
+async def aqueryset_window_state(window):
+    return aggregated_window_state(await window.aaggregate(**WINDOW_AGGREGATES))
+
+
+def aggregated_window_state(state):
+    return state['count'], int(state['id_sum'] or 0), state['updated_at']
+
+
+def has_preconditions(request):
+    return any(header in request.META for header in PRECONDITION_HEADERS)
+
+
+def conditional_response(request, etag, last_modified=None):
+    """
+    Ответ 304 или 412 по заголовкам If-Match/If-None-Match/If-Modified-Since/If-Unmodified-Since
+    либо None, если запрос нужно обработать полностью.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Добавляет в ответ заголовки ETag и Last-Modified.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -1,99 +1,377 @@
+import copy
+from contextlib import nullcontext
+
 from rest_framework import status, viewsets
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
-from .models import Dog, Breed
+from .bulk import BulkOptions, bulk_create_dogs, bulk_delete_dogs, bulk_update_dogs
+from .catalog import breed_catalog
+from .conditional import (breed_etag, conditional_response, dog_etag, has_preconditions, list_etag,
+                          queryset_window_state, set_validators, window_state)
+from .fieldsets import get_representation
+from .filters import filter_dogs, get_dog_ordering
+from .models import Dog, Breed, count_moves
+from .pagination import DogPagination, BreedPagination
+from .renderers import NDJSONRenderer
+from .representations import dog_representation, breed_representation
+from .response_cache import cache_response, response_cache
+from .search import get_search_limit, get_search_query, is_search_requested, ranked_search
 from .serializers import DogSerializer, BreedSerializer
+from .stats import build_breed_stats, has_unknown_breeds, stat_rows
+from .streaming import is_stream_requested, streaming_response
+from .updates import update_returning
+
+
+def get_dog_validators(dog_id, version, updated_at, breed_id):
+    """
+    ETag и Last-Modified собаки; версия породы берётся из кэша справочника.
+    """
+    breed = breed_catalog.get(breed_id)
+    return dog_etag(dog_id, version, updated_at, breed), max(updated_at, breed.updated_at)
+
+
+def get_breed_validators(breed):
+    return breed_etag(breed), breed.updated_at
+
+
+def with_dog_count(breed, data, dog_count, updated_at):
+    """
+    Порода из кэша справочника с числом собак и временем изменения, прочитанными из базы:
+    счётчик меняется при каждой записи собак и в кэше не хранится.
+    """
+    breed = copy.copy(breed)
+    breed.dog_count, breed.updated_at = dog_count, updated_at
+    return breed, {**data, 'dog_count': dog_count}
+
+
+def with_dog_counts(data, counts):
+    return [{**item, 'dog_count': counts.get(item['id'], 0)} for item in data]
 
 
 class DogDetail(APIView):
     """
     Получение, обновление или удаление экземпляра собаки.
+
+    Ответы содержат ETag и Last-Modified; поддерживаются условные запросы If-None-Match/If-Modified-Since
+    для GET и If-Match/If-Unmodified-Since для PUT, PATCH и DELETE.
     """
 
+    @cache_response('dog:{dog_id}', 'dog:*', 'breeds')
     def get(self, request, dog_id, format=None):
         """
         Получение собаки по её ID.
         """
-        dog = get_object_or_404(Dog, pk=dog_id)
-        serializer = DogSerializer(dog)
-        return Response(serializer.data)
+        return self.retrieve(request, dog_id)
+
+    def retrieve(self, request, dog_id):
+        representation = get_representation(request, dog_representation)
+        row = representation.values(Dog.objects.filter(pk=dog_id), 'version', 'updated_at', 'breed_id').first()
+        if row is None:
+            raise NotFound()
+        etag, last_modified = get_dog_validators(dog_id, *row[-3:])
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(Response(representation.to_representation(row)), etag, last_modified)
+
+    def get_object(self, request, dog_id):
+        """
+        Собака для изменения. При условном запросе строка блокируется до конца транзакции,
+        чтобы проверка ETag и запись не разошлись.
+        """
+        queryset = Dog.objects.select_for_update() if has_preconditions(request) else Dog.objects.all()
+        return get_object_or_404(queryset, pk=dog_id)
+
+    def check_preconditions(self, request, dog):
+        if not has_preconditions(request):
+            return None
+        return conditional_response(request, *get_dog_validators(dog.pk, dog.version, dog.updated_at, dog.breed_id))
 
+    @transaction.atomic
     def put(self, request, dog_id, format=None):
         """
         Обновление данных собаки по её ID.
         """
-        dog = get_object_or_404(Dog, pk=dog_id)
+        dog = self.get_object(request, dog_id)
+        response = self.check_preconditions(request, dog)
+        if response is not None:
+            return response
         serializer = DogSerializer(dog, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            validators = get_dog_validators(dog.pk, dog.version, dog.updated_at, dog.breed_id)
+            return set_validators(Response(serializer.data), *validators)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch(self, request, dog_id, format=None):
+        """
+        Частичное обновление собаки по её ID.
+
+        Проверяются только переданные поля, запись — один `UPDATE ... RETURNING` без предварительного
+        SELECT. Условный запрос (If-Match) сначала блокирует строку и сверяет ETag; смена породы
+        блокирует строку, чтобы перенести собаку в счётчиках пород.
+        """
+        serializer = DogSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.validated_data:
+            return self.retrieve(request, dog_id)
+
+        conditional = has_preconditions(request)
+        moves_breed = 'breed' in serializer.validated_data
+        with transaction.atomic() if conditional or moves_breed else nullcontext():
+            if conditional:
+                response = self.check_preconditions(request, self.get_object(request, dog_id))
+                if response is not None:
+                    return response
+            if moves_breed:
+                # UPDATE ... RETURNING возвращает только новую породу; старая читается с блокировкой строки.
+                rows = Dog.objects.filter(pk=dog_id).lock_breeds()
+            dog = update_returning(Dog, dog_id, serializer.validated_data)
+            if dog is not None and moves_breed:
+                Breed.objects.adjust_dog_counts(count_moves([old for _, old in rows], dog.breed_id))
+        if dog is None:
+            raise NotFound()
+        validators = get_dog_validators(dog.pk, dog.version, dog.updated_at, dog.breed_id)
+        return set_validators(Response(dog_representation.from_instance(dog)), *validators)
+
+    @transaction.atomic
     def delete(self, request, dog_id, format=None):
         """
         Удаление собаки по её ID.
         """
-        dog = get_object_or_404(Dog, pk=dog_id)
+        dog = self.get_object(request, dog_id)
+        response = self.check_preconditions(request, dog)
+        if response is not None:
+            return response
         dog.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class DogList(APIView):
     """
-    Получение списка всех собак или создание новой собаки.
+    Получение списка всех собак, создание новой собаки, массовые создание, обновление и удаление.
     """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    # Параметры строки запроса списка, которые не являются фильтрами.
+    control_params = ('cursor', 'limit', 'ordering', 'stream', 'format', 'q', 'fields', 'expand')
 
+    def get_queryset(self, request):
+        """
+        Собаки, отобранные фильтрами из строки запроса (см. `filters.DOG_FILTERS`).
+        """
+        params = {name: value for name, value in request.query_params.items() if name not in self.control_params}
+        return filter_dogs(Dog.objects.all(), params)
+
+    def get_paginator(self, request):
+        return DogPagination(ordering=get_dog_ordering(request.query_params.get('ordering')))
+
+    @cache_response('dogs', 'breeds', unless=is_stream_requested)
     def get(self, request):
         """
-        Получение списка всех собак.
+        Получение списка собак постранично.
+
+        Поддерживаются фильтры `breed_id`, `breed__size`, `name`, `gender`, `color`, `age`, `age__gte`, `age__lte`
+        и сортировка `?ordering=` по `id`, `name`, `age`, `breed_id` (по умолчанию — по возрастанию ID).
+        С параметром `?stream=1` или заголовком `Accept: application/x-ndjson` отдаёт всю выборку потоком.
+        На условный запрос с совпадающим ETag отвечает 304 по одному агрегирующему запросу, не читая строк.
+        `?fields=` и `?expand=` ограничивают поля ответа и читаемые из базы колонки (см. `fieldsets`).
         """
-        dogs = Dog.objects.all()
-        serializer = DogSerializer(dogs, many=True)
-        return Response(serializer.data)
+        queryset = self.get_queryset(request)
+        representation = get_representation(request, dog_representation)
+        if is_search_requested(request):
+            return self.search(request, queryset, representation)
+        paginator = self.get_paginator(request)
+        if is_stream_requested(request):
+            return streaming_response(request, queryset.order_by(*paginator.ordering), representation)
+
+        catalog_state = breed_catalog.snapshot().state
+        if has_preconditions(request):
+            state = queryset_window_state(paginator.get_window(queryset, request))
+            response = conditional_response(request, list_etag(request, 'dogs', state, catalog_state))
+            if response is not None:
+                return response
+
+        # За колонками представления идут колонки ключа сортировки (последняя — id) и updated_at:
+        # в выбранных полях их может не быть, а курсор и ETag строятся по ним.
+        key_start = len(representation.columns)
+        queryset = representation.values(queryset, *paginator.key_columns, 'updated_at')
+        data = paginator.paginate_queryset(queryset, request, transform=representation.many, key_start=key_start)
+        state = window_state(paginator.window, key_start + len(paginator.key_columns) - 1, -1)
+        response = paginator.get_paginated_response(data)
+        return set_validators(response, list_etag(request, 'dogs', state, catalog_state))
+
+    def search(self, request, queryset, representation=dog_representation):
+        """
+        Поиск собак по имени (`?q=`) среди отобранных фильтрами.
+
+        Возвращает не больше `?limit=` лучших совпадений без пагинации; `ordering` не применяется.
+        """
+        queryset = ranked_search(queryset, 'name', get_search_query(request), get_search_limit(request))
+        rows = list(representation.values(queryset, 'id', 'updated_at'))
+        state = window_state(rows, -2, -1)
+        etag = list_etag(request, 'dogs', state, breed_catalog.snapshot().state)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(Response(representation.many(rows)), etag)
 
     def post(self, request):
         """
-        Создание новой собаки.
+        Создание новой собаки или, если тело запроса — список, массовое создание собак.
         """
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+
         serializer = DogSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_create(self, request):
+        """
+        Массовое создание собак.
+
+        В режиме `?mode=atomic` (по умолчанию) возвращает 201 со списком созданных собак
+        или 400 со списком ошибок по элементам. В режиме `?mode=best_effort` возвращает отчёт
+        `{"created": [...], "errors": [{"index": ..., "errors": {...}}]}` со статусом 201, если ошибок нет,
+        207 при частичном успехе и 400, если не создано ни одной собаки.
+        """
+        options = BulkOptions(request)
+        created, errors = bulk_create_dogs(request.data, options)
+        data = DogSerializer(created, many=True).data
+
+        if options.atomic:
+            if errors:
+                indexed = {error['index']: error['errors'] for error in errors}
+                return Response([indexed.get(index, {}) for index in range(len(request.data))],
+                                status=status.HTTP_400_BAD_REQUEST)
+            return Response(data, status=status.HTTP_201_CREATED)
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': data, 'errors': errors}, status=response_status)
+
+    def patch(self, request):
+        """
+        Массовое частичное обновление собак.
+
+        Тело — список объектов с `id` и изменяемыми полями или `{"ids": [...], "changes": {...}}`.
+        Ответ `{"updated": n, "errors": [...]}`; режимы и статусы те же, что у массового создания.
+        """
+        options = BulkOptions(request)
+        updated, errors = bulk_update_dogs(request.data, options)
+        if not errors:
+            response_status = status.HTTP_200_OK
+        elif updated:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'updated': updated, 'errors': errors}, status=response_status)
+
+    def delete(self, request):
+        """
+        Массовое удаление собак по списку ID или по фильтру. Ответ `{"deleted": n}`.
+        """
+        deleted = bulk_delete_dogs(request.data, BulkOptions(request))
+        return Response({'deleted': deleted})
+
 
 class BreedDetail(viewsets.ViewSet):
     """
     Получение, обновление или удаление породы собак.
+
+    Условные запросы обрабатываются так же, как в DogDetail.
     """
 
+    def get_object(self, request, breed_id):
+        queryset = Breed.objects.select_for_update() if has_preconditions(request) else Breed.objects.all()
+        return get_object_or_404(queryset, pk=breed_id)
+
+    def check_preconditions(self, request, breed):
+        if not has_preconditions(request):
+            return None
+        return conditional_response(request, *get_breed_validators(breed))
+
+    @transaction.atomic
     def update(self, request, breed_id):
         """
         Обновление данных породы по её ID.
         """
-        breed = get_object_or_404(Breed, pk=breed_id)
+        breed = self.get_object(request, breed_id)
+        response = self.check_preconditions(request, breed)
+        if response is not None:
+            return response
         serializer = BreedSerializer(breed, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return set_validators(Response(serializer.data), *get_breed_validators(breed))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def partial_update(self, request, breed_id):
+        """
+        Частичное обновление породы по её ID одним `UPDATE ... RETURNING`.
+        """
+        serializer = BreedSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.validated_data:
+            return self.retrieve(request, breed_id)
+
+        conditional = has_preconditions(request)
+        with transaction.atomic() if conditional else nullcontext():
+            if conditional:
+                response = self.check_preconditions(request, self.get_object(request, breed_id))
+                if response is not None:
+                    return response
+            breed = update_returning(Breed, breed_id, serializer.validated_data)
+        if breed is None:
+            raise NotFound()
+        return set_validators(Response(breed_representation.from_instance(breed)), *get_breed_validators(breed))
+
+    @cache_response('breed:{breed_id}', 'breeds')
     def retrieve(self, request, breed_id):
         """
         Получение породы по её ID.
         """
-        breed = get_object_or_404(Breed, pk=breed_id)
-        serializer = BreedSerializer(breed)
-        return Response(serializer.data)
+        snapshot = breed_catalog.snapshot()
+        breed = snapshot.by_id.get(int(breed_id))
+        if breed is not None:
+            counted = Breed.objects.filter(pk=breed.pk).values_list('dog_count', 'updated_at').first()
+            if counted is None:
+                raise NotFound()
+            breed, data = with_dog_count(breed, snapshot.representation_by_id[breed.pk], *counted)
+        else:
+            breed = Breed.objects.filter(pk=breed_id).first()
+            if breed is None:
+                raise NotFound()
+            data = BreedSerializer(breed).data
+
+        etag, last_modified = get_breed_validators(breed)
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(Response(data), etag, last_modified)
 
+    @transaction.atomic
     def destroy(self, request, breed_id):
         """
         Удаление породы по её ID.
         """
-        breed = get_object_or_404(Breed, pk=breed_id)
+        breed = self.get_object(request, breed_id)
+        response = self.check_preconditions(request, breed)
+        if response is not None:
+            return response
         breed.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -103,13 +381,45 @@ class BreedList(viewsets.ViewSet):
     Получение списка всех пород или создание новой породы.
     """
 
+    @cache_response('breeds', 'breed-counts')
     def list(self, request):
         """
-        Получение списка всех пород.
+        Получение списка пород постранично, по названию.
+
+        Страницы отдаются из кэша справочника пород, из базы читаются только числа собак пород страницы;
+        целиком страница читается из базы лишь после курсора, указывающего на уже удалённую породу.
+        С параметром `?q=` выполняет поиск по названию.
+        """
+        if is_search_requested(request):
+            return self.search(request)
+        paginator = BreedPagination()
+        snapshot = breed_catalog.snapshot()
+        data = paginator.paginate_sequence(snapshot.representations, request, snapshot.index_after)
+        if data is not None:
+            ids = [item['id'] for item in data]
+            counts = Breed.objects.filter(pk__in=ids).order_by().values_list('pk', 'dog_count')
+            data = with_dog_counts(data, dict(counts))
+        else:
+            queryset = breed_representation.values(Breed.objects.all())
+            data = paginator.paginate_queryset(queryset, request, transform=breed_representation.many)
+
+        etag = list_etag(request, 'breeds', snapshot.state, [item['dog_count'] for item in data])
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(paginator.get_paginated_response(data), etag)
+
+    def search(self, request):
+        """
+        Поиск пород по названию: не больше `?limit=` лучших совпадений без пагинации.
         """
-        breeds = Breed.objects.all()
-        serializer = BreedSerializer(breeds, many=True)
-        return Response(serializer.data)
+        queryset = ranked_search(Breed.objects.all(), 'name', get_search_query(request), get_search_limit(request))
+        rows = list(breed_representation.values(queryset, 'updated_at'))
+        etag = list_etag(request, 'breeds', window_state(rows, breed_representation.columns.index('id'), -1))
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(Response(breed_representation.many(rows)), etag)
 
     def create(self, request):
         """
@@ -120,3 +430,34 @@ class BreedList(viewsets.ViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BreedStatsList(APIView):
+    """
+    Статистика по породам: число собак, распределение по возрасту, полу и цвету.
+    """
+
+    @cache_response('dogs', 'breeds')
+    def get(self, request):
+        """
+        Статистика всех пород из сводной таблицы, которую поддерживают триггеры на таблице собак.
+        Стоимость запроса зависит от числа пород и различных значений признаков, а не от числа собак.
+        """
+        rows = list(stat_rows())
+        snapshot = breed_catalog.snapshot()
+        if has_unknown_breeds(snapshot, rows):
+            snapshot = breed_catalog.snapshot(refresh=True)
+        etag = list_etag(request, 'breed-stats', rows, snapshot.state)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+        return set_validators(Response(build_breed_stats(snapshot, rows)), etag)
+
+
+class ResponseCacheStats(APIView):
+    """
+    Счётчики попаданий и промахов общего кэша ответов.
+    """
+
+    def get(self, request):
+        return Response(response_cache.stats())
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.views import exception_handler as default_exception_handler
+
+from .catalog import breed_catalog
+from .models import MissingBreedError
+
+
+def exception_handler(exc, context):
+    """
+    Обработчик исключений DRF (`EXCEPTION_HANDLER`).
+
+    MissingBreedError — запись собак в породу, удалённую после проверки `breed_id` по кэшу справочника
+    пород: ответ 400 с той же ошибкой поля `breed_id`, что и для неизвестной породы, а снимок справочника
+    процесса сбрасывается, чтобы следующие запросы не проходили проверку по удалённой породе.
+    """
+    if isinstance(exc, MissingBreedError):
+        breed_catalog.clear()
+        message = PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+        exc = serializers.ValidationError({'breed_id': [message.format(pk_value=pk) for pk in exc.breed_ids]})
+    return default_exception_handler(exc, context)
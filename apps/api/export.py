@@ -0,0 +1,98 @@
+import csv
+import io
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F
+
+from .models import Dog
+from .renderers import render_line
+
+# Колонки выгрузки: поля собаки и поля её породы с префиксом breed_.
+DOG_FIELDS = ('id', 'name', 'age', 'gender', 'color', 'favorite_food', 'favorite_toy', 'breed_id')
+BREED_FIELDS = ('name', 'size', 'friendliness', 'trainability', 'shedding_amount', 'exercise_needs')
+EXPORT_COLUMNS = DOG_FIELDS + tuple(f'breed_{field}' for field in BREED_FIELDS)
+
+FORMATS = ('csv', 'ndjson')
+
+
+def export_queryset(using=DEFAULT_DB_ALIAS):
+    """
+    Собаки, соединённые с породами, в порядке ID с колонками `EXPORT_COLUMNS`. Запрос не выполняется.
+    """
+    breed_columns = {f'breed_{field}': F(f'breed__{field}') for field in BREED_FIELDS}
+    return Dog.objects.using(using).order_by('id').values(*DOG_FIELDS, **breed_columns)
+
+
+def copy_statement(queryset, export_format):
+    """
+    Команда `COPY (запрос) TO STDOUT` и её параметры.
+
+    NDJSON строит сам PostgreSQL через `row_to_json`. Формат CSV с разделителем и кавычкой из управляющих
+    символов, которых нет в JSON (row_to_json экранирует их как \\u0001), отдаёт строки JSON как есть:
+    текстовый формат COPY удвоил бы в них обратные косые черты.
+    """
+    sql, params = queryset.query.sql_with_params()
+    if export_format == 'csv':
+        return f'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)', params
+    return (f"COPY (SELECT row_to_json(export) FROM ({sql}) export) TO STDOUT "
+            f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"), params
+
+
+def copy_to(queryset, export_format, out):
+    """
+    Выгрузка через `COPY ... TO STDOUT` (только PostgreSQL): данные пишутся в `out` блоками
+    по мере получения от сервера, строки не создаются в Python. Возвращает число строк.
+    """
+    statement, params = copy_statement(queryset, export_format)
+    with connections[queryset.db].cursor() as cursor:
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2: параметры подставляются на клиенте, copy_expert их не принимает.
+            cursor.copy_expert(cursor.mogrify(statement, params).decode(), out)
+        else:
+            with cursor.copy(statement, params) as copy:
+                for data in copy:
+                    out.write(data)
+        return cursor.rowcount
+
+
+def write_chunked(queryset, export_format, out, chunk_size):
+    """
+    Выгрузка для бэкендов без COPY: строки читаются курсором (на PostgreSQL — серверным)
+    пачками по `chunk_size`, и каждая пачка сразу пишется в `out`. Возвращает число строк.
+    """
+    rows = 0
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(EXPORT_COLUMNS)
+        iterator = queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size)
+        while chunk := list(islice(iterator, chunk_size)):
+            writer.writerows(chunk)
+            out.write(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+            rows += len(chunk)
+        out.write(buffer.getvalue().encode())
+        return rows
+
+    iterator = queryset.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        out.write(b''.join(render_line(row) for row in chunk))
+        rows += len(chunk)
+    return rows
+
+
+def supports_copy(connection):
+    return connection.vendor == 'postgresql'
+
+
+def export_dogs(out, export_format='csv', using=DEFAULT_DB_ALIAS, chunk_size=2000):
+    """
+    Пишет собак с полями пород в бинарный поток `out` в формате CSV (с заголовком) или NDJSON
+    и возвращает число строк. На PostgreSQL используется COPY, на других бэкендах — чтение пачками.
+    """
+    queryset = export_queryset(using)
+    if supports_copy(connections[using]):
+        return copy_to(queryset, export_format, out)
+    return write_chunked(queryset, export_format, out, chunk_size)
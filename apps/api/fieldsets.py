@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def split_param(request, name):
+    return [item.strip() for item in request.query_params.get(name, '').split(',') if item.strip()]
+
+
+def get_fieldset(request, representation):
+    """
+    Набор полей из параметров `?fields=` и `?expand=` или None, если нужны все поля.
+
+    `?fields=id,name` оставляет в ответе только перечисленные поля; поле вложенного объекта задаётся
+    через точку (`breed.name`). Вложенный объект с `?fields=` возвращается, только если он указан в `fields`
+    или в `?expand=` (`?expand=breed` — целиком). Без `?fields=` отдаются все поля, как и раньше.
+    Неизвестное поле приводит к ValidationError (ответ 400).
+    """
+    available = representation.available_fields
+    errors = {}
+
+    expand = split_param(request, EXPAND_PARAM)
+    unknown = [name for name in expand if available.get(name) is None]
+    if unknown:
+        errors[EXPAND_PARAM] = [f'Неизвестные вложенные объекты: {", ".join(unknown)}.']
+
+    if FIELDS_PARAM not in request.query_params:
+        if errors:
+            raise serializers.ValidationError(errors)
+        return None
+
+    fieldset = {name: None for name in expand}
+    unknown = []
+    for item in split_param(request, FIELDS_PARAM):
+        name, _, sub = item.partition('.')
+        if name not in available or (sub and sub not in (available[name] or ())):
+            unknown.append(item)
+        elif not sub:
+            fieldset[name] = None
+        elif name not in fieldset or fieldset[name] is not None:
+            fieldset[name] = (*(fieldset.get(name) or ()), sub)
+    if unknown:
+        errors[FIELDS_PARAM] = [f'Неизвестные поля: {", ".join(unknown)}.']
+    elif not fieldset:
+        errors[FIELDS_PARAM] = ['Пустой список полей.']
+    if errors:
+        raise serializers.ValidationError(errors)
+    return fieldset
+
+
+def get_representation(request, representation):
+    """
+    Представление с полями, запрошенными параметрами `?fields=` и `?expand=`.
+    """
+    fieldset = get_fieldset(request, representation)
+    return representation if fieldset is None else representation.sparse(fieldset)
@@ -0,0 +1,88 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework import serializers
+
+from .models import Dog
+
+# Разрешённые фильтры собак: параметр -> (путь к полю модели, lookup).
+# Частые сочетания покрыты составными индексами Dog: (breed_id, age, id) и (color, gender, id).
+DOG_FILTERS = {
+    'breed_id': ('breed_id', 'exact'),
+    'breed__size': ('breed__size', 'exact'),
+    'name': ('name', 'exact'),
+    'gender': ('gender', 'exact'),
+    'color': ('color', 'exact'),
+    'age': ('age', 'exact'),
+    'age__gte': ('age', 'gte'),
+    'age__lte': ('age', 'lte'),
+}
+
+# Разрешённые поля сортировки собак.
+DOG_ORDERING_FIELDS = ('id', 'name', 'age', 'breed_id')
+
+
+def get_field(model, path):
+    """
+    Поле модели по пути вида 'breed__size'.
+    """
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def filter_dogs(queryset, params):
+    """
+    Применяет к выборке собак фильтры из белого списка `DOG_FILTERS`.
+
+    Значения приводятся к типу поля модели; неизвестный фильтр или некорректное значение
+    приводят к ValidationError (ответ 400).
+    """
+    unknown = sorted(set(params) - set(DOG_FILTERS))
+    if unknown:
+        raise serializers.ValidationError({name: ['Неизвестный фильтр.'] for name in unknown})
+
+    conditions = []
+    errors = {}
+    for name, value in params.items():
+        path, lookup = DOG_FILTERS[name]
+        try:
+            value = get_field(Dog, path).to_python(value)
+        except DjangoValidationError as exc:
+            errors[name] = exc.messages
+            continue
+        relation, _, related_path = path.partition('__')
+        if related_path:
+            # Поле связанной модели: `breed_id IN (SELECT id ...)` вместо JOIN, чтобы строки собак
+            # выбирались по индексу на внешнем ключе.
+            related = Dog._meta.get_field(relation).related_model.objects.filter(**{f'{related_path}__{lookup}': value})
+            conditions.append(Q(**{f'{relation}__in': related.values('pk')}))
+        else:
+            conditions.append(Q(**{f'{path}__{lookup}': value}))
+    if errors:
+        raise serializers.ValidationError(errors)
+    return queryset.filter(*conditions)
+
+
+def get_dog_ordering(value):
+    """
+    Сортировка собак из параметра `?ordering=`, например `-age,name`.
+
+    Допускаются только поля из `DOG_ORDERING_FIELDS`; в конец добавляется `id`, чтобы ключ
+    keyset-пагинации был уникальным. Пустое значение — сортировка по `id`.
+    """
+    ordering = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name = item.lstrip('-')
+        if name not in DOG_ORDERING_FIELDS or item.count('-') > 1 or name in (field.lstrip('-') for field in ordering):
+            raise serializers.ValidationError(
+                {'ordering': [f'Допустимые поля: {", ".join(DOG_ORDERING_FIELDS)}.']}
+            )
+        ordering.append(item)
+    if not any(field.lstrip('-') == 'id' for field in ordering):
+        ordering.append('id')
+    return tuple(ordering)
@@ -0,0 +1,275 @@
+import csv
+import io
+import json
+import re
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Breed, Dog, dogs_changed
+from .renderers import render_line
+from .serializers import BreedIdField, DogSerializer
+
+# Загружаемые колонки: записываемые поля DogSerializer с породой по ID. Остальные колонки
+# (id, поля породы из выгрузки export_dogs) пропускаются, поэтому выгрузку можно загрузить обратно.
+IMPORT_FIELDS = ('name', 'age', 'gender', 'color', 'favorite_food', 'favorite_toy', 'breed_id')
+
+BREED_INDEX = IMPORT_FIELDS.index('breed_id')
+
+FORMATS = ('csv', 'ndjson')
+
+STAGING_TABLE = 'api_dog_import'
+
+SURROGATES = re.compile('[\ud800-\udfff]')
+
+# Длинные строки цифр проверяет сериализатор: int() не принимает больше 4300 цифр, а DRF — строки длиннее 1000.
+MAX_FAST_DIGITS = 18
+
+
+def parse_int(value):
+    """
+    Целое из числа или строки ASCII-цифр либо None, если значение нужно проверять сериализатором.
+    """
+    if type(value) is int:
+        return value
+    if type(value) is str and len(value) <= MAX_FAST_DIGITS and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+
+class DogRowValidator:
+    """
+    Проверка строк загрузки по правилам DogSerializer: обязательные поля, максимальная длина строк,
+    ограничения возраста, существующий `breed_id`.
+
+    Породы загружаются один раз на всю загрузку. Типичная строка — непустые строки без пробелов по краям
+    и целые числа — проверяется быстрой проверкой по ограничениям полей сериализатора, в разы быстрее
+    `run_validation`. Всё остальное (пробелы, '3.0', неверные значения) проверяет сам сериализатор: он же
+    приводит значения и формирует тексты ошибок, поэтому результат не отличается от POST /api/dogs/.
+    """
+
+    def __init__(self, breed_ids):
+        self.breed_ids = frozenset(breed_ids)
+        self.serializer = DogSerializer(context={'breeds': {pk: Breed(pk=pk) for pk in self.breed_ids}})
+        writable = {name: field for name, field in self.serializer.fields.items() if not field.read_only}
+        self.char_fields = [(name, field.max_length) for name, field in writable.items()
+                            if type(field) is serializers.CharField and field.trim_whitespace
+                            and not field.allow_blank and not field.allow_null]
+        self.int_fields = [(name, field.min_value, field.max_value) for name, field in writable.items()
+                           if type(field) is serializers.IntegerField and not field.allow_null]
+        # Быстрая проверка повторяет правила только этих полей; если у сериализатора появятся другие,
+        # все строки проверяет он сам.
+        self.fast = (set(writable) == set(IMPORT_FIELDS) and isinstance(writable['breed_id'], BreedIdField)
+                     and len(writable) == len(self.char_fields) + len(self.int_fields) + 1)
+
+    def fast_values(self, row):
+        values = {}
+        for name, max_length in self.char_fields:
+            value = row.get(name)
+            if type(value) is not str:
+                return None
+            value = value.strip()
+            if (not value or len(value) > max_length or '\x00' in value
+                    or (not value.isascii() and SURROGATES.search(value))):
+                return None
+            values[name] = value
+        for name, min_value, max_value in self.int_fields:
+            value = parse_int(row.get(name))
+            if value is None or (min_value is not None and value < min_value) or \
+                    (max_value is not None and value > max_value):
+                return None
+            values[name] = value
+        breed_id = parse_int(row.get('breed_id'))
+        if breed_id not in self.breed_ids:
+            return None
+        values['breed_id'] = breed_id
+        return values
+
+    def validate(self, row):
+        """
+        Кортеж значений `IMPORT_FIELDS` и None либо None и ошибки в формате ответа API.
+        """
+        values = self.fast_values(row) if self.fast and isinstance(row, dict) else None
+        if values is None:
+            try:
+                values = self.serializer.run_validation(row)
+            except serializers.ValidationError as exc:
+                return None, serializers.as_serializer_error(exc)
+            values['breed_id'] = values.pop('breed').pk
+        return tuple(values[name] for name in IMPORT_FIELDS), None
+
+
+def read_rows(stream, import_format):
+    """
+    Строки из бинарного потока в UTF-8: тройки (номер строки файла, строка, ошибка разбора или None).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    try:
+        if import_format == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, row, None
+            return
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as exc:
+                yield number, line.rstrip('\r\n'), {'non_field_errors': [f'Некорректный JSON: {exc}']}
+    finally:
+        # Поток закрывает вызывающий код: обёртка закрыла бы его вместе с собой.
+        text.detach()
+
+
+def chunked_rows(rows, validator, rejects, chunk_size):
+    """
+    Пачки проверенных строк по `chunk_size`: тройки (значения, число прочитанных, число отклонённых строк).
+    Отклонённые строки с номером и ошибками пишутся в `rejects` в формате NDJSON.
+    """
+    chunk = []
+    read = rejected = 0
+    for number, row, errors in rows:
+        read += 1
+        values = None
+        if errors is None:
+            values, errors = validator.validate(row)
+        if values is None:
+            rejected += 1
+            if rejects is not None:
+                rejects.write(render_line({'line': number, 'row': row, 'errors': errors}))
+        else:
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                yield chunk, read, rejected
+                chunk = []
+    yield chunk, read, rejected
+
+
+def import_columns(connection):
+    return ', '.join(connection.ops.quote_name(Dog._meta.get_field(name).column) for name in IMPORT_FIELDS)
+
+
+def create_staging_table(cursor, connection):
+    """
+    Временная таблица с колонками `IMPORT_FIELDS` без ограничений и индексов. Удаляется после переноса строк
+(см. `drop_staging_table`), а при ошибке — откатом транзакции или точки сохранения.
+    """
+    columns = ', '.join(f'{connection.ops.quote_name(field.column)} {field.db_type(connection)}'
+                        for field in map(Dog._meta.get_field, IMPORT_FIELDS))
+    cursor.execute(f'CREATE TEMPORARY TABLE {STAGING_TABLE} ({columns}) ON COMMIT DROP')
+
+
+def drop_staging_table(cursor):
+    """
+    Удаляет временную таблицу сразу: внешняя транзакция (`atomic` вызывающего кода) может загрузить
+    ещё одну порцию до своего COMMIT, и `ON COMMIT DROP` не успел бы сработать.
+    """
+    cursor.execute(f'DROP TABLE {STAGING_TABLE}')
+
+
+def copy_from(cursor, connection, values):
+    """
+    Загружает пачку строк во временную таблицу через `COPY ... FROM STDIN`.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(values)
+    statement = f'COPY {STAGING_TABLE} ({import_columns(connection)}) FROM STDIN WITH (FORMAT csv)'
+    if hasattr(cursor, 'copy_expert'):
+        # psycopg2
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    else:
+        with cursor.copy(statement) as copy:
+            copy.write(buffer.getvalue())
+
+
+def insert_columns(connection):
+    qn = connection.ops.quote_name
+    return f'{qn(Dog._meta.db_table)} ({import_columns(connection)}, {qn("version")}, {qn("updated_at")})'
+
+
+def insert_staged(cursor, connection):
+    """
+    Переносит строки временной таблицы в таблицу собак одним INSERT ... SELECT и возвращает их число.
+    Триггеры статистики пород срабатывают один раз на весь INSERT.
+    """
+    cursor.execute(
+        f'INSERT INTO {insert_columns(connection)} SELECT {import_columns(connection)}, %s, %s FROM {STAGING_TABLE}',
+        [1, timezone.now()]
+    )
+    return cursor.rowcount
+
+
+def insert_rows(cursor, connection, values):
+    """
+    Вставляет пачку строк в таблицу собак одним `executemany` — для бэкендов без COPY. В отличие
+    от `bulk_create` модели не создаются, а размер пачки не ограничен числом параметров запроса.
+    """
+    placeholders = ', '.join(['%s'] * (len(IMPORT_FIELDS) + 2))
+    updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    cursor.executemany(f'INSERT INTO {insert_columns(connection)} VALUES ({placeholders})',
+                       [(*row, 1, updated_at) for row in values])
+
+
+def supports_copy(connection):
+    return connection.vendor == 'postgresql'
+
+
+def load_dogs(chunks, using=DEFAULT_DB_ALIAS):
+    """
+    Загружает в одной транзакции пачки проверенных строк — списки кортежей значений `IMPORT_FIELDS` —
+    и возвращает число созданных собак.
+
+    На PostgreSQL пачки загружаются через COPY во временную таблицу и затем переносятся одним INSERT ... SELECT,
+    на других бэкендах вставляются `executemany` по пачкам. Счётчики собак пород меняются один раз на загрузку.
+    """
+    connection = connections[using]
+    copy = supports_copy(connection)
+    breed_counts = Counter()
+    imported = 0
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            if copy:
+                create_staging_table(cursor, connection)
+            for values in chunks:
+                if not values:
+                    continue
+                if copy:
+                    copy_from(cursor, connection, values)
+                else:
+                    insert_rows(cursor, connection, values)
+                    imported += len(values)
+                breed_counts.update(row[BREED_INDEX] for row in values)
+            if copy:
+                imported = insert_staged(cursor, connection)
+                drop_staging_table(cursor)
+        Breed.objects.using(using).adjust_dog_counts(breed_counts)
+    dogs_changed.send(sender=Dog, using=using, pks=None)
+    return imported
+
+
+def import_dogs(stream, import_format='csv', rejects=None, using=DEFAULT_DB_ALIAS, chunk_size=10000,
+                progress=None):
+    """
+    Загружает собак из бинарного потока `stream` в формате CSV (с заголовком) или NDJSON.
+
+    Строки проверяются по правилам DogSerializer; отклонённые с номером строки и ошибками пишутся
+    в `rejects` и не мешают загрузке остальных. Корректные строки загружаются пачками по `chunk_size`
+    через `load_dogs`. После каждой пачки вызывается `progress(read, rejected)`.
+
+    Возвращает число загруженных и отклонённых строк.
+    """
+    validator = DogRowValidator(Breed.objects.using(using).values_list('pk', flat=True))
+    rejected = 0
+
+    def loaded_chunks():
+        nonlocal rejected
+        for values, read, rejected in chunked_rows(read_rows(stream, import_format), validator, rejects, chunk_size):
+            yield values
+            if progress is not None:
+                progress(read, rejected)
+
+    return load_dogs(loaded_chunks(), using), rejected
@@ -0,0 +1,59 @@
+import gzip
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.api.imports import FORMATS, import_dogs
+
+
+class Command(BaseCommand):
+    help = ('Загружает собак из CSV или NDJSON (файла или стандартного ввода) с проверкой по правилам API. '
+            'Отклонённые строки с ошибками пишутся в файл в формате NDJSON. На PostgreSQL данные загружаются '
+            'через COPY во временную таблицу и одним INSERT ... SELECT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Путь к файлу (.gz — сжатый gzip); "-" — стандартный ввод.')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='Формат файла.')
+        parser.add_argument('--rejects',
+                            help='Файл отклонённых строк; по умолчанию <input>.rejects.ndjson '
+                                 '(import_dogs.rejects.ndjson при чтении стандартного ввода).')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Строк в пачке COPY или INSERT.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Алиас базы данных.')
+
+    def handle(self, *args, **options):
+        path = options['input']
+        rejects_path = options['rejects'] or (
+            'import_dogs.rejects.ndjson' if path == '-' else f'{path}.rejects.ndjson'
+        )
+        source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        stream = gzip.GzipFile(fileobj=source, mode='rb') if path.endswith('.gz') else source
+
+        started = last_report = time.perf_counter()
+
+        def progress(read, rejected):
+            nonlocal last_report
+            now = time.perf_counter()
+            # Не чаще раза в секунду, чтобы не засорять вывод при больших файлах.
+            if now - last_report >= 1:
+                last_report = now
+                self.stdout.write(f'Прочитано строк: {read}, отклонено: {rejected} '
+                                  f'({read / (now - started):,.0f} строк/с)')
+
+        try:
+            with open(rejects_path, 'wb') as rejects:
+                imported, rejected = import_dogs(stream, options['format'], rejects, options['database'],
+                                                 options['chunk_size'], progress)
+        finally:
+            if path != '-':
+                source.close()
+        elapsed = time.perf_counter() - started
+
+        if rejected:
+            self.stdout.write(f'Отклонено строк: {rejected}, см. {rejects_path}')
+        else:
+            os.remove(rejects_path)
+        self.stdout.write(f'Загружено собак: {imported} за {elapsed:.2f} с '
+                          f'({(imported + rejected) / max(elapsed, 1e-9):,.0f} строк/с)')
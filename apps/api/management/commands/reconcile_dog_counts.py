@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.api.models import Breed
+
+
+class Command(BaseCommand):
+    help = 'Исправляет расхождения счётчиков собак пород (Breed.dog_count) с таблицей собак одним UPDATE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Алиас базы данных.')
+
+    def handle(self, *args, **options):
+        fixed = Breed.objects.using(options['database']).reconcile_dog_counts()
+        self.stdout.write(f'Исправлено пород: {fixed}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.api.stats import rebuild_breed_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает сводную таблицу статистики пород по таблице собак. '
+            'Запускается по расписанию на бэкендах без триггеров или для исправления расхождений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Алиас базы данных.')
+
+    def handle(self, *args, **options):
+        count = rebuild_breed_stats(using=options['database'])
+        self.stdout.write(f'Записей статистики: {count}')
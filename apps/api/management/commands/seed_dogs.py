@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.api.seed import seed_dogs
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу случайными правдоподобными породами и собаками для нагрузочного тестирования. '
+            'Собаки загружаются пачками: на PostgreSQL через COPY, на других бэкендах — executemany.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dogs', type=int, default=10000, help='Число собак.')
+        parser.add_argument('--breeds', type=int, default=200, help='Число новых пород (0 — только существующие).')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Строк в пачке COPY или INSERT.')
+        parser.add_argument('--seed', type=int, help='Начальное значение генератора для воспроизводимых данных.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Алиас базы данных.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            created = seed_dogs(options['dogs'], options['breeds'], options['database'], options['chunk_size'],
+                                options['seed'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Создано пород: {options["breeds"]}, собак: {created} за {elapsed:.2f} с '
+                          f'({created / max(elapsed, 1e-9):,.0f} строк/с)')
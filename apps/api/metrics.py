@@ -0,0 +1,124 @@
+import os
+
+import prometheus_client
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from prometheus_client import multiprocess
+
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+# Запросы без маршрута (404 до контроллера) и с нестандартным методом сводятся к одной метке,
+# чтобы число рядов метрик не зависело от того, что присылают клиенты.
+UNMATCHED = 'unmatched'
+OTHER_METHOD = 'other'
+
+DB_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+REQUESTS = prometheus_client.Counter(
+    'api_http_requests', 'Запросы по маршрутам, методам и кодам ответа', ['route', 'method', 'status'])
+LATENCY = prometheus_client.Histogram(
+    'api_http_request_duration_seconds', 'Время обработки запроса до передачи ответа', ['route', 'method'])
+RESPONSE_SIZE = prometheus_client.Histogram(
+    'api_http_response_size_bytes', 'Размер тела ответа', ['route', 'method'], buckets=SIZE_BUCKETS)
+DB_TIME = prometheus_client.Histogram(
+    'api_db_query_duration_seconds', 'Время SQL-запросов за один запрос', ['route', 'method'],
+    buckets=DB_BUCKETS)
+DB_QUERIES = prometheus_client.Counter(
+    'api_db_queries', 'SQL-запросы', ['route', 'method'])
+# livesum: в многопроцессном режиме складываются значения только живых процессов.
+IN_PROGRESS = prometheus_client.Gauge(
+    'api_http_requests_in_progress', 'Запросы, обрабатываемые контроллерами', ['route', 'method'],
+    multiprocess_mode='livesum')
+
+# Ряды метрик по значениям меток. labels() каждый раз берёт блокировку метрики, а чтение словаря — нет;
+# одновременное первое обращение из двух потоков вернёт один и тот же ряд.
+_children = {}
+
+
+def child(metric, *labels):
+    try:
+        return _children[metric, labels]
+    except KeyError:
+        return _children.setdefault((metric, labels), metric.labels(*labels))
+
+
+def request_labels(request):
+    """
+    Метки запроса: имя маршрута из urls.py и HTTP-метод.
+    """
+    match = request.resolver_match
+    route = match.url_name if match is not None and match.url_name else UNMATCHED
+    return route, request.method if request.method in METHODS else OTHER_METHOD
+
+
+def track_in_progress(request):
+    """
+    Учитывает запрос в числе обрабатываемых и возвращает ряд, из которого его нужно вычесть по завершении.
+    """
+    gauge = child(IN_PROGRESS, *request_labels(request))
+    gauge.inc()
+    return gauge
+
+
+def count_streamed(response, histogram):
+    """
+    Подменяет тело потокового ответа обёрткой, которая по окончании передачи записывает его размер.
+    """
+    content = response.streaming_content
+    if response.is_async:
+        async def counted():
+            size = 0
+            try:
+                async for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                histogram.observe(size)
+    else:
+        def counted():
+            size = 0
+            try:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                histogram.observe(size)
+    response.streaming_content = counted()
+
+
+def observe_response(request, response, duration, query_counter=None):
+    """
+    Записывает метрики завершённого запроса. Размер потокового ответа записывается после его передачи.
+    """
+    route, method = request_labels(request)
+    child(REQUESTS, route, method, str(response.status_code)).inc()
+    child(LATENCY, route, method).observe(duration)
+    if query_counter is not None:
+        child(DB_TIME, route, method).observe(query_counter.db_time)
+        child(DB_QUERIES, route, method).inc(query_counter.queries)
+    if response.streaming:
+        count_streamed(response, child(RESPONSE_SIZE, route, method))
+    else:
+        child(RESPONSE_SIZE, route, method).observe(len(response.content))
+
+
+def registry():
+    """
+    Реестр для выдачи: при нескольких процессах-воркерах (PROMETHEUS_MULTIPROC_DIR) — сумма значений
+    из файлов всех процессов, иначе метрики текущего процесса.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collector_registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return collector_registry
+    return prometheus_client.REGISTRY
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    return HttpResponse(prometheus_client.generate_latest(registry()),
+                        content_type=prometheus_client.CONTENT_TYPE_LATEST)
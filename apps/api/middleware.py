@@ -0,0 +1,154 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import observe_response, track_in_progress
+from .query_budget import QueryBudgetExceeded, QueryCounter, get_query_budget, logger, server_timing
+from .routers import begin_request, end_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Cookie клиента, который недавно изменял данные: пока она есть, его запросы читают с основной базы.
+PRIMARY_COOKIE = 'api_primary'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Выбор базы для чтения на время запроса (см. ReplicaRouter).
+
+    Запросы, изменяющие данные, читают с основной базы. Если запрос писал в базу, ответ ставит cookie
+    `PRIMARY_COOKIE` на `DB_REPLICA_PIN_SECONDS` секунд, и пока она есть, запросы клиента тоже читают
+    с основной базы: клиент видит свои изменения, даже если реплика от неё отстаёт. Без реплик cookie не ставится.
+    Работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = begin_request(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = end_request(token)
+        return self.process_response(response, wrote)
+
+    async def __acall__(self, request):
+        token = begin_request(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = end_request(token)
+        return self.process_response(response, wrote)
+
+    def is_pinned(self, request):
+        return request.method not in SAFE_METHODS or PRIMARY_COOKIE in request.COOKIES
+
+    def process_response(self, response, wrote):
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.DB_REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Число SQL-запросов и время в базе на каждый запрос (см. QueryCounter).
+
+    Показатели отдаются в заголовках Server-Timing и X-Query-Count и пишутся в журнал `apps.api.query_budget`
+    (INFO) со структурированными полями для форматтеров: method, path, view, status, queries, db_ms, total_ms,
+    budget. Если маршрут превысил бюджет из `API_QUERY_BUDGETS`, по `API_QUERY_BUDGET_ACTION` пишется
+    предупреждение (warn) или запрос завершается ошибкой QueryBudgetExceeded (raise). Счётчик доступен внешним
+    middleware как `request.query_counter`. Запросы потокового ответа,
+    выполняемые после выхода из контроллера, не учитываются. Работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryCounter() as counter:
+            request.query_counter = counter
+            response = self.get_response(request)
+        return self.process_response(request, response, counter)
+
+    async def __acall__(self, request):
+        with QueryCounter() as counter:
+            request.query_counter = counter
+            response = await self.get_response(request)
+        return self.process_response(request, response, counter)
+
+    def process_response(self, request, response, counter):
+        response['Server-Timing'] = server_timing(counter)
+        response['X-Query-Count'] = str(counter.queries)
+        view = request.resolver_match.url_name if request.resolver_match else None
+        budget = get_query_budget(view, request.method)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': counter.queries,
+            'db_ms': round(counter.db_time * 1000, 1),
+            'total_ms': round(counter.total_time * 1000, 1),
+            'budget': budget,
+        }
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra=fields)
+        if budget is not None and counter.queries > budget and settings.API_QUERY_BUDGET_ACTION != 'off':
+            message = f'{request.method} {view}: {counter.queries} SQL-запросов при бюджете {budget}'
+            if settings.API_QUERY_BUDGET_ACTION == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=fields)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Метрики Prometheus по маршрутам (см. apps/api/metrics.py): число запросов, время обработки, размер ответа,
+    время SQL-запросов и число запросов в обработке. Время в базе берётся у QueryBudgetMiddleware, поэтому
+    этот middleware должен стоять перед ним.
+    Работает и под WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.process_response(request, response, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.process_response(request, response, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Маршрут известен только после разрешения URL, поэтому запрос считается «в обработке» с этого момента.
+        request.metrics_in_progress = track_in_progress(request)
+
+    def process_response(self, request, response, started):
+        in_progress = getattr(request, 'metrics_in_progress', None)
+        if in_progress is not None:
+            in_progress.dec()
+        observe_response(request, response, time.perf_counter() - started, getattr(request, 'query_counter', None))
+        return response
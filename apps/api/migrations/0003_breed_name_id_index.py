@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_dog_age'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='breed',
+            index=models.Index(fields=['name', 'id'], name='api_breed_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_versioned_models'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dog',
+            index=models.Index(fields=['breed', 'age', 'id'], name='api_dog_breed_age_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dog',
+            index=models.Index(fields=['color', 'gender', 'id'], name='api_dog_color_gender_id_idx'),
+        ),
+    ]
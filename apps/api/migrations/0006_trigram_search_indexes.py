@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:40
+
+from django.conf import settings
+from django.db import migrations
+
+# GIN-индексы триграмм для поиска ?q= по именам собак и названиям пород. Они есть только на PostgreSQL,
+# поэтому создаются SQL-запросами и не входят в состояние моделей: на SQLite поиск работает через icontains.
+# С API_SEARCH_TRIGRAM=False (нет прав на CREATE EXTENSION) миграция ничего не делает.
+TRIGRAM_INDEXES = [
+    ('Dog', 'name', 'api_dog_name_trgm_idx'),
+    ('Breed', 'name', 'api_breed_name_trgm_idx'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql' or not settings.API_SEARCH_TRIGRAM:
+        return
+    quote_name = schema_editor.quote_name
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for model_name, field_name, index_name in TRIGRAM_INDEXES:
+        model = apps.get_model('api', model_name)
+        column = model._meta.get_field(field_name).column
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote_name(index_name)} ON {quote_name(model._meta.db_table)} '
+            f'USING gin ({quote_name(column)} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_dog_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,174 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:23
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Сводная таблица api_breedstat поддерживается триггерами на api_dog, чтобы её не обходил ни один путь записи:
+# ORM, QuerySet.update(), UPDATE ... RETURNING, массовые операции и загрузка через COPY.
+# На SQLite триггеры построчные; на PostgreSQL — на оператор, с таблицами переходов, поэтому массовая вставка
+# или удаление обновляет счётчики одним запросом. На других бэкендах триггеров нет, и таблицу нужно
+# пересчитывать по расписанию командой `manage.py refresh_breed_stats`.
+# Внимание: на SQLite пересоздание таблицы api_dog в будущих миграциях удалит триггеры — их нужно создать заново.
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER api_dog_stats_insert AFTER INSERT ON api_dog
+    BEGIN
+        INSERT INTO api_breedstat (breed_id, dimension, value, count)
+        VALUES (NEW.breed_id, 'age', CAST(NEW.age AS TEXT), 1),
+               (NEW.breed_id, 'gender', NEW.gender, 1),
+               (NEW.breed_id, 'color', NEW.color, 1)
+        ON CONFLICT (breed_id, dimension, value) DO UPDATE SET count = count + excluded.count;
+    END
+    """,
+    """
+    CREATE TRIGGER api_dog_stats_delete AFTER DELETE ON api_dog
+    BEGIN
+        UPDATE api_breedstat SET count = count - 1
+        WHERE breed_id = OLD.breed_id AND ((dimension = 'age' AND value = CAST(OLD.age AS TEXT))
+                                           OR (dimension = 'gender' AND value = OLD.gender)
+                                           OR (dimension = 'color' AND value = OLD.color));
+    END
+    """,
+    """
+    CREATE TRIGGER api_dog_stats_update AFTER UPDATE OF breed_id, age, gender, color ON api_dog
+    WHEN OLD.breed_id IS NOT NEW.breed_id OR OLD.age IS NOT NEW.age
+         OR OLD.gender IS NOT NEW.gender OR OLD.color IS NOT NEW.color
+    BEGIN
+        UPDATE api_breedstat SET count = count - 1
+        WHERE breed_id = OLD.breed_id AND ((dimension = 'age' AND value = CAST(OLD.age AS TEXT))
+                                           OR (dimension = 'gender' AND value = OLD.gender)
+                                           OR (dimension = 'color' AND value = OLD.color));
+        INSERT INTO api_breedstat (breed_id, dimension, value, count)
+        VALUES (NEW.breed_id, 'age', CAST(NEW.age AS TEXT), 1),
+               (NEW.breed_id, 'gender', NEW.gender, 1),
+               (NEW.breed_id, 'color', NEW.color, 1)
+        ON CONFLICT (breed_id, dimension, value) DO UPDATE SET count = count + excluded.count;
+    END
+    """,
+]
+
+POSTGRESQL_BUCKETS = """
+    SELECT breed_id, dimension, value, count(*) AS count FROM (
+        SELECT breed_id, 'age' AS dimension, age::text AS value FROM {dogs} AS dogs
+        UNION ALL SELECT breed_id, 'gender', gender FROM {dogs} AS dogs
+        UNION ALL SELECT breed_id, 'color', color FROM {dogs} AS dogs
+    ) AS buckets
+    GROUP BY breed_id, dimension, value
+"""
+
+POSTGRESQL_INCREMENT = """
+    INSERT INTO api_breedstat (breed_id, dimension, value, count)
+    {buckets}
+    ON CONFLICT (breed_id, dimension, value) DO UPDATE SET count = api_breedstat.count + EXCLUDED.count;
+"""
+
+POSTGRESQL_DECREMENT = """
+    UPDATE api_breedstat AS stat SET count = stat.count - buckets.count
+    FROM ({buckets}) AS buckets
+    WHERE stat.breed_id = buckets.breed_id AND stat.dimension = buckets.dimension AND stat.value = buckets.value;
+"""
+
+# Для UPDATE учитываются только строки, у которых изменился хотя бы один из признаков.
+POSTGRESQL_CHANGED = """
+    (SELECT {side}.* FROM old_rows AS o JOIN new_rows AS n ON n.id = o.id
+     WHERE (o.breed_id, o.age, o.gender, o.color) IS DISTINCT FROM (n.breed_id, n.age, n.gender, n.color))
+"""
+
+
+def postgresql_trigger(name, event, transitions, body):
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {body}
+            RETURN NULL;
+        END
+        $$
+        """,
+        f'CREATE TRIGGER {name} AFTER {event} ON api_dog REFERENCING {transitions} '
+        f'FOR EACH STATEMENT EXECUTE FUNCTION {name}()',
+    ]
+
+
+POSTGRESQL_TRIGGERS = [
+    *postgresql_trigger(
+        'api_dog_stats_insert', 'INSERT', 'NEW TABLE AS new_rows',
+        POSTGRESQL_INCREMENT.format(buckets=POSTGRESQL_BUCKETS.format(dogs='new_rows'))
+    ),
+    *postgresql_trigger(
+        'api_dog_stats_delete', 'DELETE', 'OLD TABLE AS old_rows',
+        POSTGRESQL_DECREMENT.format(buckets=POSTGRESQL_BUCKETS.format(dogs='old_rows'))
+    ),
+    *postgresql_trigger(
+        'api_dog_stats_update', 'UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+        POSTGRESQL_DECREMENT.format(buckets=POSTGRESQL_BUCKETS.format(dogs=POSTGRESQL_CHANGED.format(side='o')))
+        + POSTGRESQL_INCREMENT.format(buckets=POSTGRESQL_BUCKETS.format(dogs=POSTGRESQL_CHANGED.format(side='n')))
+    ),
+]
+
+TRIGGER_NAMES = ['api_dog_stats_insert', 'api_dog_stats_delete', 'api_dog_stats_update']
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_TRIGGERS, 'postgresql': POSTGRESQL_TRIGGERS}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name in TRIGGER_NAMES:
+        if vendor == 'sqlite':
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        elif vendor == 'postgresql':
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name} ON api_dog')
+            schema_editor.execute(f'DROP FUNCTION IF EXISTS {name}()')
+
+
+def populate_stats(apps, schema_editor):
+    Dog = apps.get_model('api', 'Dog')
+    BreedStat = apps.get_model('api', 'BreedStat')
+    alias = schema_editor.connection.alias
+    counts = Counter()
+    for breed_id, age, gender, color in Dog.objects.using(alias).values_list('breed_id', 'age', 'gender', 'color'):
+        counts[breed_id, 'age', str(age)] += 1
+        counts[breed_id, 'gender', gender] += 1
+        counts[breed_id, 'color', color] += 1
+    BreedStat.objects.using(alias).bulk_create(
+        BreedStat(breed_id=breed_id, dimension=dimension, value=value, count=count)
+        for (breed_id, dimension, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreedStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('age', 'Возраст'), ('gender', 'Пол'), ('color', 'Цвет')], max_length=10, verbose_name='Признак')),
+                ('value', models.CharField(max_length=50, verbose_name='Значение')),
+                ('count', models.IntegerField(default=0, verbose_name='Число собак')),
+                ('breed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.breed', verbose_name='Порода')),
+            ],
+            options={
+                'verbose_name': 'Статистика породы',
+                'verbose_name_plural': 'Статистика пород',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='breedstat',
+            constraint=models.UniqueConstraint(fields=('breed', 'dimension', 'value'), name='api_breedstat_bucket_unique'),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 10:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_dog_counts(apps, schema_editor):
+    Breed = apps.get_model('api', 'Breed')
+    Dog = apps.get_model('api', 'Dog')
+    alias = schema_editor.connection.alias
+    counts = Dog.objects.using(alias).filter(breed=OuterRef('pk')).order_by().values('breed').annotate(
+        count=Count('pk')
+    ).values('count')
+    Breed.objects.using(alias).update(dog_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_breed_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breed',
+            name='dog_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Число собак'),
+        ),
+        migrations.RunPython(populate_dog_counts, migrations.RunPython.noop),
+    ]
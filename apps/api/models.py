@@ -1,8 +1,199 @@
+from collections import Counter
+
+from django.core.exceptions import EmptyResultSet
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import IntegrityError, NotSupportedError, connections, models, router, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.deletion import Collector
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Изменения, о которых не сообщают post_save/post_delete: массовые операции QuerySet.
+# dogs_changed — собаки с ID из `pks` созданы, изменены или удалены (pks=None — какие именно, неизвестно);
+# dog_counts_changed — изменились счётчики собак пород с ID из `breed_ids` (None — любых пород).
+dogs_changed = Signal()
+dog_counts_changed = Signal()
+
+# Сколько ID удалённых собак передаёт dogs_changed при удалении одним запросом на PostgreSQL:
+# при большем числе сигнал передаёт pks=None, и сбрасываются ответы со всеми собаками.
+CHANGED_PKS_LIMIT = 10000
+
+
+class MissingBreedError(IntegrityError):
+    """
+    Собак записывают в породы, которых уже нет в базе: порода удалена после проверки `breed_id`
+    по кэшу справочника (например, другим воркером).
+
+    Атрибуты:
+        breed_ids (list): ID отсутствующих пород.
+    """
+
+    def __init__(self, breed_ids):
+        self.breed_ids = breed_ids
+        super().__init__(f'Пород с ID {", ".join(map(str, breed_ids))} нет в базе.')
+
+
+class VersionedModel(models.Model):
+    """
+        Абстрактная модель с номером версии и временем последнего изменения.
+
+        Версия увеличивается в базе при каждом сохранении существующего объекта. Вместе с `updated_at`
+        она используется для ETag и Last-Modified в условных запросах.
+
+        Атрибуты:
+        version (int): Номер версии объекта.
+        updated_at (datetime): Время последнего изменения.
+    """
+
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
+    # Поля, перечитываемые из базы после сохранения существующего объекта.
+    refreshed_fields = ('version',)
 
-class Dog(models.Model):
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        # Версия увеличивается в UPDATE, а не в Python: при одновременных сохранениях каждое получает
+        # свою версию, и ETag, выданный до чужого изменения, не совпадёт после него.
+        version = self.version
+        self.version = F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        except BaseException:
+            self.version = version
+            raise
+        self.refresh_from_db(fields=self.refreshed_fields)
+
+
+def count_moves(old_breed_ids, breed_id):
+    """
+    Изменения счётчиков собак при переносе собак из пород `old_breed_ids` в породу `breed_id`.
+    """
+    deltas = Counter()
+    for old_breed_id in old_breed_ids:
+        if old_breed_id != breed_id:
+            deltas[old_breed_id] -= 1
+            deltas[breed_id] += 1
+    return deltas
+
+
+class DogQuerySet(models.QuerySet):
+    """
+    Выборка собак, поддерживающая счётчик `Breed.dog_count` при массовых операциях.
+
+    `bulk_create`, `update` с изменением породы и `delete` в той же транзакции меняют счётчики
+    пород атомарными `UPDATE ... SET dog_count = dog_count + n`. Изменяемые строки сначала блокируются
+    и читаются их породы, а запись идёт по их ID: так строки, появившиеся между чтением и записью,
+    не изменятся без учёта в счётчиках. Удаление на PostgreSQL — один запрос, возвращающий число
+    удалённых собак по породам (см. `delete_returning_counts`); на других бэкендах удаляемые строки
+    блокируются и читаются так же, как изменяемые.
+    """
+
+    def lock_breeds(self):
+        """
+        Блокирует строки выборки до конца транзакции и возвращает список пар (id, breed_id).
+        """
+        return list(self.select_for_update(of=('self',)).order_by().values_list('pk', 'breed_id'))
+
+    def batches(self, rows):
+        pks = [pk for pk, _ in rows]
+        if not pks:
+            return
+        size = connections[self.db].ops.bulk_batch_size(['pk'], pks) or len(pks)
+        for start in range(0, len(pks), size):
+            yield self.model._base_manager.using(self.db).filter(pk__in=pks[start:start + size])
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            raise NotSupportedError('bulk_create с обработкой конфликтов не поддерживает счётчик собак пород.')
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            Breed.objects.using(self.db).adjust_dog_counts(Counter(dog.breed_id for dog in created))
+        dogs_changed.send(sender=self.model, using=self.db, pks=[dog.pk for dog in created])
+        return created
+
+    def update(self, **kwargs):
+        if 'breed' not in kwargs and 'breed_id' not in kwargs:
+            updated = super().update(**kwargs)
+            dogs_changed.send(sender=self.model, using=self.db, pks=None)
+            return updated
+        breed = kwargs['breed'] if 'breed' in kwargs else kwargs['breed_id']
+        breed_id = breed.pk if isinstance(breed, Breed) else breed
+        if hasattr(breed_id, 'resolve_expression'):
+            raise NotSupportedError('Порода, заданная выражением, не поддерживается счётчиком собак пород.')
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = self.lock_breeds()
+            updated = sum(batch.update(**kwargs) for batch in self.batches(rows))
+            Breed.objects.using(self.db).adjust_dog_counts(count_moves([old for _, old in rows], breed_id))
+        dogs_changed.send(sender=self.model, using=self.db, pks=[pk for pk, _ in rows])
+        return updated
+
+    def delete(self):
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        # Без каскадов и получателей сигналов удаления Django тоже удаляет одним DELETE, не загружая объекты.
+        fast = Collector(using=self.db, origin=self).can_fast_delete(self)
+        if fast and connections[self.db].vendor == 'postgresql':
+            return self.delete_returning_counts()
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = self.lock_breeds()
+            deleted = Counter()
+            for batch in self.batches(rows):
+                deleted.update(batch.delete()[1])
+            Breed.objects.using(self.db).adjust_dog_counts({breed_id: -count for breed_id, count
+                                                            in Counter(old for _, old in rows).items()})
+        dogs_changed.send(sender=self.model, using=self.db, pks=[pk for pk, _ in rows])
+        return sum(deleted.values()), dict(deleted)
+
+    def delete_returning_counts(self):
+        """
+        Удаление на PostgreSQL одним запросом `WITH deleted AS (DELETE ... RETURNING) SELECT ... GROUP BY`:
+        число удалённых собак по породам считается в базе ровно по удалённым строкам, без предварительного
+        чтения и блокировки. ID удалённых собак возвращаются, только если их не больше `CHANGED_PKS_LIMIT`;
+        иначе `dogs_changed` сообщает об изменении без списка ID.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        try:
+            subquery, params = self.order_by().values('pk').query.get_compiler(self.db).as_sql()
+        except EmptyResultSet:
+            return 0, {}
+        pk_column = quote_name(opts.pk.column)
+        breed_column = quote_name(opts.get_field('breed').column)
+        sql = (
+            f'WITH deleted AS (DELETE FROM {quote_name(opts.db_table)} WHERE {pk_column} IN ({subquery}) '
+            f'RETURNING {pk_column}, {breed_column}) '
+            f'SELECT {breed_column}, COUNT(*), CASE WHEN SUM(COUNT(*)) OVER () <= %s '
+            f'THEN array_agg({pk_column}) END FROM deleted GROUP BY {breed_column}'
+        )
+        with transaction.atomic(using=self.db, savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, (*params, CHANGED_PKS_LIMIT))
+                rows = cursor.fetchall()
+            Breed.objects.using(self.db).adjust_dog_counts({breed_id: -count for breed_id, count, _ in rows})
+        deleted = sum(count for _, count, _ in rows)
+        pks = None if any(ids is None for _, _, ids in rows) else [pk for _, _, ids in rows for pk in ids]
+        dogs_changed.send(sender=self.model, using=self.db, pks=pks)
+        return deleted, {opts.label: deleted} if deleted else {}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+    delete_returning_counts.alters_data = True
+    delete_returning_counts.queryset_only = True
+    update.alters_data = True
+
+
+class Dog(VersionedModel):
     """
         Модель для представления информации о собаке.
 
@@ -14,6 +205,8 @@ class Dog(models.Model):
         favorite_food (str): Любимая еда собаки.
         favorite_toy (str): Любимая игрушка собаки.
         breed (Breed): Порода собаки, связанная внешним ключом с моделью Breed.
+
+        Создание, удаление собаки и смена её породы в той же транзакции меняют `Breed.dog_count`.
     """
 
     name = models.CharField(max_length=100, verbose_name='Имя')
@@ -30,15 +223,95 @@ class Dog(models.Model):
                               related_name='dogs',
                               verbose_name='Порода')
 
+    objects = DogQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Собака'
         verbose_name_plural = 'Собаки'
+        indexes = [
+            # Фильтры списка собак: порода с диапазоном возраста, цвет с полом. Последняя колонка id —
+            # ключ keyset-пагинации, поэтому страница читается из индекса без сортировки.
+            models.Index(fields=['breed', 'age', 'id'], name='api_dog_breed_age_id_idx'),
+            models.Index(fields=['color', 'gender', 'id'], name='api_dog_color_gender_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}, {self.age} - {self.breed.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Порода на момент загрузки: по ней save() узнаёт, что собаку перенесли в другую породу.
+        instance._loaded_breed_id = instance.__dict__.get('breed_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        loaded_breed_id = getattr(self, '_loaded_breed_id', self.breed_id)
+        moved = (not adding and loaded_breed_id != self.breed_id
+                 and (update_fields is None or {'breed', 'breed_id'} & set(update_fields)))
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            if moved:
+                # Порода в базе могла измениться после загрузки объекта — уменьшаем счётчик той, что в базе.
+                rows = type(self).objects.using(using).filter(pk=self.pk).lock_breeds()
+            super().save(*args, **kwargs)
+            if adding:
+                Breed.objects.using(using).adjust_dog_counts({self.breed_id: 1})
+            elif moved:
+                Breed.objects.using(using).adjust_dog_counts(count_moves([old for _, old in rows], self.breed_id))
+        self._loaded_breed_id = self.breed_id
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        result = type(self).objects.using(using).filter(pk=self.pk).delete()
+        self.pk = None
+        return result
+
+
+class BreedQuerySet(models.QuerySet):
 
-class Breed(models.Model):
+    def adjust_dog_counts(self, deltas):
+        """
+        Меняет счётчики собак пород на величины из `deltas` ({breed_id: изменение}) одним UPDATE.
+
+        Время изменения пород тоже обновляется: счётчик входит в представление породы,
+        и от времени изменения зависят её Last-Modified и ETag.
+
+        UPDATE блокирует строки пород до конца транзакции, поэтому порода, в которую добавляются собаки,
+        не может быть удалена до коммита. Если такой породы уже нет, вызывает MissingBreedError
+        сразу, а не при проверке внешнего ключа во время коммита.
+        """
+        deltas = {breed_id: delta for breed_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        change = Case(*[When(pk=breed_id, then=Value(delta)) for breed_id, delta in deltas.items()], default=Value(0))
+        updated = self.filter(pk__in=deltas).update(dog_count=F('dog_count') + change, updated_at=timezone.now())
+        if updated < len(deltas):
+            missing = set(deltas) - set(self.filter(pk__in=deltas).values_list('pk', flat=True))
+            added = sorted(breed_id for breed_id in missing if deltas[breed_id] > 0)
+            if added:
+                raise MissingBreedError(added)
+        dog_counts_changed.send(sender=self.model, using=self.db, breed_ids=list(deltas))
+
+    def reconcile_dog_counts(self):
+        """
+        Исправляет расхождения счётчиков собак с таблицей собак одним UPDATE
+        и возвращает число исправленных пород.
+        """
+        actual = Coalesce(Subquery(
+            Dog._base_manager.filter(breed=OuterRef('pk')).order_by().values('breed').annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0)
+        fixed = self.exclude(dog_count=actual).update(dog_count=actual, updated_at=timezone.now())
+        if fixed:
+            dog_counts_changed.send(sender=self.model, using=self.db, breed_ids=None)
+        return fixed
+
+
+class Breed(VersionedModel):
     """
         Модель для представления информации о породе собаки.
 
@@ -49,6 +322,8 @@ class Breed(models.Model):
         trainability (int): Уровень обучаемости породы, принимающий значения от 1 до 5.
         shedding_amount (int): Уровень линьки породы, принимающий значения от 1 до 5.
         exercise_needs (int): Потребность породы в физических упражнениях, принимающая значения от 1 до 5.
+        dog_count (int): Число собак породы. Поддерживается при записи собак, см. DogQuerySet;
+        расхождения исправляет команда `manage.py reconcile_dog_counts`.
     """
 
     SHIRT_SIZES = (
@@ -75,11 +350,69 @@ class Breed(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         verbose_name='Потребность в физических упражнениях'
     )
+    dog_count = models.IntegerField(default=0, editable=False, verbose_name='Число собак')
+
+    objects = BreedQuerySet.as_manager()
+
+    # save() не пишет dog_count, поэтому вместе с версией перечитывает текущее значение счётчика.
+    refreshed_fields = ('version', 'dog_count')
 
     class Meta:
         verbose_name = 'Порода'
         verbose_name_plural = 'Породы'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='api_breed_name_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # Счётчик собак меняют только записи собак (DogQuerySet, Dog.save): значение, загруженное
+            # вместе с породой, могло устареть, и сохранение породы не должно его перезаписывать.
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'dog_count']
+        super().save(*args, **kwargs)
+
+
+class BreedStat(models.Model):
+    """
+        Число собак породы с определённым значением признака: возраста, пола или цвета.
+
+        Сводная таблица для /api/breeds/stats/. Её поддерживают триггеры на таблице собак (миграция 0007):
+        вставка, удаление и изменение собак меняют счётчики их пород, поэтому статистика читается
+        за O(пород), а не за O(собак). Команда `manage.py refresh_breed_stats` пересчитывает таблицу целиком.
+
+        Атрибуты:
+        breed (Breed): Порода.
+        dimension (str): Признак: 'age', 'gender' или 'color'.
+        value (str): Значение признака.
+        count (int): Число собак породы с этим значением.
+    """
+    DIMENSIONS = (
+        ('age', 'Возраст'),
+        ('gender', 'Пол'),
+        ('color', 'Цвет'),
+    )
+
+    breed = models.ForeignKey('Breed',
+                              on_delete=models.CASCADE,
+                              related_name='stats',
+                              verbose_name='Порода')
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS, verbose_name='Признак')
+    value = models.CharField(max_length=50, verbose_name='Значение')
+    count = models.IntegerField(default=0, verbose_name='Число собак')
+
+    class Meta:
+        verbose_name = 'Статистика породы'
+        verbose_name_plural = 'Статистика пород'
+        constraints = [
+            models.UniqueConstraint(fields=['breed', 'dimension', 'value'], name='api_breedstat_bucket_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.breed_id}: {self.dimension}={self.value} ({self.count})"
@@ -0,0 +1,238 @@
+import base64
+import binascii
+import json
+from collections.abc import Mapping
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Breed, Dog
+
+# Значения ключа в курсоре: строки и целые числа, как в ключах сортировки собак и пород. Дробные числа
+# не принимаются: IntegerField.to_python() молча отбросил бы дробную часть.
+CURSOR_VALUE_TYPES = (str, int)
+
+
+class KeysetPagination:
+    """
+    Keyset-пагинация по непрозрачному курсору.
+
+    Страница выбирается условием на ключ сортировки (например, `(name, id) > (x, y)`),
+    а не через OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+    Тело ответа остаётся списком объектов, ссылка на следующую страницу передаётся
+    в заголовке `Link` с `rel="next"`.
+
+    Атрибуты:
+        ordering (tuple): Поля сортировки; последнее поле должно быть уникальным. Префикс '-' означает
+        сортировку по убыванию.
+        model (Model): Модель выборки; значения курсора приводятся к типам её полей.
+        cursor_query_param (str): Имя параметра запроса с курсором.
+        page_size_query_param (str): Имя параметра запроса с размером страницы.
+    """
+    ordering = ('id',)
+    model = None
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+        self.next_position = None
+
+    @property
+    def key_columns(self):
+        """
+        Колонки ключа сортировки без направления.
+        """
+        return tuple(field.lstrip('-') for field in self.ordering)
+
+    def get_page_size(self, request):
+        """
+        Размер страницы из параметра запроса, ограниченный сверху `API_MAX_PAGE_SIZE`.
+        """
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_window(self, queryset, request):
+        """
+        Выборка строк страницы и одной следующей строки, по которой определяется наличие продолжения.
+        Запрос не выполняется.
+        """
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+        return queryset[:self.limit + 1]
+
+    def paginate_queryset(self, queryset, request, transform=None, key_start=None):
+        """
+        Возвращает список объектов текущей страницы.
+
+        `transform` преобразует строки страницы (например, кортежи `.values_list()`) в представления;
+        значения ключа для курсора берутся из результата преобразования. Если в представлении может
+        не быть полей ключа (выборка полей `?fields=`), `key_start` — индекс, с которого в строке
+        выборки идут колонки ключа сортировки, и ключ берётся из строки.
+        """
+        self.window = list(self.get_window(queryset, request))
+        return self.get_page(self.window, transform, key_start)
+
+    async def apaginate_queryset(self, queryset, request, transform=None, key_start=None):
+        """
+        Асинхронный вариант `paginate_queryset`: строки читаются асинхронным ORM,
+        `transform` — корутинная функция.
+        """
+        self.window = [row async for row in self.get_window(queryset, request)]
+        page = self.window[:self.limit]
+        if transform is not None:
+            page = await transform(page)
+        self.set_next_position(self.window, page, key_start)
+        return page
+
+    def paginate_sequence(self, items, request, index_after):
+        """
+        Страница из списка в памяти, уже упорядоченного по ключу пагинации.
+
+        `index_after(position)` возвращает индекс первого элемента после курсора или None, если позицию
+        в списке найти нельзя; тогда метод возвращает None, и страницу нужно выбрать из базы.
+        """
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        start = 0
+        if position is not None:
+            start = index_after(position)
+            if start is None:
+                return None
+
+        self.window = items[start:start + self.limit + 1]
+        return self.get_page(self.window)
+
+    def get_page(self, window, transform=None, key_start=None):
+        page = window[:self.limit]
+        if transform is not None:
+            page = transform(page)
+        self.set_next_position(window, page, key_start)
+        return page
+
+    def set_next_position(self, window, page, key_start=None):
+        if len(window) <= self.limit:
+            self.next_position = None
+        elif key_start is not None:
+            self.next_position = list(window[self.limit - 1][key_start:key_start + len(self.ordering)])
+        else:
+            self.next_position = [self.get_key_value(page[-1], field) for field in self.ordering]
+
+    def get_position_filter(self, position):
+        """
+        Условие "строго после позиции" для составного ключа сортировки.
+
+        Для ключа (a, b) строится `a >= x AND (a > x OR (a = x AND b > y))`: первое
+        сравнение задаёт границу диапазона по индексу, остальное отсекает уже выданные строки.
+        """
+        fields = [field.lstrip('-') for field in self.ordering]
+        lookups = ['lt' if field.startswith('-') else 'gt' for field in self.ordering]
+
+        branches = []
+        for index, (field, lookup) in enumerate(zip(fields, lookups)):
+            condition = {fields[i]: position[i] for i in range(index)}
+            condition[f'{field}__{lookup}'] = position[index]
+            branches.append(Q(**condition))
+
+        if len(branches) == 1:
+            return branches[0]
+        bound = Q(**{f'{fields[0]}__{lookups[0]}e': position[0]})
+        return bound & reduce(or_, branches)
+
+    def get_key_value(self, instance, field):
+        value = instance
+        for attr in field.lstrip('-').split('__'):
+            value = value[attr] if isinstance(value, Mapping) else getattr(value, attr)
+        return value
+
+    def decode_cursor(self, request):
+        """
+        Декодирует курсор из параметра запроса; значения приводятся к типам полей ключа `model`.
+        Некорректный курсор, в том числе подделанный (null, вложенные списки, строка вместо ID), приводит к 404.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(encoded + padding))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, CURSOR_VALUE_TYPES) and not isinstance(value, bool) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        if self.model is None:
+            return position
+        fields = map(self.model._meta.get_field, self.key_columns)
+        try:
+            return [field.to_python(value) for field, value in zip(fields, position)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        """
+        Ответ со списком объектов страницы и заголовком `Link`.
+        """
+        links = [f'<{self.get_first_link()}>; rel="first"']
+        next_link = self.get_next_link()
+        if next_link is not None:
+            links.append(f'<{next_link}>; rel="next"')
+        return Response(data, headers={'Link': ', '.join(links)})
+
+
+class DogPagination(KeysetPagination):
+    """
+    Пагинация списка собак по ключу (id).
+    """
+    ordering = ('id',)
+    model = Dog
+
+
+class BreedPagination(KeysetPagination):
+    """
+    Пагинация списка пород по ключу (name, id).
+    """
+    ordering = ('name', 'id')
+    model = Breed
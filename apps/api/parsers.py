@@ -0,0 +1,57 @@
+import codecs
+import io
+
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson превращает целые больше 64 бит во float, поэтому тело с такими числами разбирает стандартный парсер.
+# Проверка грубая: 19 цифр подряд могут быть и внутри строки, тогда разбор просто медленнее. Цифры заменяются
+# на '0', остальные байты — на пробел, и ищется подстрока: так в разы быстрее регулярного выражения.
+DIGITS_TABLE = bytes(b'0'[0] if byte in b'0123456789' else b' '[0] for byte in range(256))
+LONG_NUMBER = b'0' * 19
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson: разбирает тело в UTF-8 без декодирования в строку и в разы быстрее на массовых запросах.
+
+    Без orjson, с другой кодировкой запроса или с `STRICT_JSON=False` работает стандартный JSONParser.
+    Тело, которое orjson не принимает или разбирает иначе (с целыми больше 64 бит), разбирает стандартный
+    парсер: результат и сообщения об ошибках остаются прежними.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if LONG_NUMBER not in body.translate(DIGITS_TABLE):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Парсер тел запросов в MessagePack (`application/msgpack`) от внутренних сервисов.
+
+    Результат — те же словари и списки, что дал бы JSON; ключи словарей должны быть строками.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
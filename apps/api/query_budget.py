@@ -0,0 +1,89 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Счётчик текущего запроса: None вне QueryCounter. В переменной хранится изменяемый объект,
+# поэтому запросы из потоков sync_to_async учитываются в счётчике асинхронного запроса.
+_counter = ContextVar('api_query_counter', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Запрос API выполнил больше SQL-запросов, чем разрешено его бюджетом (API_QUERY_BUDGET_ACTION='raise').
+    """
+
+
+class QueryCounter:
+    """
+    Считает SQL-запросы и время их выполнения во всех базах, пока открыт контекст. В отличие
+    от `connection.queries` работает без DEBUG: запросы перехватывает `count_query`.
+
+    Атрибуты:
+        queries (int): Число выполненных SQL-запросов, включая точки сохранения транзакций.
+        db_time (float): Суммарное время выполнения запросов в секундах.
+        total_time (float): Время от входа в контекст до выхода из него в секундах.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.total_time = 0.0
+        self._token = None
+        self._started = None
+
+    def __enter__(self):
+        self._token = _counter.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.total_time = time.perf_counter() - self._started
+        _counter.reset(self._token)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Обёртка выполнения запросов (execute_wrapper) всех соединений: учитывает запрос в текущем QueryCounter.
+    """
+    counter = _counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.queries += 1
+        counter.db_time += time.perf_counter() - started
+
+
+def install_query_counter(connection):
+    """
+    Подключает `count_query` к соединению. Соединения у каждого потока свои, поэтому обёртка ставится
+    на каждое при подключении, а не на время запроса: так учитываются и запросы из потоков sync_to_async.
+    """
+    if count_query not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает свою обёртку с конца.
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def get_query_budget(url_name, method):
+    """
+    Бюджет SQL-запросов маршрута `url_name` для HTTP-метода из `API_QUERY_BUDGETS` или None, если он не задан.
+    HEAD без своего бюджета получает бюджет GET.
+    """
+    budgets = settings.API_QUERY_BUDGETS.get(url_name) or {}
+    if method == 'HEAD' and method not in budgets:
+        method = 'GET'
+    return budgets.get(method)
+
+
+def server_timing(counter):
+    """
+    Значение заголовка Server-Timing: время в базе с числом запросов и общее время обработки, в миллисекундах.
+    """
+    return (f'db;dur={counter.db_time * 1000:.1f};desc="{counter.queries} queries", '
+            f'total;dur={counter.total_time * 1000:.1f}')
@@ -0,0 +1,85 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Даты и время сериализует энкодер DRF: формат ISO 8601 с 'Z' для UTC должен совпадать байт-в-байт.
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson: тот же результат, что у стандартного рендерера, но в разы быстрее на больших списках.
+
+    Используется, когда установлен orjson и настройки DRF по умолчанию (`UNICODE_JSON`, `COMPACT_JSON`,
+    `STRICT_JSON`) требуют компактного UTF-8 без экранирования. Без orjson, с другими настройками,
+    с отступами (`indent`) и для значений, которые orjson не сериализует (например, целых больше 64 бит),
+    работает стандартный JSONRenderer. Типы, которых нет в JSON, преобразует энкодер DRF.
+
+    Отличия от стандартного рендерера: NaN и бесконечность записываются как null, а не вызывают ошибку,
+    а числа с плавающей точкой меньше 1e-4 или от 1e16 по модулю — в другой, равнозначной записи
+    (`0.000015` вместо `1.5e-05`, `1e16` вместо `1e+16`). В ответах API таких значений нет.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и стандартный рендерер, экранируем U+2028 и U+2029: они ломают JSONP и встраивание в JavaScript.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Рендерер в MessagePack (`application/msgpack`) для обмена данными между внутренними сервисами.
+
+    Структура ответа та же, что в JSON; даты, Decimal и другие типы, которых нет в MessagePack,
+    преобразуются энкодером DRF так же, как для JSON.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONRenderer.encoder_class().default, use_bin_type=True)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Рендерер в формат NDJSON (один JSON-объект на строку).
+
+    Список превращается в набор строк, любой другой объект — в одну строку.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(render_line(item) for item in items)
+
+
+_json_renderer = FastJSONRenderer()
+
+
+def render_line(item):
+    """
+    Компактный JSON одного объекта с переводом строки в конце.
+    """
+    return _json_renderer.render(item) + b'\n'
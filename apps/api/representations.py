@@ -0,0 +1,253 @@
+from functools import cached_property
+from itertools import islice
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from .catalog import breed_catalog
+from .serializers import DogSerializer, BreedSerializer
+
+# Поля, у которых to_representation не меняет значение, прочитанное из базы.
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+
+class ReadOnlyRepresentation:
+    """
+    Быстрое представление объектов для GET-ответов в обход механики ModelSerializer.
+
+    По полям сериализатора один раз строится план: какие колонки читать через `.values_list()`
+    и в каком порядке раскладывать их по ключам. Строка базы превращается в словарь без создания
+    экземпляров модели и сериализаторов, а результат совпадает с `serializer.data` вплоть до
+    порядка ключей, поэтому JSON получается байт-в-байт таким же.
+
+    Вложенные объекты из `related` не читаются через JOIN: из базы берётся только внешний ключ,
+    а готовое представление подставляется из кэша справочника.
+
+    Атрибуты:
+        serializer_class (Serializer): Сериализатор, по полям которого строится план.
+        related (dict): Кэши справочников по источнику вложенного поля, например {'breed': breed_catalog}.
+        fieldset (dict): Выбранные поля, {имя: None или кортеж полей вложенного объекта}; None — все поля.
+        План читает только колонки выбранных полей (см. `sparse`).
+    """
+
+    def __init__(self, serializer_class, related=None, fieldset=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.related = related or {}
+        self.fieldset = fieldset
+        self.sparse_representations = {}
+
+    @cached_property
+    def plan(self):
+        columns = []
+        builder = self.compile(self.serializer_class().fields, '', columns, self.fieldset)
+        return tuple(columns), builder
+
+    @cached_property
+    def available_fields(self):
+        """
+        Поля представления: {имя: None или кортеж полей вложенного объекта} в порядке сериализатора.
+        """
+        return {
+            name: tuple(sub for sub, nested in field.fields.items() if not nested.write_only)
+            if isinstance(field, serializers.BaseSerializer) else None
+            for name, field in self.serializer_class().fields.items() if not field.write_only
+        }
+
+    def sparse(self, fieldset):
+        """
+        Представление только с полями `fieldset` ({имя: None или кортеж полей вложенного объекта}).
+
+        Поля раскладываются в порядке сериализатора, поэтому одинаковые наборы дают одно представление;
+        представления кэшируются, и план каждого набора строится один раз.
+        """
+        key = tuple(
+            (name, None if fieldset[name] is None else tuple(sub for sub in nested if sub in fieldset[name]))
+            for name, nested in self.available_fields.items() if name in fieldset
+        )
+        representation = self.sparse_representations.get(key)
+        if representation is None:
+            representation = ReadOnlyRepresentation(self.serializer_class, self.related, dict(key))
+            self.sparse_representations[key] = representation
+        return representation
+
+    @property
+    def columns(self):
+        """
+        Колонки для `.values_list()` в порядке, ожидаемом планом.
+        """
+        return self.plan[0]
+
+    def compile(self, fields, prefix, columns, fieldset=None):
+        """
+        Собирает функцию "строка -> словарь" для набора полей сериализатора.
+
+        Индексы колонок дописываются в `columns`; вложенные сериализаторы компилируются
+        рекурсивно с префиксом связи (например, 'breed__'). Если задан `fieldset`, в план попадают
+        только его поля, а из вложенных объектов — только перечисленные в нём поля.
+        """
+        keys = []
+        plain_indexes = []
+        nested = []
+        cached = []
+        converters = []
+
+        for name, field in fields.items():
+            if field.write_only or (fieldset is not None and name not in fieldset):
+                continue
+            subset = fieldset[name] if fieldset is not None else None
+            position = len(keys)
+            keys.append(name)
+            if isinstance(field, serializers.BaseSerializer) and not prefix and field.source in self.related:
+                cached.append((position, len(columns), (field.source, subset)))
+                columns.append(field.source)
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                subfields = field.fields
+                if subset is not None:
+                    subfields = {sub: subfields[sub] for sub in subset}
+                nested.append((position, self.compile(subfields, f'{prefix}{field.source}__', columns)))
+                continue
+            if isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                raise ImproperlyConfigured(f'Поле {name!r} не поддерживается быстрым представлением.')
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f'Источник {field.source!r} не поддерживается быстрым представлением.')
+
+            plain_indexes.append(len(columns))
+            columns.append(f'{prefix}{field.source}')
+            if type(field) not in PASSTHROUGH_FIELDS and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                converters.append((position, field.to_representation))
+
+        keys = tuple(keys)
+        if not plain_indexes:
+            getter = lambda row: ()  # noqa: E731
+        elif len(plain_indexes) == 1:
+            single = itemgetter(plain_indexes[0])
+            getter = lambda row: (single(row),)  # noqa: E731
+        else:
+            getter = itemgetter(*plain_indexes)
+
+        inserts = sorted(
+            [(position, nested_build, None) for position, nested_build in nested]
+            + [(position, index, source) for position, index, source in cached],
+            key=itemgetter(0)
+        )
+
+        def build(row, related):
+            values = list(getter(row))
+            for position, target, source in inserts:
+                if source is None:
+                    values.insert(position, target(row, related))
+                    continue
+                source, subset = source
+                item = related[source][row[target]]
+                values.insert(position, item if subset is None else {sub: item[sub] for sub in subset})
+            for position, to_representation in converters:
+                if values[position] is not None:
+                    values[position] = to_representation(values[position])
+            return dict(zip(keys, values))
+
+        return build
+
+    def values(self, queryset, *extra):
+        """
+        Выборка строк в виде кортежей колонок плана. Колонки `extra` добавляются в конец строки
+        и в представление не попадают.
+        """
+        return queryset.values_list(*self.columns, *extra)
+
+    def from_instance(self, instance):
+        """
+        Представление уже загруженного объекта модели (например, возвращённого UPDATE ... RETURNING).
+        """
+        opts = self.model._meta
+        return self.to_representation(tuple(getattr(instance, opts.get_field(column).attname)
+                                            for column in self.columns))
+
+    def get_related(self, refresh=False):
+        """
+        Представления вложенных объектов из кэшей справочников.
+        """
+        return {source: catalog.snapshot(refresh).representation_by_id for source, catalog in self.related.items()}
+
+    async def aget_related(self, refresh=False):
+        return {source: (await catalog.asnapshot(refresh)).representation_by_id
+                for source, catalog in self.related.items()}
+
+    def to_representation(self, row):
+        return self.many([row])[0]
+
+    async def ato_representation(self, row):
+        return (await self.amany([row]))[0]
+
+    def many(self, rows):
+        """
+        Представления списка строк. Если строка ссылается на запись, которой ещё нет в кэше справочника
+        (например, её создал другой процесс), справочник перечитывается один раз.
+        """
+        build = self.plan[1]
+        related = self.get_related()
+        try:
+            return [build(row, related) for row in rows]
+        except KeyError:
+            related = self.get_related(refresh=True)
+            return [build(row, related) for row in rows]
+
+    async def amany(self, rows):
+        """
+        Асинхронный вариант `many`: справочники читаются без блокировки цикла событий.
+        """
+        build = self.plan[1]
+        related = await self.aget_related()
+        try:
+            return [build(row, related) for row in rows]
+        except KeyError:
+            related = await self.aget_related(refresh=True)
+            return [build(row, related) for row in rows]
+
+    def get(self, queryset, **lookup):
+        """
+        Представление одного объекта или None, если объект не найден.
+        """
+        row = self.values(queryset.filter(**lookup)).first()
+        return None if row is None else self.to_representation(row)
+
+    def iterator(self, queryset, chunk_size):
+        """
+        Потоковое чтение выборки курсором с построением представлений по одной строке.
+        """
+        build = self.plan[1]
+        related = self.get_related()
+        for row in self.values(queryset).iterator(chunk_size=chunk_size):
+            try:
+                yield build(row, related)
+            except KeyError:
+                related = self.get_related(refresh=True)
+                yield build(row, related)
+
+    async def aiterator(self, queryset, chunk_size):
+        """
+        Асинхронный вариант `iterator`.
+
+        Пачки по `chunk_size` строк читаются из курсора в потоке: `QuerySet.aiterator()` для
+        `.values_list()` в Django 5.0 выполняет запрос прямо в цикле событий.
+        """
+        build = self.plan[1]
+        related = await self.aget_related()
+        rows = self.values(queryset).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = await sync_to_async(list)(islice(rows, chunk_size))
+            for row in chunk:
+                try:
+                    yield build(row, related)
+                except KeyError:
+                    related = await self.aget_related(refresh=True)
+                    yield build(row, related)
+            if len(chunk) < chunk_size:
+                break
+
+
+dog_representation = ReadOnlyRepresentation(DogSerializer, related={'breed': breed_catalog})
+breed_representation = ReadOnlyRepresentation(BreedSerializer)
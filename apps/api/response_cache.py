@@ -0,0 +1,199 @@
+import hashlib
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .routers import use_primary
+
+# Теги, от которых зависят закэшированные ответы. Запись сбрасывает теги изменённых объектов,
+# и все ответы, сохранённые с прежними версиями этих тегов, перестают считаться актуальными.
+DOG = 'dog:{}'
+ALL_DOGS = 'dog:*'
+DOGS = 'dogs'
+BREED = 'breed:{}'
+BREEDS = 'breeds'
+BREED_COUNTS = 'breed-counts'
+
+
+class ResponseCache:
+    """
+    Общий кэш отрисованных GET-ответов API в кэше Django (`API_RESPONSE_CACHE_ALIAS`).
+
+    Ключ ответа — путь со строкой запроса и формат ответа, значение — байты тела, заголовки и версии
+    тегов, от которых зависит ответ (например, `dog:42` и `breeds` для собаки). Версии тегов хранятся
+    в том же кэше и читаются вместе с ответом одним `get_many` до выполнения контроллера, поэтому ответ,
+    прочитанный из базы одновременно с записью, сохраняется уже с устаревшими версиями. Сброс тега — удаление
+    его версии после коммита транзакции; следующий запрос создаёт новую уникальную версию.
+
+    Работает с любым бэкендом кэша Django, включая локальную память и Redis. Счётчики попаданий
+    и промахов хранятся в том же кэше и общие для всех воркеров.
+    """
+    prefix = 'api:response'
+
+    @property
+    def cache(self):
+        alias = settings.API_RESPONSE_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def response_key(self, request):
+        digest = hashlib.sha1(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+        return f'{self.prefix}:{digest}:{request.accepted_renderer.format}'
+
+    def tag_key(self, tag):
+        return f'{self.prefix}:tag:{tag}'
+
+    def lookup(self, request, tags):
+        """
+        Закэшированный ответ или None и версии тегов, с которыми нужно сохранить новый ответ.
+        """
+        cache = self.cache
+        key = self.response_key(request)
+        values = cache.get_many([key, *map(self.tag_key, tags)])
+        versions = {tag: values.get(self.tag_key(tag)) for tag in tags}
+        missing = [tag for tag, version in versions.items() if version is None]
+        if missing:
+            # Начальная версия уникальна, чтобы ответ со сброшенной версией тега не стал снова актуальным.
+            for tag in missing:
+                cache.add(self.tag_key(tag), time.time_ns(), timeout=None)
+            created = cache.get_many([self.tag_key(tag) for tag in missing])
+            versions.update({tag: created.get(self.tag_key(tag)) for tag in missing})
+
+        entry = values.get(key)
+        if entry is not None and not missing and entry['versions'] == versions:
+            self.count('hits')
+            return self.cached_response(request, entry), versions
+        self.count('misses')
+        return None, versions
+
+    def cached_response(self, request, entry):
+        headers = entry['headers']
+        etag = headers.get('ETag')
+        last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(entry['content'], status=entry['status'], headers=headers)
+        elif response.status_code == 304:
+            for header in ('ETag', 'Last-Modified'):
+                if header in headers:
+                    response[header] = headers[header]
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def store_on_render(self, request, response, versions):
+        """
+        Сохраняет ответ 200 после отрисовки. Потоковые ответы и ответы с cookie не кэшируются.
+        """
+        if not isinstance(response, SimpleTemplateResponse) or response.status_code != 200 or response.cookies:
+            return response
+        key = self.response_key(request)
+        timeout = settings.API_RESPONSE_CACHE_TIMEOUT
+
+        def store(rendered):
+            headers = {name: value for name, value in rendered.items() if name != 'X-Cache'}
+            entry = {'status': rendered.status_code, 'content': rendered.content, 'headers': headers,
+                     'versions': versions}
+            self.cache.set(key, entry, timeout)
+
+        response['X-Cache'] = 'MISS'
+        response.add_post_render_callback(store)
+        return response
+
+    def count(self, name):
+        cache = self.cache
+        key = f'{self.prefix}:{name}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+
+    def stats(self):
+        """
+        Число попаданий и промахов со времени последнего сброса счётчиков.
+        """
+        cache = self.cache
+        if cache is None:
+            return {'enabled': False, 'hits': 0, 'misses': 0}
+        values = cache.get_many([f'{self.prefix}:hits', f'{self.prefix}:misses'])
+        return {
+            'enabled': True,
+            'hits': values.get(f'{self.prefix}:hits', 0),
+            'misses': values.get(f'{self.prefix}:misses', 0),
+        }
+
+    def reset_stats(self):
+        if self.cache is not None:
+            self.cache.delete_many([f'{self.prefix}:hits', f'{self.prefix}:misses'])
+
+    def invalidate(self, tags, using=None):
+        """
+        Сбрасывает теги после коммита текущей транзакции (или сразу вне транзакции).
+
+        До коммита другие запросы читают из базы прежние данные, поэтому сброс раньше коммита
+        позволил бы им снова закэшировать устаревший ответ с новой версией тега.
+        """
+        if self.cache is None or not tags:
+            return
+        keys = [self.tag_key(tag) for tag in tags]
+        transaction.on_commit(lambda: self.cache.delete_many(keys), using=using)
+
+
+response_cache = ResponseCache()
+
+
+def is_cacheable(request):
+    return request.method == 'GET' and response_cache.cache is not None
+
+
+def cache_response(*tags, unless=None):
+    """
+    Кэширует ответы GET-обработчика контроллера в общем кэше ответов.
+
+    `tags` — теги, от которых зависит ответ; в них подставляются аргументы из URL, например 'dog:{dog_id}'.
+    `unless(request)` отключает кэш для запроса, например для потоковой выдачи. Декоратор применяется
+    к методам обработчиков после согласования формата ответа, так что ключ учитывает формат.
+    Поддерживаются и синхронные, и асинхронные обработчики. При промахе ответ читается с основной базы:
+    прочитанный с отстающей реплики, он оставался бы в кэше устаревшим до истечения срока жизни.
+    """
+    def get_tags(kwargs):
+        return [tag.format(**kwargs) for tag in tags]
+
+    def skip(request):
+        return not is_cacheable(request) or (unless is not None and unless(request))
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @wraps(method)
+            async def async_handler(self, request, *args, **kwargs):
+                if skip(request):
+                    return await method(self, request, *args, **kwargs)
+                cached, versions = await sync_to_async(response_cache.lookup)(request, get_tags(kwargs))
+                if cached is not None:
+                    return cached
+                use_primary()
+                response = await method(self, request, *args, **kwargs)
+                return response_cache.store_on_render(request, response, versions)
+            return async_handler
+
+        @wraps(method)
+        def handler(self, request, *args, **kwargs):
+            if skip(request):
+                return method(self, request, *args, **kwargs)
+            cached, versions = response_cache.lookup(request, get_tags(kwargs))
+            if cached is not None:
+                return cached
+            use_primary()
+            response = method(self, request, *args, **kwargs)
+            return response_cache.store_on_render(request, response, versions)
+        return handler
+
+    return decorator
@@ -0,0 +1,92 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Выбор базы для текущего запроса: None вне запроса (команды, shell), иначе ReplicaState.
+# В переменной хранится изменяемый объект, поэтому запись в потоке sync_to_async видна асинхронному коду запроса.
+_state = ContextVar('api_replica_state', default=None)
+
+
+class ReplicaState:
+    """
+    Выбор базы в пределах одного запроса.
+
+    Атрибуты:
+        pinned (bool): Чтение идёт с основной базы — запрос изменяет данные или клиент недавно их изменял.
+        wrote (bool): Запрос писал в базу; клиент будет читать с основной базы `DB_REPLICA_PIN_SECONDS` секунд.
+        replica (str): Реплика, выбранная для запроса; все чтения запроса идут с неё.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def begin_request(pinned):
+    return _state.set(ReplicaState(pinned))
+
+
+def end_request(token):
+    """
+    Завершает выбор базы для запроса и возвращает, писал ли запрос в базу.
+    """
+    state = _state.get()
+    _state.reset(token)
+    return state.wrote
+
+
+def use_primary():
+    """
+    Направляет оставшиеся чтения текущего запроса на основную базу.
+    """
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def choose_replica(replicas):
+    return random.choices(list(replicas), weights=list(replicas.values()))[0]
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на реплики из `DATABASE_REPLICAS` ({алиас: вес}), а запись — на основную базу.
+
+    Реплика выбирается случайно с учётом весов, один раз на запрос, чтобы страница и её курсор читались
+    из одного снимка. С основной базы читаются: запросы, изменяющие данные (не GET/HEAD/OPTIONS), чтения
+    после записи в том же запросе, запросы клиента в течение `DB_REPLICA_PIN_SECONDS` после его записи
+    (см. ReplicaPinningMiddleware), чтения внутри транзакции основной базы и чтения вне запроса (команды, shell,
+фоновые задачи), которые не должны видеть отставание реплики. Без реплик роутер ничего не меняет.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = choose_replica(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему репликацией с основной базы.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, CharField, F, IntegerField, Q, Value, When
+from django.db.models.lookups import IContains
+from rest_framework import serializers
+from rest_framework.pagination import _positive_int
+
+SEARCH_PARAM = 'q'
+
+
+def is_search_requested(request):
+    return SEARCH_PARAM in request.query_params
+
+
+def get_search_query(request):
+    query = request.query_params[SEARCH_PARAM].strip()
+    if not query:
+        raise serializers.ValidationError({SEARCH_PARAM: ['Пустой поисковый запрос.']})
+    return query
+
+
+def get_search_limit(request):
+    """
+    Число результатов поиска из параметра `?limit=`, ограниченное сверху `API_SEARCH_MAX_RESULTS`.
+    """
+    try:
+        return _positive_int(request.query_params['limit'], strict=True, cutoff=settings.API_SEARCH_MAX_RESULTS)
+    except (KeyError, ValueError):
+        return settings.API_SEARCH_RESULTS
+
+
+@CharField.register_lookup
+class TrigramIContains(IContains):
+    """
+    Вхождение подстроки без учёта регистра, которое может выполнить GIN-индекс триграмм.
+
+    Django компилирует `icontains` на PostgreSQL в `UPPER(field::text) LIKE UPPER(%s)`, а индекс
+    `gin_trgm_ops` по самому полю обслуживает только `LIKE`/`ILIKE` по нему; здесь это `field ILIKE '%q%'`.
+    На других бэкендах — обычный `icontains`.
+    """
+    lookup_name = 'trigram_icontains'
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', (*lhs_params, *rhs_params)
+
+
+def match_rank(field, query):
+    """
+    Ранг совпадения: точное (2), с начала (1), остальные (0).
+    """
+    return Case(
+        When(**{f'{field}__iexact': query}, then=Value(2)),
+        When(**{f'{field}__istartswith': query}, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def supports_trigram_search(connection):
+    return connection.vendor == 'postgresql' and settings.API_SEARCH_TRIGRAM
+
+
+def ranked_search(queryset, field, query, limit):
+    """
+    Ранжированный поиск по текстовому полю для подсказок при вводе. Запрос не выполняется.
+
+    Результаты упорядочены по рангу: точное совпадение, затем совпадение с начала, затем остальные.
+    На PostgreSQL с расширением pg_trgm отбираются строки, где запрос похож на слово в поле
+    (`field %> query`) или входит в него (`field ILIKE '%query%'`, см. TrigramIContains); оба условия
+    выполняются по GIN-индексу триграмм, а внутри ранга строки упорядочены по `word_similarity`.
+    На других бэкендах отбираются строки, в которые запрос входит (`icontains`).
+    """
+    if supports_trigram_search(connections[queryset.db]):
+        queryset = queryset.filter(
+            Q(TrigramWordSimilar(F(field), Value(query))) | Q(**{f'{field}__trigram_icontains': query})
+        ).alias(search_rank=match_rank(field, query), search_similarity=TrigramWordSimilarity(query, field))
+        return queryset.order_by('-search_rank', '-search_similarity', field, 'id')[:limit]
+    queryset = queryset.filter(**{f'{field}__icontains': query}).alias(search_rank=match_rank(field, query))
+    return queryset.order_by('-search_rank', field, 'id')[:limit]
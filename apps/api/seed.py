@@ -0,0 +1,88 @@
+import random
+from itertools import accumulate, cycle
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .catalog import breed_catalog
+from .imports import load_dogs
+from .models import Breed
+from .response_cache import BREEDS, response_cache
+
+BREED_NAMES = (
+    'Labrador Retriever', 'German Shepherd', 'Golden Retriever', 'French Bulldog', 'Bulldog', 'Poodle', 'Beagle',
+    'Rottweiler', 'Dachshund', 'Yorkshire Terrier', 'Boxer', 'Siberian Husky', 'Shih Tzu', 'Doberman Pinscher',
+    'Great Dane', 'Miniature Schnauzer', 'Pomeranian', 'Border Collie', 'Chihuahua', 'Shetland Sheepdog',
+    'Cavalier King Charles Spaniel', 'Pembroke Welsh Corgi', 'Australian Shepherd', 'Bernese Mountain Dog',
+    'Boston Terrier', 'Maltese', 'Cocker Spaniel', 'Akita', 'Shiba Inu', 'Samoyed', 'Jack Russell Terrier',
+    'Dalmatian', 'Weimaraner', 'Basset Hound', 'Newfoundland', 'Saint Bernard', 'Whippet', 'Bichon Frise',
+    'Vizsla', 'Alaskan Malamute', 'Русская псовая борзая', 'Русский той', 'Восточноевропейская овчарка',
+    'Московская сторожевая', 'Западносибирская лайка',
+)
+DOG_NAMES = (
+    'Max', 'Bella', 'Charlie', 'Luna', 'Lucy', 'Cooper', 'Daisy', 'Buddy', 'Rocky', 'Molly', 'Bailey', 'Sadie',
+    'Milo', 'Lola', 'Tucker', 'Zoe', 'Bear', 'Stella', 'Duke', 'Roxy', 'Teddy', 'Coco', 'Oliver', 'Ruby', 'Rex',
+    'Leo', 'Nala', 'Zeus', 'Penny', 'Jack', 'Шарик', 'Бобик', 'Жучка', 'Тузик', 'Рекс', 'Белка', 'Стрелка',
+    'Дружок', 'Лайка', 'Мухтар', 'Найда', 'Барон', 'Графиня', 'Пират', 'Ася',
+)
+GENDERS = ('Male', 'Female')
+COLORS = ('Black', 'White', 'Brown', 'Golden', 'Cream', 'Grey', 'Red', 'Black and White', 'Brindle', 'Merle', 'Tricolor')
+FOODS = ('Chicken', 'Beef', 'Lamb', 'Fish', 'Turkey', 'Rice', 'Carrots', 'Cheese', 'Peanut butter', 'Мясо')
+TOYS = ('Ball', 'Frisbee', 'Rope', 'Squeaky toy', 'Stick', 'Plush toy', 'Chew bone', 'Tug toy', 'Мяч')
+# Возраст от 0 до 16 лет: молодых собак больше, чем старых.
+AGES = tuple(range(17))
+AGE_WEIGHTS = (6, 10, 10, 9, 9, 8, 8, 7, 6, 5, 4, 3, 2, 2, 1, 1, 1)
+
+
+def make_breeds(count, rng):
+    """
+    Несохранённые породы: настоящие названия, при нехватке — с номером.
+    """
+    names = [name if i < len(BREED_NAMES) else f'{name} {i // len(BREED_NAMES) + 1}'
+             for i, name in zip(range(count), cycle(BREED_NAMES))]
+    return [
+        Breed(name=name, size=rng.choice('TSML'), friendliness=rng.randint(1, 5), trainability=rng.randint(1, 5),
+              shedding_amount=rng.randint(1, 5), exercise_needs=rng.randint(1, 5))
+        for name in names
+    ]
+
+
+def dog_chunks(count, breed_ids, rng, chunk_size):
+    """
+    Пачки по `chunk_size` кортежей значений `IMPORT_FIELDS` для `count` собак.
+
+    Популярность пород неравномерна, как в реальных реестрах: вес породы убывает с её номером (закон Ципфа),
+    поэтому есть и породы с большим числом собак, и редкие.
+    """
+    breed_weights = list(accumulate(1 / rank for rank in range(1, len(breed_ids) + 1)))
+    age_weights = list(accumulate(AGE_WEIGHTS))
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        yield list(zip(
+            rng.choices(DOG_NAMES, k=size),
+            rng.choices(AGES, cum_weights=age_weights, k=size),
+            rng.choices(GENDERS, k=size),
+            rng.choices(COLORS, k=size),
+            rng.choices(FOODS, k=size),
+            rng.choices(TOYS, k=size),
+            rng.choices(breed_ids, cum_weights=breed_weights, k=size),
+        ))
+
+
+def seed_dogs(dogs, breeds, using=DEFAULT_DB_ALIAS, chunk_size=10000, seed=None):
+    """
+    Создаёт `breeds` пород и `dogs` собак со случайными правдоподобными данными и возвращает число созданных
+    собак. Без новых пород собаки распределяются по существующим. Собаки загружаются как при `import_dogs`:
+    на PostgreSQL через COPY, на других бэкендах — `executemany` пачками по `chunk_size`.
+    При одинаковом `seed` данные одинаковые.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic(using=using):
+        if breeds:
+            Breed.objects.using(using).bulk_create(make_breeds(breeds, rng), batch_size=chunk_size)
+            # bulk_create не отправляет post_save, поэтому кэши пород сбрасываются явно.
+            breed_catalog.invalidate()
+            response_cache.invalidate([BREEDS], using=using)
+        breed_ids = list(Breed.objects.using(using).order_by('pk').values_list('pk', flat=True))
+        if dogs and not breed_ids:
+            raise ValueError('Нет пород для собак: укажите число пород.')
+        return load_dogs(dog_chunks(dogs, breed_ids, rng, chunk_size), using) if dogs else 0
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .catalog import breed_catalog
 from .models import Dog, Breed
 
 
@@ -7,19 +8,54 @@ class BreedSerializer(serializers.ModelSerializer):
     Сериализатор для модели Breed.
 
     Этот сериализатор преобразует объекты модели Breed в JSON формат и обратно.
-    Он включает все поля модели Breed.
+    Он включает все поля модели Breed, кроме служебных полей версии; число собак породы (dog_count)
+    только для чтения.
 
     Вложенный класс Meta определяет модель и поля для сериализации.
 
     Атрибуты:
         model (Model): Модель, используемая для сериализации.
-        fields (str): Поля, которые должны быть включены в сериализацию. '__all__' означает, что все поля модели
-        включены.
+        exclude (list): Служебные поля, которые не включаются в сериализацию; версия объекта
+        передаётся в заголовках ETag и Last-Modified.
     """
 
     class Meta:
         model = Breed
-        fields = '__all__'
+        exclude = ['version', 'updated_at']
+
+
+class NestedBreedSerializer(BreedSerializer):
+    """
+    Порода во вложенном представлении собаки и в кэше справочника пород — без числа собак.
+
+    Счётчик меняется при каждой записи собак породы; в представлении собаки он сделал бы ETag собаки
+    зависящим от других собак, а кэш справочника — устаревшим. Эндпоинты пород добавляют его из базы.
+    """
+
+    class Meta(BreedSerializer.Meta):
+        exclude = ['version', 'updated_at', 'dog_count']
+
+
+class BreedIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле внешнего ключа на Breed, которое проверяет ID по кэшу справочника пород, а не запросом к базе.
+
+    Массовые операции передают в контексте `breeds` — заранее подготовленные породы по ID,
+    чтобы все элементы запроса проверялись по одному снимку справочника.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(str(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        breeds = self.context.get('breeds')
+        breed = breeds.get(pk) if breeds is not None else breed_catalog.get(pk)
+        if breed is None:
+            self.fail('does_not_exist', pk_value=data)
+        return breed
 
 
 class DogSerializer(serializers.ModelSerializer):
@@ -31,7 +67,7 @@ class DogSerializer(serializers.ModelSerializer):
 
     Атрибуты:
         breed (Serializer): Вложенный сериализатор для отображения данных модели Breed.
-        breed_id (PrimaryKeyRelatedField): Поле внешнего ключа для создания или обновления связанного объекта Breed.
+        breed_id (BreedIdField): Поле внешнего ключа для создания или обновления связанного объекта Breed.
 
     Вложенный класс Meta определяет модель и поля для сериализации.
 
@@ -39,8 +75,8 @@ class DogSerializer(serializers.ModelSerializer):
         model (Model): Модель, используемая для сериализации.
         fields (list): Список полей, которые должны быть включены в сериализацию.
     """
-    breed = BreedSerializer(read_only=True)
-    breed_id = serializers.PrimaryKeyRelatedField(queryset=Breed.objects.all(), source='breed')
+    breed = NestedBreedSerializer(read_only=True)
+    breed_id = BreedIdField(queryset=Breed.objects.all(), source='breed')
 
     class Meta:
         model = Dog
@@ -0,0 +1,70 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import breed_catalog
+from .models import Breed, Dog, dog_counts_changed, dogs_changed
+from .query_budget import install_query_counter
+from .response_cache import ALL_DOGS, BREED, BREED_COUNTS, BREEDS, DOG, DOGS, response_cache
+
+
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+def invalidate_breed_catalog(sender, **kwargs):
+    """
+    Сбрасывает кэш справочника пород при изменении или удалении породы.
+    """
+    breed_catalog.invalidate()
+
+
+@receiver(post_save, sender=Breed)
+def invalidate_breed_responses(sender, instance, using, **kwargs):
+    """
+    Сбрасывает закэшированные ответы с породой: её карточку, списки пород и собак с вложенной породой.
+    """
+    response_cache.invalidate([BREEDS, BREED.format(instance.pk)], using=using)
+
+
+@receiver(post_delete, sender=Breed)
+def invalidate_deleted_breed_responses(sender, instance, using, **kwargs):
+    """
+    Удаление породы каскадно удаляет её собак, поэтому сбрасываются и все ответы с собаками.
+    """
+    response_cache.invalidate([BREEDS, BREED.format(instance.pk), DOGS, ALL_DOGS], using=using)
+
+
+@receiver(post_save, sender=Dog)
+def invalidate_dog_responses(sender, instance, using, **kwargs):
+    """
+    Сбрасывает закэшированные карточку собаки и списки собак.
+
+    Удаление собак (и `Dog.delete()`) сообщает о себе сигналом `dogs_changed`: получатель post_delete
+    лишил бы удаление быстрого пути и добавил бы чтение удаляемых строк целиком.
+    """
+    response_cache.invalidate([DOGS, DOG.format(instance.pk)], using=using)
+
+
+@receiver(dogs_changed, sender=Dog)
+def invalidate_bulk_dog_responses(sender, using, pks, **kwargs):
+    """
+    Сбрасывает ответы с собаками после массовых операций; без списка ID — карточки всех собак.
+    """
+    dog_tags = [ALL_DOGS] if pks is None else [DOG.format(pk) for pk in pks]
+    response_cache.invalidate([DOGS, *dog_tags], using=using)
+
+
+@receiver(dog_counts_changed, sender=Breed)
+def invalidate_breed_count_responses(sender, using, breed_ids, **kwargs):
+    """
+    Сбрасывает ответы с числом собак пород: списки пород и карточки пород с изменившимися счётчиками.
+    """
+    breed_tags = [BREEDS] if breed_ids is None else [BREED.format(breed_id) for breed_id in breed_ids]
+    response_cache.invalidate([BREED_COUNTS, *breed_tags], using=using)
+
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    """
+    Подключает к новому соединению счётчик SQL-запросов QueryBudgetMiddleware.
+    """
+    install_query_counter(connection)
@@ -0,0 +1,87 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+from .models import BreedStat, Dog
+
+
+def stat_rows():
+    """
+    Непустые счётчики сводной таблицы: (breed_id, dimension, value, count). Запрос не выполняется.
+    """
+    return BreedStat.objects.filter(count__gt=0).order_by('breed_id', 'dimension', 'value').values_list(
+        'breed_id', 'dimension', 'value', 'count'
+    )
+
+
+def has_unknown_breeds(snapshot, rows):
+    """
+    Есть ли в счётчиках порода, которой нет в снимке справочника, — тогда снимок нужно перечитать.
+    """
+    return not snapshot.by_id.keys() >= {row[0] for row in rows}
+
+
+def empty_stats(breed):
+    return {
+        'breed_id': breed.pk,
+        'name': breed.name,
+        'dog_count': 0,
+        'age': {'min': None, 'max': None, 'mean': None, 'distribution': {}},
+        'gender': {},
+        'color': {},
+    }
+
+
+def build_breed_stats(snapshot, rows):
+    """
+    Статистика по каждой породе снимка справочника, в порядке справочника.
+
+    Число собак породы — сумма счётчиков по полу: каждая собака входит ровно в один из них.
+    Породы без собак тоже попадают в ответ, с нулевым числом собак.
+    """
+    stats = {breed.pk: empty_stats(breed) for breed in snapshot.breeds}
+    ages = {}
+    for breed_id, dimension, value, count in rows:
+        breed_stats = stats.get(breed_id)
+        if breed_stats is None:
+            # Порода удалена между чтением счётчиков и снимка справочника.
+            continue
+        if dimension == 'age':
+            ages.setdefault(breed_id, []).append((int(value), count))
+        else:
+            breed_stats[dimension][value] = count
+            if dimension == 'gender':
+                breed_stats['dog_count'] += count
+
+    for breed_id, buckets in ages.items():
+        buckets.sort()
+        total = sum(count for _, count in buckets)
+        stats[breed_id]['age'] = {
+            'min': buckets[0][0],
+            'max': buckets[-1][0],
+            'mean': round(sum(age * count for age, count in buckets) / total, 2),
+            'distribution': {str(age): count for age, count in buckets},
+        }
+    return list(stats.values())
+
+
+def rebuild_breed_stats(using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает сводную таблицу целиком по таблице собак и возвращает число записей.
+
+    Нужна на бэкендах без триггеров (их создаёт миграция 0007 только для PostgreSQL и SQLite),
+    а также для исправления расхождений после ручного вмешательства в базу. На PostgreSQL таблица собак
+    на время пересчёта блокируется от записи, чтобы триггеры не изменили счётчики между чтением и вставкой.
+    """
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Dog._meta.db_table)} IN SHARE MODE')
+        BreedStat.objects.using(using).all().delete()
+        stats = []
+        for dimension, _ in BreedStat.DIMENSIONS:
+            counts = Dog.objects.using(using).order_by().values_list('breed_id', dimension).annotate(count=Count('id'))
+            stats.extend(BreedStat(breed_id=breed_id, dimension=dimension, value=str(value), count=count)
+                         for breed_id, value, count in counts)
+        BreedStat.objects.using(using).bulk_create(stats, batch_size=1000)
+    return len(stats)
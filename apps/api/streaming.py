@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import NDJSONRenderer, render_line
+
+STREAM_PARAM_VALUES = ('1', 'true', 'yes')
+
+
+def is_stream_requested(request):
+    """
+    Проверяет, запрошен ли потоковый ответ: параметром `?stream=1` или заголовком
+    `Accept: application/x-ndjson`.
+    """
+    if request.query_params.get('stream', '').lower() in STREAM_PARAM_VALUES:
+        return True
+    return request.accepted_renderer.format == NDJSONRenderer.format
+
+
+def iter_ndjson(items, chunk_size):
+    """
+    Отдаёт строки NDJSON пачками по `chunk_size` объектов.
+    """
+    buffer = []
+    for item in items:
+        buffer.append(render_line(item))
+        if len(buffer) >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+    if buffer:
+        yield b''.join(buffer)
+
+
+async def aiter_ndjson(items, chunk_size):
+    """
+    Асинхронный вариант `iter_ndjson` для асинхронного итератора объектов.
+    """
+    buffer = []
+    async for item in items:
+        buffer.append(render_line(item))
+        if len(buffer) >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_json_array(items, chunk_size):
+    """
+    Отдаёт JSON-массив по частям, не собирая его целиком в памяти.
+    """
+    yield b'['
+    separator = b''
+    for chunk in iter_ndjson(items, chunk_size):
+        yield separator + chunk.rstrip(b'\n').replace(b'\n', b',')
+        separator = b','
+    yield b']'
+
+
+async def aiter_json_array(items, chunk_size):
+    yield b'['
+    separator = b''
+    async for chunk in aiter_ndjson(items, chunk_size):
+        yield separator + chunk.rstrip(b'\n').replace(b'\n', b',')
+        separator = b','
+    yield b']'
+
+
+def streaming_response(request, queryset, representation):
+    """
+    Потоковый ответ со всеми объектами выборки.
+
+    Строки читаются курсором (на PostgreSQL — серверным) по `API_STREAM_CHUNK_SIZE` штук
+    и отправляются клиенту по мере сериализации, поэтому память воркера не растёт
+    вместе с размером таблицы.
+    """
+    chunk_size = settings.API_STREAM_CHUNK_SIZE
+    items = representation.iterator(queryset, chunk_size)
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        content = iter_ndjson(items, chunk_size)
+        content_type = NDJSONRenderer.media_type
+    else:
+        content = iter_json_array(items, chunk_size)
+        content_type = JSONRenderer.media_type
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def astreaming_response(request, queryset, representation):
+    """
+    Потоковый ответ для асинхронных контроллеров: строки читаются `aiterator()` асинхронного ORM,
+    и ASGI-сервер отправляет части ответа, не занимая поток.
+    """
+    chunk_size = settings.API_STREAM_CHUNK_SIZE
+    items = representation.aiterator(queryset, chunk_size)
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        content = aiter_ndjson(items, chunk_size)
+        content_type = NDJSONRenderer.media_type
+    else:
+        content = aiter_json_array(items, chunk_size)
+        content_type = JSONRenderer.media_type
+    return StreamingHttpResponse(content, content_type=content_type)
@@ -0,0 +1,157 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from apps.api.async_controllers import (AsyncBreedDetail, AsyncBreedList, AsyncBreedStatsList, AsyncDogDetail,
+                                        AsyncDogList, AsyncResponseCacheStats)
+from apps.api.catalog import breed_catalog
+from apps.api.models import Dog, Breed
+from apps.api.serializers import DogSerializer, BreedSerializer
+
+
+@override_settings(ROOT_URLCONF='apps.api.async_urls', API_STREAM_CHUNK_SIZE=2)
+class AsyncViewsTestCase(TestCase):
+    """
+    Тесты асинхронных контроллеров. Синхронный запрос к базе из цикла событий приводит
+    к SynchronousOnlyOperation, поэтому успешные ответы подтверждают, что чтение идёт через асинхронный ORM.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+        for i in range(3):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender='Male', color='Brown', favorite_food='Meat',
+                               favorite_toy='Ball', breed=self.breed)
+        self.dog = Dog.objects.order_by('id').first()
+        self.dog_url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        self.payload = {'name': 'Max', 'age': 4, 'gender': 'Male', 'color': 'Black', 'favorite_food': 'Fish',
+                        'favorite_toy': 'Rope', 'breed_id': self.breed.pk}
+        breed_catalog.snapshot()
+
+    def test_views_are_async(self):
+        for view in (AsyncDogList, AsyncDogDetail, AsyncBreedList, AsyncBreedDetail, AsyncBreedStatsList,
+                     AsyncResponseCacheStats):
+            self.assertTrue(view.view_is_async, view.__name__)
+
+    async def test_get_dog(self):
+        response = await self.async_client.get(self.dog_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), DogSerializer(await Dog.objects.select_related('breed').aget(pk=self.dog.pk)).data)
+
+        response = await self.async_client.get(self.dog_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Запросы асинхронного ORM выполняются в потоках sync_to_async, но учитываются QueryBudgetMiddleware.
+        response = await self.async_client.get(self.dog_url)
+        self.assertEqual(response['X-Query-Count'], '1')
+
+        response = await self.async_client.get(reverse('dog-detail', kwargs={'dog_id': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_list_dogs(self):
+        response = await self.async_client.get(reverse('dog-list') + '?limit=2')
+        self.assertEqual([dog['name'] for dog in response.json()], ['Dog 0', 'Dog 1'])
+        self.assertIn('rel="next"', response['Link'])
+
+        response = await self.async_client.get(reverse('dog-list') + '?limit=2',
+                                                headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_fields(self):
+        response = await self.async_client.get(reverse('dog-list') + '?fields=name&ordering=-age&limit=2')
+        self.assertEqual(response.json(), [{'name': 'Dog 2'}, {'name': 'Dog 1'}])
+        response = await self.async_client.get(self.dog_url + '?fields=id,breed.name')
+        self.assertEqual(response.json(), {'id': self.dog.pk, 'breed': {'name': 'Beagle'}})
+
+    async def test_search(self):
+        response = await self.async_client.get(reverse('dog-list') + '?q=dog%201')
+        self.assertEqual([dog['name'] for dog in response.json()][0], 'Dog 1')
+        response = await self.async_client.get(reverse('breed-list') + '?q=bea')
+        self.assertEqual([breed['name'] for breed in response.json()], ['Beagle'])
+
+    async def test_stream_dogs(self):
+        response = await self.async_client.get(reverse('dog-list') + '?stream=1')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([dog['name'] for dog in json.loads(content)], ['Dog 0', 'Dog 1', 'Dog 2'])
+
+    async def test_create_dog(self):
+        response = await self.async_client.post(reverse('dog-list'), self.payload, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['breed']['name'], 'Beagle')
+        self.assertEqual(await Dog.objects.acount(), 4)
+
+        response = await self.async_client.post(reverse('dog-list'), {**self.payload, 'breed_id': 999},
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_bulk_create_dogs(self):
+        response = await self.async_client.post(reverse('dog-list'), [self.payload, self.payload],
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Dog.objects.acount(), 5)
+
+    async def test_update_dog(self):
+        response = await self.async_client.put(self.dog_url, self.payload, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dog = await Dog.objects.aget(pk=self.dog.pk)
+        self.assertEqual((dog.name, dog.version), ('Max', 2))
+
+        response = await self.async_client.put(self.dog_url, self.payload, content_type='application/json',
+                                               headers={'If-Match': '"stale"'})
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = await self.async_client.patch(self.dog_url, {'age': 9}, content_type='application/json')
+        self.assertEqual(response.json()['age'], 9)
+
+    async def test_delete_dog(self):
+        response = await self.async_client.delete(self.dog_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = await self.async_client.delete(self.dog_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_breeds(self):
+        await self.breed.arefresh_from_db()
+        response = await self.async_client.get(reverse('breed-list'))
+        self.assertEqual(response.json(), [BreedSerializer(self.breed).data])
+
+        data = {'name': 'Akita', 'size': 'L', 'friendliness': 3, 'trainability': 2, 'shedding_amount': 4,
+                'exercise_needs': 3}
+        response = await self.async_client.post(reverse('breed-list'), data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = reverse('breed-detail', args=[response.json()['id']])
+
+        response = await self.async_client.get(url)
+        self.assertEqual(response.json()['name'], 'Akita')
+        response = await self.async_client.patch(url, {'name': 'Shiba'}, content_type='application/json')
+        self.assertEqual(response.json()['name'], 'Shiba')
+        response = await self.async_client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_breed_stats(self):
+        response = await self.async_client.get(reverse('breed-stats'))
+        stats, = response.json()
+        self.assertEqual((stats['name'], stats['dog_count'], stats['age']['mean']), ('Beagle', 3, 1.0))
+        response = await self.async_client.get(reverse('breed-stats'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(API_RESPONSE_CACHE_ALIAS='default')
+    async def test_response_cache(self):
+        await sync_to_async(caches['default'].clear)()
+        response = await self.async_client.get(self.dog_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        cached = await self.async_client.get(self.dog_url)
+        self.assertEqual((cached['X-Cache'], cached.content), ('HIT', response.content))
+        response = await self.async_client.get(reverse('response-cache-stats'))
+        self.assertEqual(response.json(), {'enabled': True, 'hits': 1, 'misses': 1})
+
+    def test_sync_client(self):
+        response = self.client.get(self.dog_url)
+        self.assertEqual(response.json()['name'], 'Dog 0')
+        response = self.client.options(reverse('dog-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,211 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from apps.api.catalog import breed_catalog
+from apps.api.models import Dog, Breed
+from apps.api.serializers import DogSerializer
+
+
+class BreedCatalogTest(TestCase):
+    """
+    Тесты кэша справочника пород.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Labrador', size='L', friendliness=5, trainability=4,
+                                          shedding_amount=3, exercise_needs=5)
+
+    def test_snapshot_is_cached(self):
+        breed_catalog.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Labrador')
+
+    def test_get_returns_copy(self):
+        breed_catalog.get(self.breed.pk).name = 'Changed'
+        self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Labrador')
+
+    def test_save_invalidates_snapshot(self):
+        breed_catalog.snapshot()
+        self.breed.name = 'Golden Retriever'
+        self.breed.save()
+        self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Golden Retriever')
+
+    def test_delete_invalidates_snapshot(self):
+        breed_catalog.snapshot()
+        pk = self.breed.pk
+        self.breed.delete()
+        self.assertIsNone(breed_catalog.get(pk))
+
+    def test_rolled_back_create_is_not_served(self):
+        breed_catalog.snapshot()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            breed = Breed.objects.create(name='Beagle', size='M', friendliness=4, trainability=3,
+                                         shedding_amount=3, exercise_needs=4)
+            self.assertEqual(breed_catalog.get(breed.pk).name, 'Beagle')
+            raise RuntimeError
+        self.assertIsNone(breed_catalog.get(breed.pk))
+        self.assertEqual([breed.name for breed in breed_catalog.snapshot().breeds], ['Labrador'])
+
+    def test_rolled_back_rename_is_not_served(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.breed.name = 'Golden Retriever'
+            self.breed.save()
+            self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Golden Retriever')
+            raise RuntimeError
+        self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Labrador')
+        # Снимок после отката — снова обычный кэш.
+        with self.assertNumQueries(0):
+            breed_catalog.snapshot()
+
+    def test_snapshot_in_changing_transaction_is_cached(self):
+        self.breed.name = 'Golden Retriever'
+        self.breed.save()
+        breed_catalog.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Golden Retriever')
+
+    def test_unknown_on_commit_format_is_not_reused(self):
+        self.breed.name = 'Golden Retriever'
+        self.breed.save()
+        connection = connections[DEFAULT_DB_ALIAS]
+        queue = [entry[1] for entry in connection.run_on_commit]
+        with mock.patch.object(connection, 'run_on_commit', queue):
+            self.assertEqual(breed_catalog.get(self.breed.pk).name, 'Golden Retriever')
+            with self.assertNumQueries(1):
+                breed_catalog.snapshot()
+
+    def test_unknown_id_reloads_once(self):
+        breed_catalog.snapshot()
+        breed = Breed.objects.bulk_create([
+            Breed(name='Beagle', size='M', friendliness=4, trainability=3, shedding_amount=3, exercise_needs=4)
+        ])[0]
+        with self.assertNumQueries(1):
+            self.assertEqual(breed_catalog.get(breed.pk).name, 'Beagle')
+
+    @override_settings(API_BREED_CACHE_ALIAS='default')
+    def test_shared_version_change_reloads(self):
+        breed_catalog.snapshot()
+        with self.assertNumQueries(0):
+            breed_catalog.snapshot()
+        breed_catalog.shared_cache.incr(breed_catalog.version_key)
+        with self.assertNumQueries(1):
+            breed_catalog.snapshot()
+
+    @override_settings(API_BREED_CACHE_ALIAS='default')
+    def test_commit_publishes_new_version(self):
+        version = breed_catalog.get_shared_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.breed.save()
+        self.assertEqual(breed_catalog.get_shared_version(), version + 1)
+
+
+class BreedCatalogRollbackTest(TransactionTestCase):
+    """
+    Откат транзакции целиком, а не точки сохранения внутри транзакции TestCase.
+    """
+
+    def test_rolled_back_rename_is_not_served(self):
+        breed = Breed.objects.create(name='Labrador', size='L', friendliness=5, trainability=4,
+                                     shedding_amount=3, exercise_needs=5)
+        breed_catalog.snapshot()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            breed.name = 'Golden Retriever'
+            breed.save()
+            self.assertEqual(breed_catalog.get(breed.pk).name, 'Golden Retriever')
+            raise RuntimeError
+        self.assertEqual(breed_catalog.get(breed.pk).name, 'Labrador')
+
+
+class DogSerializerCatalogTest(APITestCase):
+    """
+    Проверка breed_id в DogSerializer через кэш справочника пород.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Labrador', size='L', friendliness=5, trainability=4,
+                                          shedding_amount=3, exercise_needs=5)
+        self.payload = {
+            'name': 'Buddy',
+            'age': 3,
+            'gender': 'Male',
+            'color': 'Brown',
+            'favorite_food': 'Chicken',
+            'favorite_toy': 'Ball',
+            'breed_id': self.breed.pk
+        }
+
+    def test_validation_without_queries(self):
+        breed_catalog.snapshot()
+        serializer = DogSerializer(data=self.payload)
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['breed'].pk, self.breed.pk)
+
+    def test_invalid_breed_id(self):
+        for value in [999, 'abc', True, None]:
+            serializer = DogSerializer(data=dict(self.payload, breed_id=value))
+            self.assertFalse(serializer.is_valid())
+            self.assertIn('breed_id', serializer.errors)
+
+    def test_create_dog_writes_only_insert(self):
+        breed_catalog.snapshot()
+        # INSERT собаки и увеличение счётчика собак породы.
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('dog-list'), self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['breed']['name'], 'Labrador')
+        self.assertEqual(Dog.objects.get().breed_id, self.breed.pk)
+
+
+class BreedDeletedByAnotherWorkerTest(APITransactionTestCase):
+    """
+    Запись собаки в породу, удалённую после того, как её закэшировал справочник процесса.
+    Без транзакции TestCase: запрос сам завершает свою транзакцию, как в работающем сервисе.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Labrador', size='L', friendliness=5, trainability=4,
+                                          shedding_amount=3, exercise_needs=5)
+        self.payload = {
+            'name': 'Buddy',
+            'age': 3,
+            'gender': 'Male',
+            'color': 'Brown',
+            'favorite_food': 'Chicken',
+            'favorite_toy': 'Ball',
+        }
+
+    def stale_breed(self):
+        """
+        Порода, которая есть в снимке справочника процесса, но уже удалена из базы. Удаление без сигналов:
+        снимок о нём не знает, как об удалении породы другим воркером.
+        """
+        breed = Breed.objects.create(name='Poodle', size='M', friendliness=4, trainability=5,
+                                     shedding_amount=1, exercise_needs=3)
+        breed_catalog.snapshot()
+        Breed.objects.filter(pk=breed.pk)._raw_delete(Breed.objects.db)
+        self.assertIn(breed.pk, breed_catalog.snapshot().by_id)
+        return breed.pk
+
+    def test_write_to_deleted_breed(self):
+        dog = Dog.objects.create(**self.payload, breed=self.breed)
+        requests = [
+            ('post', reverse('dog-list'), lambda pk: dict(self.payload, breed_id=pk)),
+            ('post', reverse('dog-list'), lambda pk: [dict(self.payload, breed_id=pk)]),
+            ('put', reverse('dog-detail', kwargs={'dog_id': dog.pk}), lambda pk: dict(self.payload, breed_id=pk)),
+            ('patch', reverse('dog-detail', kwargs={'dog_id': dog.pk}), lambda pk: {'breed_id': pk}),
+        ]
+        for method, url, payload in requests:
+            with self.subTest(method=method, url=url):
+                breed_id = self.stale_breed()
+                response = getattr(self.client, method)(url, payload(breed_id), format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('breed_id', response.data)
+                self.assertNotIn(breed_id, breed_catalog.snapshot().by_id)
+        self.assertEqual(list(Dog.objects.values_list('pk', 'breed_id')), [(dog.pk, self.breed.pk)])
+        self.assertEqual(Breed.objects.get(pk=self.breed.pk).dog_count, 1)
@@ -0,0 +1,85 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from apps.api.export import EXPORT_COLUMNS, copy_to, export_dogs, export_queryset, write_chunked
+from apps.api.models import Dog, Breed
+
+
+class ExportDogsTest(TestCase):
+    """
+    Выгрузка собак с полями пород в CSV и NDJSON.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Лабрадор "Ретривер"', size='L', friendliness=5, trainability=4,
+                                          shedding_amount=3, exercise_needs=5)
+        for i in range(5):
+            Dog.objects.create(name=f'Шарик, {i}', age=i, gender='Male', color='Brown\nWhite',
+                               favorite_food='Chicken', favorite_toy='Ball', breed=self.breed)
+
+    def export(self, export_format, **kwargs):
+        out = io.BytesIO()
+        self.assertEqual(export_dogs(out, export_format, **kwargs), 5)
+        return out.getvalue()
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv', chunk_size=2).decode())))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        row = dict(zip(EXPORT_COLUMNS, rows[1]))
+        self.assertEqual(row['name'], 'Шарик, 0')
+        self.assertEqual(row['color'], 'Brown\nWhite')
+        self.assertEqual(row['breed_name'], 'Лабрадор "Ретривер"')
+        self.assertEqual(int(row['breed_id']), self.breed.pk)
+
+    def test_ndjson(self):
+        lines = self.export('ndjson', chunk_size=2).splitlines()
+        self.assertEqual(len(lines), 5)
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], sorted(Dog.objects.values_list('id', flat=True)))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(rows[0]['breed_size'], 'L')
+
+    def test_empty(self):
+        Dog.objects.all().delete()
+        out = io.BytesIO()
+        self.assertEqual(export_dogs(out, 'csv'), 0)
+        self.assertEqual(out.getvalue().decode().strip(), ','.join(EXPORT_COLUMNS))
+
+    def test_command_gzip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dogs.ndjson.gz')
+            out = io.StringIO()
+            call_command('export_dogs', format='ndjson', output=path, stdout=out)
+            with gzip.open(path) as f:
+                self.assertEqual(len(f.read().splitlines()), 5)
+        self.assertIn('Выгружено собак: 5', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY есть только на PostgreSQL')
+class CopyExportTest(ExportDogsTest):
+    """
+    COPY выдаёт те же данные, что и чтение курсором пачками.
+    """
+
+    def test_copy_matches_chunked(self):
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format=export_format):
+                copied, chunked = io.BytesIO(), io.BytesIO()
+                copy_to(export_queryset(), export_format, copied)
+                write_chunked(export_queryset(), export_format, chunked, 2)
+                if export_format == 'csv':
+                    self.assertEqual(list(csv.reader(io.StringIO(copied.getvalue().decode()))),
+                                     list(csv.reader(io.StringIO(chunked.getvalue().decode()))))
+                else:
+                    self.assertEqual([json.loads(line) for line in copied.getvalue().splitlines()],
+                                     [json.loads(line) for line in chunked.getvalue().splitlines()])
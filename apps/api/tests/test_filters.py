@@ -0,0 +1,73 @@
+from django.db import connection, transaction
+from unittest import skipUnless
+
+from django.test import TestCase
+from rest_framework import serializers
+
+from apps.api.filters import filter_dogs, get_dog_ordering
+from apps.api.models import Dog, Breed
+from apps.api.search import ranked_search
+
+
+def explain(queryset):
+    """
+    План запроса. На PostgreSQL последовательное сканирование отключается: на маленьких
+    тестовых таблицах оно дешевле индекса, а проверяется именно доступность индекса.
+    """
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+class DogFilterIndexTest(TestCase):
+    """
+    Частые сочетания фильтров списка собак выполняются по составным индексам.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+
+    def assertUsesIndex(self, params, index_name, ordering=('id',)):
+        queryset = filter_dogs(Dog.objects.all(), params).order_by(*ordering)[:101]
+        self.assertIn(index_name, explain(queryset))
+
+    def test_breed_and_age_range(self):
+        params = {'breed_id': str(self.breed.pk), 'age__gte': '2', 'age__lte': '8'}
+        self.assertUsesIndex(params, 'api_dog_breed_age_id_idx')
+
+    def test_breed_ordered_by_age(self):
+        self.assertUsesIndex({'breed_id': str(self.breed.pk)}, 'api_dog_breed_age_id_idx', ordering=('age', 'id'))
+
+    def test_breed_size_and_age(self):
+        self.assertUsesIndex({'breed__size': 'M', 'age__lte': '4'}, 'api_dog_breed_age_id_idx')
+
+    def test_color_and_gender(self):
+        self.assertUsesIndex({'color': 'Black', 'gender': 'Male'}, 'api_dog_color_gender_id_idx')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Индексы pg_trgm есть только на PostgreSQL')
+class TrigramSearchIndexTest(TestCase):
+    def test_search_uses_trigram_index(self):
+        for model, index_name in ((Dog, 'api_dog_name_trgm_idx'), (Breed, 'api_breed_name_trgm_idx')):
+            plan = explain(ranked_search(model.objects.all(), 'name', 'rex', 20))
+            self.assertIn(index_name, plan)
+            # Оба условия поиска (%> и ILIKE) выполняются по индексу, без последовательного сканирования.
+            self.assertNotIn('Seq Scan', plan)
+
+
+class DogFilterTest(TestCase):
+    def test_invalid_value(self):
+        with self.assertRaises(serializers.ValidationError) as context:
+            filter_dogs(Dog.objects.all(), {'age__gte': 'old'})
+        self.assertIn('age__gte', context.exception.detail)
+
+    def test_ordering(self):
+        self.assertEqual(get_dog_ordering(None), ('id',))
+        self.assertEqual(get_dog_ordering('-age,name'), ('-age', 'name', 'id'))
+        self.assertEqual(get_dog_ordering('-id'), ('-id',))
+        for value in ('color', 'age,age', '--age'):
+            with self.assertRaises(serializers.ValidationError):
+                get_dog_ordering(value)
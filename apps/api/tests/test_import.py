@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from apps.api.export import export_dogs
+from apps.api.imports import IMPORT_FIELDS, DogRowValidator, import_dogs
+from apps.api.models import Dog, Breed, BreedStat
+from apps.api.serializers import DogSerializer
+
+CSV = '''name,age,gender,color,favorite_food,favorite_toy,breed_id
+Rex,3,Male,Brown,Meat,Ball,{breed}
+ Шарик ,3.0,Male,"Белый, пятнистый",Мясо,Мяч,{breed}
+Bad,-1,Male,Brown,Meat,Ball,{breed}
+NoBreed,2,Female,Black,Fish,Rope,999999
+,2,Female,Black,Fish,Rope,{breed}
+Max,5,Male,Black,Fish,Rope,{breed}
+'''
+
+
+class ImportDogsTest(TestCase):
+    """
+    Загрузка собак из CSV и NDJSON с проверкой строк и файлом отклонённых строк.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+
+    def load(self, data, import_format='csv', **kwargs):
+        rejects = io.BytesIO()
+        result = import_dogs(io.BytesIO(data.encode()), import_format, rejects, **kwargs)
+        return result, [json.loads(line) for line in rejects.getvalue().splitlines()]
+
+    def test_csv(self):
+        progress = []
+        (imported, rejected), rejects = self.load(CSV.format(breed=self.breed.pk), chunk_size=2,
+                                                  progress=lambda *args: progress.append(args))
+        self.assertEqual((imported, rejected), (3, 3))
+        self.assertEqual(progress[-1], (6, 3))
+        self.assertEqual(sorted(Dog.objects.values_list('name', flat=True)), ['Max', 'Rex', 'Шарик'])
+        self.assertEqual(Dog.objects.get(name='Шарик').color, 'Белый, пятнистый')
+        self.assertEqual([reject['line'] for reject in rejects], [4, 5, 6])
+        self.assertIn('age', rejects[0]['errors'])
+        self.assertIn('breed_id', rejects[1]['errors'])
+        self.assertIn('name', rejects[2]['errors'])
+        self.assertEqual(rejects[0]['row']['name'], 'Bad')
+
+        self.breed.refresh_from_db()
+        self.assertEqual(self.breed.dog_count, 3)
+        self.assertEqual(BreedStat.objects.get(breed=self.breed, dimension='gender', value='Male').count, 3)
+
+    def test_ndjson(self):
+        lines = [
+            json.dumps({'name': 'Rex', 'age': 3, 'gender': 'Male', 'color': 'Brown', 'favorite_food': 'Meat',
+                        'favorite_toy': 'Ball', 'breed_id': self.breed.pk}),
+            '',
+            '{"name": "Broken"',
+            '[1, 2]',
+            json.dumps({'name': 'Max', 'age': True, 'gender': 'Male', 'color': 'Brown', 'favorite_food': 'Meat',
+                        'favorite_toy': 'Ball', 'breed_id': self.breed.pk}),
+        ]
+        (imported, rejected), rejects = self.load('\n'.join(lines), 'ndjson')
+        self.assertEqual((imported, rejected), (1, 3))
+        self.assertEqual([reject['line'] for reject in rejects], [3, 4, 5])
+        self.assertEqual(rejects[0]['row'], '{"name": "Broken"')
+        self.assertIn('non_field_errors', rejects[1]['errors'])
+
+    def test_export_round_trip(self):
+        Dog.objects.create(name='Rex, "the dog"', age=3, gender='Male', color='Brown\nWhite',
+                           favorite_food='Meat', favorite_toy='Ball', breed=self.breed)
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format=export_format):
+                out = io.BytesIO()
+                export_dogs(out, export_format)
+                Dog.objects.all().delete()
+                (imported, rejected), _ = self.load(out.getvalue().decode(), export_format)
+                self.assertEqual((imported, rejected), (1, 0))
+                self.assertEqual(list(Dog.objects.values_list('name', 'color')), [('Rex, "the dog"', 'Brown\nWhite')])
+
+    def test_validator_matches_serializer(self):
+        validator = DogRowValidator([self.breed.pk])
+        self.assertTrue(validator.fast)
+        serializer = DogSerializer(context={'breeds': {self.breed.pk: self.breed}})
+        base = {'name': 'Rex', 'age': '3', 'gender': 'Male', 'color': 'Brown', 'favorite_food': 'Meat',
+                'favorite_toy': 'Ball', 'breed_id': str(self.breed.pk)}
+        changes = [
+            {}, {'name': ' Rex '}, {'name': ''}, {'name': '  '}, {'name': 'x' * 100}, {'name': 'x' * 101},
+            {'name': 'a\x00b'}, {'name': '\ud800'}, {'name': 5}, {'name': None}, {'gender': 'x' * 11},
+            {'age': 3}, {'age': '0'}, {'age': '-1'}, {'age': -1}, {'age': '3.0'}, {'age': ' 3'}, {'age': '٣'},
+            {'age': '1' * 30}, {'age': 3.5}, {'age': True}, {'age': ''}, {'age': 'abc'},
+            {'breed_id': self.breed.pk}, {'breed_id': 999}, {'breed_id': True}, {'breed_id': ' 1'},
+            {'id': 'ignored', 'extra': 1},
+        ]
+        for change in changes:
+            row = {**base, **change}
+            with self.subTest(row=row):
+                values, errors = validator.validate(row)
+                try:
+                    attrs = serializer.run_validation(row)
+                except Exception as exc:
+                    self.assertIsNone(values)
+                    self.assertEqual(set(errors), set(exc.detail))
+                else:
+                    attrs['breed_id'] = attrs.pop('breed').pk
+                    self.assertEqual(values, tuple(attrs[name] for name in IMPORT_FIELDS))
+        for name in IMPORT_FIELDS:
+            row = dict(base)
+            del row[name]
+            self.assertIsNone(validator.validate(row)[0])
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dogs.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(CSV.format(breed=self.breed.pk))
+            out = io.StringIO()
+            call_command('import_dogs', path, stdout=out)
+            self.assertIn('Загружено собак: 3', out.getvalue())
+            with open(f'{path}.rejects.ndjson', 'rb') as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+
+            Dog.objects.all().delete()
+            valid = os.path.join(directory, 'valid.csv')
+            with open(valid, 'w', encoding='utf-8') as f:
+                f.write(CSV.format(breed=self.breed.pk).split('Bad')[0])
+            call_command('import_dogs', valid, stdout=io.StringIO())
+            self.assertFalse(os.path.exists(f'{valid}.rejects.ndjson'))
+        self.assertEqual(Dog.objects.count(), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY есть только на PostgreSQL')
+class CopyImportTest(ImportDogsTest):
+    """
+    Те же проверки для загрузки через COPY во временную таблицу.
+    """
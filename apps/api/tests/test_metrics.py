@@ -0,0 +1,103 @@
+import os
+import tempfile
+from unittest import mock
+
+import prometheus_client
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from apps.api.catalog import breed_catalog
+from apps.api.controllers import BreedStatsList
+from apps.api.models import Breed, Dog
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(API_STREAM_CHUNK_SIZE=2)
+class MetricsTestCase(APITestCase):
+    """
+    Метрики копятся в реестре процесса за все тесты, поэтому проверяются приращения.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+        for i in range(3):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender='Male', color='Brown', favorite_food='Meat',
+                               favorite_toy='Ball', breed=self.breed)
+        breed_catalog.snapshot()
+
+    def test_request_metrics(self):
+        labels = {'route': 'dog-list', 'method': 'GET'}
+        before = {
+            'requests': sample('api_http_requests_total', status='200', **labels),
+            'latency': sample('api_http_request_duration_seconds_count', **labels),
+            'size': sample('api_http_response_size_bytes_sum', **labels),
+            'db_time': sample('api_db_query_duration_seconds_count', **labels),
+            'queries': sample('api_db_queries_total', **labels),
+        }
+        response = self.client.get(reverse('dog-list'))
+
+        self.assertEqual(sample('api_http_requests_total', status='200', **labels), before['requests'] + 1)
+        self.assertEqual(sample('api_http_request_duration_seconds_count', **labels), before['latency'] + 1)
+        self.assertEqual(sample('api_http_response_size_bytes_sum', **labels), before['size'] + len(response.content))
+        self.assertEqual(sample('api_db_query_duration_seconds_count', **labels), before['db_time'] + 1)
+        self.assertEqual(sample('api_db_queries_total', **labels), before['queries'] + 1)
+        self.assertEqual(sample('api_http_requests_in_progress', **labels), 0)
+
+    def test_status_and_route_labels(self):
+        labels = {'route': 'dog-detail', 'method': 'GET', 'status': '404'}
+        before = sample('api_http_requests_total', **labels)
+        self.client.get(reverse('dog-detail', kwargs={'dog_id': 999}))
+        self.assertEqual(sample('api_http_requests_total', **labels), before + 1)
+
+        labels = {'route': 'unmatched', 'method': 'other', 'status': '404'}
+        before = sample('api_http_requests_total', **labels)
+        self.client.generic('PROPFIND', '/api/no-such-route/')
+        self.assertEqual(sample('api_http_requests_total', **labels), before + 1)
+
+    def test_in_progress_during_view(self):
+        labels = {'route': 'breed-stats', 'method': 'GET'}
+        seen = []
+
+        def get(view, request, *args, **kwargs):
+            seen.append(sample('api_http_requests_in_progress', **labels))
+            return Response([])
+
+        with mock.patch.object(BreedStatsList, 'get', get):
+            self.client.get(reverse('breed-stats'))
+        self.assertEqual(seen, [1])
+        self.assertEqual(sample('api_http_requests_in_progress', **labels), 0)
+
+    def test_streamed_response_size(self):
+        labels = {'route': 'dog-list', 'method': 'GET'}
+        before = sample('api_http_response_size_bytes_count', **labels), \
+            sample('api_http_response_size_bytes_sum', **labels)
+        response = self.client.get(reverse('dog-list') + '?stream=1&format=ndjson')
+        # Размер известен только после передачи тела.
+        self.assertEqual(sample('api_http_response_size_bytes_count', **labels), before[0])
+        content = b''.join(response.streaming_content)
+        self.assertEqual(sample('api_http_response_size_bytes_count', **labels), before[0] + 1)
+        self.assertEqual(sample('api_http_response_size_bytes_sum', **labels), before[1] + len(content))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('breed-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], prometheus_client.CONTENT_TYPE_LATEST)
+        self.assertIn('api_http_requests_total{method="GET",route="breed-list",status="200"}',
+                      response.content.decode())
+        self.assertEqual(self.client.post(reverse('metrics')).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_multiprocess_registry(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+            response = self.client.get(reverse('metrics'))
+        # Метрики этого процесса хранятся в памяти, а не в файлах каталога, поэтому в выдачу не попадают.
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('api_http_requests_total{', response.content.decode())
@@ -1,6 +1,11 @@
+from io import StringIO
+from unittest import mock
+
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
-from apps.api.models import Dog, Breed
+from apps.api.models import Dog, Breed, dogs_changed
 
 
 class TestDogModel(TestCase):
@@ -43,6 +48,31 @@ class TestDogModel(TestCase):
         self.assertEqual(self.dog.favorite_toy, 'Ball')
         self.assertEqual(self.dog.breed.name, 'Labrador')
 
+    def test_dog_version(self):
+        """
+        Тест увеличения версии объекта Dog при сохранении.
+        """
+        self.assertEqual(self.dog.version, 1)
+        updated_at = self.dog.updated_at
+        self.dog.age = 4
+        self.dog.save(update_fields=['age'])
+        self.dog.refresh_from_db()
+        self.assertEqual(self.dog.version, 2)
+        self.assertGreater(self.dog.updated_at, updated_at)
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        """
+        Тест того, что сохранения двух копий, загруженных одновременно, получают разные версии.
+        """
+        first, second = Dog.objects.get(pk=self.dog.pk), Dog.objects.get(pk=self.dog.pk)
+        first.age = 4
+        first.save()
+        second.color = 'Brown'
+        second.save(update_fields=['color'])
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.dog.refresh_from_db()
+        self.assertEqual(self.dog.version, 3)
+
     def test_dog_str_method(self):
         """
         Тест строкового представления объекта Dog.
@@ -195,3 +225,90 @@ class TestBreedModel(TestCase):
         )
         with self.assertRaises(ValidationError):
             breed.full_clean()  # Должен выбросить ValidationError
+
+
+class TestBreedDogCount(TestCase):
+    """
+    Счётчик собак породы поддерживается при любой записи собак через ORM и API.
+    """
+
+    def setUp(self):
+        self.labrador = Breed.objects.create(name='Labrador', size='L', friendliness=5, trainability=5,
+                                             shedding_amount=3, exercise_needs=4)
+        self.beagle = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                           shedding_amount=3, exercise_needs=4)
+
+    def make_dog(self, breed, **kwargs):
+        return Dog(**{'name': 'Buddy', 'age': 3, 'gender': 'Male', 'color': 'Black', 'favorite_food': 'Bones',
+                      'favorite_toy': 'Ball', 'breed': breed, **kwargs})
+
+    def assertCounts(self, labrador, beagle):
+        counts = dict(Breed.objects.values_list('pk', 'dog_count'))
+        self.assertEqual((counts[self.labrador.pk], counts[self.beagle.pk]), (labrador, beagle))
+
+    def test_save_and_delete(self):
+        dog = Dog.objects.create(name='Buddy', age=3, gender='Male', color='Black', favorite_food='Bones',
+                                 favorite_toy='Ball', breed=self.labrador)
+        self.assertCounts(1, 0)
+        dog = Dog.objects.get(pk=dog.pk)
+        dog.name = 'Max'
+        dog.save()
+        self.assertCounts(1, 0)
+        dog.breed = self.beagle
+        dog.save()
+        self.assertCounts(0, 1)
+        dog.delete()
+        self.assertCounts(0, 0)
+
+    def test_stale_instance_moves_current_breed(self):
+        dog = self.make_dog(self.labrador)
+        dog.save()
+        # Другой запрос уже перенёс собаку; сохранение устаревшего объекта не должно перенести её второй раз.
+        Dog.objects.filter(pk=dog.pk).update(breed=self.beagle)
+        dog.breed = self.beagle
+        dog.save()
+        self.assertCounts(0, 1)
+
+    def test_queryset_operations(self):
+        Dog.objects.bulk_create([self.make_dog(self.labrador, age=age) for age in range(6)])
+        self.assertCounts(6, 0)
+        self.assertEqual(Dog.objects.filter(age__lt=4).update(breed=self.beagle), 4)
+        self.assertCounts(2, 4)
+        Dog.objects.filter(age=0).update(breed_id=self.beagle.pk, name='Rex')
+        self.assertCounts(2, 4)
+        self.assertEqual(Dog.objects.filter(age=100).update(breed=self.labrador), 0)
+        self.assertCounts(2, 4)
+        self.assertEqual(Dog.objects.filter(age__gte=3).delete(), (3, {'api.Dog': 3}))
+        self.assertCounts(0, 3)
+        self.beagle.dogs.all().delete()
+        self.assertCounts(0, 0)
+        self.assertEqual(Dog.objects.filter(pk__in=[]).delete(), (0, {}))
+
+    def test_delete_reports_changed_pks(self):
+        dogs = Dog.objects.bulk_create([self.make_dog(self.labrador), self.make_dog(self.beagle),
+                                        self.make_dog(self.beagle)])
+        received = []
+        dogs_changed.connect(lambda sender, pks, **kwargs: received.append(pks), sender=Dog, weak=False,
+                             dispatch_uid='test_delete_reports_changed_pks')
+        try:
+            Dog.objects.filter(pk=dogs[0].pk).delete()
+            with mock.patch('apps.api.models.CHANGED_PKS_LIMIT', 1):
+                Dog.objects.all().delete()
+        finally:
+            dogs_changed.disconnect(sender=Dog, dispatch_uid='test_delete_reports_changed_pks')
+        self.assertEqual(received[0], [dogs[0].pk])
+        # Удаление одним запросом передаёт ID, только пока их не больше CHANGED_PKS_LIMIT.
+        if connection.vendor == 'postgresql':
+            self.assertIsNone(received[1])
+        else:
+            self.assertCountEqual(received[1], [dogs[1].pk, dogs[2].pk])
+        self.assertCounts(0, 0)
+
+    def test_reconcile(self):
+        Dog.objects.bulk_create([self.make_dog(self.labrador), self.make_dog(self.beagle)])
+        Breed.objects.filter(pk=self.labrador.pk).update(dog_count=10)
+        out = StringIO()
+        call_command('reconcile_dog_counts', stdout=out)
+        self.assertCounts(1, 1)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(Breed.objects.reconcile_dog_counts(), 0)
@@ -0,0 +1,178 @@
+import datetime
+import io
+import json
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import mock
+
+import msgpack
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from apps.api import parsers, renderers
+from apps.api.models import Dog, Breed
+from apps.api.parsers import FastJSONParser, MessagePackParser
+from apps.api.renderers import FastJSONRenderer, MessagePackRenderer, NDJSONRenderer
+from apps.api.serializers import BreedSerializer, DogSerializer
+
+UTC = datetime.timezone.utc
+
+VALUES = [
+    None, True, False, 0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 64, 10 ** 30,
+    0.1, 5.33, -0.0, 0.0001, 123456.789, 1e15,
+    '', 'Rex', 'Шарик', 'emoji \U0001f415', 'quote " backslash \\ slash /', 'control \x00\x1f\t\n\r',
+    'separators    ', 'dash –',
+    [], {}, [1, [2, [3]]], (1, 2), {'a': {'b': None}}, OrderedDict([('z', 1), ('a', 2)]),
+    {1: 'int key', 'x': 'str key'},
+    datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+    datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=UTC),
+    datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=3))),
+    datetime.datetime(2024, 5, 1, 12, 30),
+    datetime.date(2024, 5, 1), datetime.time(12, 30, 15, 500),
+    Decimal('12.50'), uuid.UUID('12345678-1234-5678-1234-567812345678'), gettext_lazy('Lazy'),
+]
+
+
+class FastJSONRendererTest(TestCase):
+    """
+    FastJSONRenderer выдаёт те же байты, что стандартный JSONRenderer, с orjson и без него.
+    """
+
+    def setUp(self):
+        breed = Breed.objects.create(name='Лабрадор "Ретривер"', size='L', friendliness=5, trainability=4,
+                                     shedding_amount=3, exercise_needs=5)
+        for i in range(20):
+            Dog.objects.create(name=f'Шарик {i}  ', age=i, gender='Male', color='Brown\n',
+                               favorite_food='Chicken', favorite_toy='Ball', breed=breed)
+
+    def assertSameOutput(self, data, accepted_media_type=None, renderer_context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type, renderer_context), expected)
+
+    def test_values(self):
+        for value in VALUES:
+            with self.subTest(value=value):
+                self.assertSameOutput(value)
+        self.assertSameOutput(VALUES)
+
+    def test_api_payloads(self):
+        self.assertSameOutput(DogSerializer(Dog.objects.select_related('breed'), many=True).data)
+        self.assertSameOutput(DogSerializer(Dog.objects.first()).data)
+        self.assertSameOutput(BreedSerializer(Breed.objects.all(), many=True).data)
+        self.assertSameOutput({'created': [], 'errors': [{'index': 0, 'errors': {'name': ['Обязательное поле.']}}]})
+
+    def test_float_exponent(self):
+        # Равнозначная запись вместо экспоненциальной — допустимое отличие (см. FastJSONRenderer).
+        data = [1.5e-5, 1e16, -2.5e-300]
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), data)
+
+    def test_indent(self):
+        data = DogSerializer(Dog.objects.first()).data
+        self.assertSameOutput(data, 'application/json; indent=4')
+        self.assertSameOutput(data, None, {'indent': 2})
+
+    def test_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertSameOutput(VALUES)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'value': object()})
+
+    def test_ndjson(self):
+        data = DogSerializer(Dog.objects.select_related('breed'), many=True).data
+        expected = b''.join(JSONRenderer().render(item) + b'\n' for item in data)
+        self.assertEqual(NDJSONRenderer().render(data), expected)
+
+
+class FastJSONParserTest(TestCase):
+    """
+    FastJSONParser возвращает тот же результат и те же ошибки, что стандартный JSONParser.
+    """
+    bodies = [
+        b'{"name": "Rex", "age": 3, "breed_id": 1}',
+        '[{"name": "Шарик"}, {"name": "\\u0428\\u0430\\u0440\\u0438\\u043a"}]'.encode(),
+        b'{"big": 123456789012345678901234567890, "float": 1.5e-5, "nested": {"a": [null, true, false]}}',
+        b'[18446744073709551615, 18446744073709551616, -9223372036854775809, "1234567890123456789"]',
+        b'{"a": 1, "a": 2}',
+        b'"\\ud83d\\udc15"',
+        b'  [1, 2, 3]  \n',
+    ]
+    invalid = [b'', b'{', b'{"a": NaN}', b'[Infinity]', b'{"a": 1,}', b'\xff', b'{"a": 1} x']
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(io.BytesIO(body), 'application/json', {'encoding': encoding})
+
+    def test_same_result(self):
+        for body in self.bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+    def test_same_errors(self):
+        for body in self.invalid:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as actual:
+                    self.parse(FastJSONParser(), body)
+                self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_other_encoding(self):
+        body = '{"name": "Café"}'.encode('latin-1')
+        self.assertEqual(self.parse(FastJSONParser(), body, 'latin-1'), {'name': 'Café'})
+
+    def test_without_orjson(self):
+        with mock.patch.object(parsers, 'orjson', None):
+            for body in self.bodies:
+                self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+
+class MessagePackTest(APITestCase):
+    """
+    Согласование application/msgpack для ответов и тел запросов.
+    """
+
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+        self.dog = Dog.objects.create(name='Rex', age=3, gender='Male', color='Brown', favorite_food='Meat',
+                                      favorite_toy='Ball', breed=self.breed)
+        self.payload = {'name': 'Max', 'age': 4, 'gender': 'Male', 'color': 'Black', 'favorite_food': 'Fish',
+                        'favorite_toy': 'Rope', 'breed_id': self.breed.pk}
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT=MessagePackRenderer.media_type)
+        self.assertEqual(response['Content-Type'], MessagePackRenderer.media_type)
+        return msgpack.unpackb(response.content)
+
+    def test_responses(self):
+        for url in (reverse('dog-list'), reverse('dog-detail', kwargs={'dog_id': self.dog.pk}),
+                    reverse('breed-list'), reverse('breed-detail', kwargs={'breed_id': self.breed.pk})):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url), self.client.get(url).json())
+
+    def test_request_bodies(self):
+        response = self.client.post(reverse('dog-list'), msgpack.packb([self.payload, self.payload]),
+                                    content_type=MessagePackParser.media_type)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.patch(reverse('dog-detail', kwargs={'dog_id': self.dog.pk}), msgpack.packb({'age': 9}),
+                                     content_type=MessagePackParser.media_type)
+        self.assertEqual(response.json()['age'], 9)
+        response = self.client.post(reverse('breed-list'), b'\xc1', content_type=MessagePackParser.media_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_types(self):
+        data = {'at': datetime.datetime(2024, 5, 1, 12, 30, tzinfo=UTC), 'price': Decimal('1.5'), 'ids': (1, 2)}
+        self.assertEqual(msgpack.unpackb(MessagePackRenderer().render(data)),
+                         {'at': '2024-05-01T12:30:00Z', 'price': 1.5, 'ids': [1, 2]})
+
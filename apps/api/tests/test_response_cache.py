@@ -0,0 +1,169 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from apps.api.catalog import breed_catalog
+from apps.api.models import Dog, Breed
+
+
+def make_dog(breed, name='Rex', age=3):
+    return Dog(name=name, age=age, gender='Male', color='Brown', favorite_food='Meat', favorite_toy='Ball', breed=breed)
+
+
+@override_settings(API_RESPONSE_CACHE_ALIAS='default')
+class ResponseCacheTestCase(TestCase):
+    """
+    Общий кэш ответов: повторные GET отдаются без запросов к базе, запись сбрасывает зависящие от неё ответы.
+
+    Сброс выполняется после коммита транзакции, поэтому записи в тестах выполняются
+    внутри `captureOnCommitCallbacks(execute=True)`.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.beagle = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                           shedding_amount=3, exercise_needs=4)
+        self.akita = Breed.objects.create(name='Akita', size='L', friendliness=3, trainability=2,
+                                          shedding_amount=4, exercise_needs=3)
+        self.dog = Dog.objects.create(name='Rex', age=3, gender='Male', color='Brown', favorite_food='Meat',
+                                      favorite_toy='Ball', breed=self.beagle)
+        self.other = Dog.objects.create(name='Max', age=5, gender='Male', color='Black', favorite_food='Fish',
+                                        favorite_toy='Rope', breed=self.beagle)
+        self.dog_url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        self.other_url = reverse('dog-detail', kwargs={'dog_id': self.other.pk})
+        self.breed_url = reverse('breed-detail', kwargs={'breed_id': self.beagle.pk})
+        breed_catalog.clear()
+        breed_catalog.snapshot()
+
+    def assertCached(self, url):
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        return response
+
+    def assertNotCached(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        return response
+
+    def test_hit(self):
+        for url in (self.dog_url, reverse('dog-list'), self.breed_url, reverse('breed-list'), reverse('breed-stats')):
+            response = self.assertNotCached(url)
+            cached = self.assertCached(url)
+            self.assertEqual(cached.content, response.content)
+            self.assertEqual(cached['ETag'], response['ETag'])
+            self.assertEqual(cached['Content-Type'], response['Content-Type'])
+
+    def test_key_includes_query_and_format(self):
+        self.assertNotCached(reverse('dog-list') + '?limit=1')
+        self.assertNotCached(reverse('dog-list') + '?limit=2')
+        self.assertCached(reverse('dog-list') + '?limit=1')
+        response = self.client.get(reverse('dog-list') + '?limit=1', headers={'Accept': 'text/html'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('text/html', response['Content-Type'])
+
+    def test_conditional_hit(self):
+        etag = self.assertNotCached(self.dog_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.dog_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_not_cached(self):
+        self.client.get(reverse('dog-list') + '?stream=1')
+        self.assertNotIn('X-Cache', self.client.get(reverse('dog-list') + '?stream=1'))
+        url = reverse('dog-detail', kwargs={'dog_id': 999})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Cache', response)
+
+    @override_settings(API_RESPONSE_CACHE_ALIAS='')
+    def test_disabled(self):
+        self.client.get(self.dog_url)
+        self.assertNotIn('X-Cache', self.client.get(self.dog_url))
+
+    def test_dog_writes(self):
+        for url in (self.dog_url, self.other_url, reverse('dog-list'), reverse('breed-list')):
+            self.assertNotCached(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.dog_url, {'age': 7}, content_type='application/json')
+        self.assertEqual(self.assertNotCached(self.dog_url).json()['age'], 7)
+        self.assertNotCached(reverse('dog-list'))
+        self.assertCached(self.other_url)
+        self.assertCached(reverse('breed-list'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.dog_url, {'breed_id': self.akita.pk}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertNotCached(self.dog_url).json()['breed']['name'], 'Akita')
+        breeds = self.assertNotCached(reverse('breed-list')).json()
+        self.assertEqual({breed['name']: breed['dog_count'] for breed in breeds}, {'Akita': 1, 'Beagle': 1})
+        self.assertCached(self.other_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(self.dog_url)
+        self.assertEqual(self.client.get(self.dog_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.assertNotCached(reverse('dog-list')).json()), 1)
+
+    def test_bulk_writes(self):
+        for url in (self.dog_url, self.other_url, reverse('dog-list'), reverse('breed-stats')):
+            self.assertNotCached(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Dog.objects.bulk_create([make_dog(self.akita, name='Bulk')])
+        self.assertEqual(len(self.assertNotCached(reverse('dog-list')).json()), 3)
+        self.assertNotCached(reverse('breed-stats'))
+        self.assertCached(self.dog_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Dog.objects.filter(pk=self.dog.pk).update(breed=self.akita)
+        self.assertNotCached(self.dog_url)
+        self.assertCached(self.other_url)
+
+        # Без смены породы обновлённые строки неизвестны, поэтому сбрасываются карточки всех собак.
+        with self.captureOnCommitCallbacks(execute=True):
+            Dog.objects.filter(age=5).update(name='Renamed')
+        self.assertEqual(self.assertNotCached(self.other_url).json()['name'], 'Renamed')
+        self.assertNotCached(self.dog_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('dog-list'), {'ids': [self.other.pk]}, content_type='application/json')
+        self.assertEqual(self.client.get(self.other_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_breed_writes(self):
+        for url in (self.dog_url, self.breed_url, reverse('breed-list')):
+            self.assertNotCached(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.breed_url, {'name': 'Harrier'}, content_type='application/json')
+        self.assertEqual(self.assertNotCached(self.dog_url).json()['breed']['name'], 'Harrier')
+        self.assertEqual(self.assertNotCached(self.breed_url).json()['name'], 'Harrier')
+        self.assertNotCached(reverse('breed-list'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beagle.delete()
+        self.assertEqual(self.client.get(self.dog_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.breed_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dog_count_writes(self):
+        akita_url = reverse('breed-detail', kwargs={'breed_id': self.akita.pk})
+        for url in (self.breed_url, akita_url):
+            self.assertNotCached(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_dog(self.beagle).save()
+        self.assertEqual(self.assertNotCached(self.breed_url).json()['dog_count'], 3)
+        self.assertCached(akita_url)
+
+    def test_stats(self):
+        url = reverse('response-cache-stats')
+        self.assertEqual(self.client.get(url).json(), {'enabled': True, 'hits': 0, 'misses': 0})
+        self.client.get(self.dog_url)
+        self.client.get(self.dog_url)
+        self.client.get(self.dog_url)
+        self.assertEqual(self.client.get(url).json(), {'enabled': True, 'hits': 2, 'misses': 1})
+
+        with override_settings(API_RESPONSE_CACHE_ALIAS=''):
+            self.assertEqual(self.client.get(url).json(), {'enabled': False, 'hits': 0, 'misses': 0})
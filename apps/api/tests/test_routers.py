@@ -0,0 +1,121 @@
+import random
+from collections import Counter
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.api import routers
+from apps.api.middleware import PRIMARY_COOKIE
+from apps.api.models import Dog, Breed
+from apps.api.routers import ReplicaRouter, begin_request, end_request
+
+REPLICAS = {'replica1': 3, 'replica2': 1}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Выбор базы для чтения и записи.
+    """
+    router = ReplicaRouter()
+
+    def read_in_request(self):
+        token = begin_request(pinned=False)
+        try:
+            return self.router.db_for_read(Dog)
+        finally:
+            end_request(token)
+
+    def test_weighted_choice(self):
+        random.seed(0)
+        counts = Counter(self.read_in_request() for _ in range(4000))
+        self.assertEqual(set(counts), set(REPLICAS))
+        self.assertTrue(2.5 < counts['replica1'] / counts['replica2'] < 3.5, counts)
+
+    def test_outside_request(self):
+        self.assertEqual({self.router.db_for_read(Dog) for _ in range(50)}, {DEFAULT_DB_ALIAS})
+
+    def test_one_replica_per_request(self):
+        token = begin_request(pinned=False)
+        try:
+            self.assertEqual(len({self.router.db_for_read(Dog) for _ in range(50)}), 1)
+        finally:
+            self.assertFalse(end_request(token))
+
+    def test_read_after_write(self):
+        token = begin_request(pinned=False)
+        try:
+            self.assertIn(self.router.db_for_read(Dog), REPLICAS)
+            self.assertEqual(self.router.db_for_write(Dog), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(Breed), DEFAULT_DB_ALIAS)
+        finally:
+            self.assertTrue(end_request(token))
+
+    def test_pinned(self):
+        token = begin_request(pinned=True)
+        try:
+            self.assertEqual(self.router.db_for_read(Dog), DEFAULT_DB_ALIAS)
+        finally:
+            end_request(token)
+
+    def test_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS={}):
+            self.assertEqual(self.router.db_for_read(Dog), DEFAULT_DB_ALIAS)
+
+    def test_allow_migrate(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'api'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'api'))
+
+
+class ReplicaTransactionTest(TransactionTestCase):
+
+    def test_reads_in_transaction(self):
+        with override_settings(DATABASE_REPLICAS=REPLICAS), transaction.atomic():
+            self.assertEqual(ReplicaRouter().db_for_read(Dog), DEFAULT_DB_ALIAS)
+
+
+# Реплика — та же тестовая база: проверяется, когда роутер выбирает реплику, а не содержимое ответов.
+@override_settings(DATABASE_REPLICAS={DEFAULT_DB_ALIAS: 1})
+class ReplicaPinningMiddlewareTest(TransactionTestCase):
+    """
+    Запросы на изменение и запросы клиента после его записи читают с основной базы.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+        self.payload = {'name': 'Rex', 'age': 3, 'gender': 'Male', 'color': 'Brown', 'favorite_food': 'Meat',
+                        'favorite_toy': 'Ball', 'breed_id': self.breed.pk}
+
+    def replica_reads(self, method, *args, **kwargs):
+        with mock.patch.object(routers, 'choose_replica', wraps=routers.choose_replica) as choose:
+            response = getattr(self.client, method)(*args, **kwargs)
+        return response, choose.call_count
+
+    def test_safe_reads_use_replica(self):
+        response, reads = self.replica_reads('get', reverse('dog-list'))
+        self.assertEqual(reads, 1)
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_read_your_writes(self):
+        response, reads = self.replica_reads('post', reverse('dog-list'), self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(reads, 0)
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+        _, reads = self.replica_reads('get', reverse('dog-list'))
+        self.assertEqual(reads, 0)
+
+        self.client.cookies.clear()
+        _, reads = self.replica_reads('get', reverse('dog-list'))
+        self.assertEqual(reads, 1)
+
+    def test_no_cookie_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS={}):
+            response = self.client.post(reverse('dog-list'), self.payload, format='json')
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from apps.api.models import Dog, Breed, BreedStat
+from apps.api.seed import seed_dogs
+
+
+class SeedDogsTest(TestCase):
+    """
+    Генерация тестовых пород и собак.
+    """
+
+    def test_seed(self):
+        self.assertEqual(seed_dogs(500, 60, chunk_size=128, seed=1), 500)
+        self.assertEqual(Breed.objects.count(), 60)
+        self.assertEqual(Dog.objects.count(), 500)
+        self.assertEqual(Breed.objects.aggregate(total=Sum('dog_count'))['total'], 500)
+        self.assertEqual(BreedStat.objects.filter(dimension='gender').aggregate(total=Sum('count'))['total'], 500)
+        self.assertEqual(len(set(Breed.objects.values_list('name', flat=True))), 60)
+        self.assertEqual(Dog.objects.filter(age__gte=0, age__lte=16).count(), 500)
+
+    def test_reproducible(self):
+        seed_dogs(100, 10, seed=7)
+        first = list(Dog.objects.order_by('pk').values_list('name', 'age', 'color'))
+        Breed.objects.all().delete()
+        seed_dogs(100, 10, seed=7)
+        self.assertEqual(list(Dog.objects.order_by('pk').values_list('name', 'age', 'color')), first)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('seed_dogs', dogs=50, breeds=5, stdout=out)
+        self.assertIn('собак: 50', out.getvalue())
+        Breed.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('seed_dogs', dogs=50, breeds=0, stdout=out)
@@ -1,5 +1,8 @@
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
 from apps.api.models import Dog, Breed
+from apps.api.representations import dog_representation, breed_representation
 from apps.api.serializers import DogSerializer, BreedSerializer
 
 
@@ -20,7 +23,8 @@ class BreedSerializerTest(TestCase):
     def test_contains_expected_fields(self):
         data = self.serializer.data
         self.assertEqual(set(data.keys()),
-                         {'id', 'name', 'size', 'friendliness', 'trainability', 'shedding_amount', 'exercise_needs'})
+                         {'id', 'name', 'size', 'friendliness', 'trainability', 'shedding_amount', 'exercise_needs',
+                          'dog_count'})
 
     def test_field_content(self):
         data = self.serializer.data
@@ -69,3 +73,43 @@ class DogSerializerTest(TestCase):
         self.assertEqual(data['favorite_food'], self.dog_attributes['favorite_food'])
         self.assertEqual(data['favorite_toy'], self.dog_attributes['favorite_toy'])
         self.assertEqual(data['breed']['name'], self.breed.name)
+
+
+class ReadOnlyRepresentationTest(TestCase):
+
+    def setUp(self):
+        self.breeds = [
+            Breed.objects.create(name='Лабрадор', size='L', friendliness=5, trainability=4, shedding_amount=3,
+                                 exercise_needs=5),
+            Breed.objects.create(name='Beagle " "', size='M', friendliness=4, trainability=3,
+                                 shedding_amount=3, exercise_needs=4),
+        ]
+        for i in range(6):
+            Dog.objects.create(name=f'Шарик {i}', age=i, gender='Male', color='Brown\n', favorite_food='Chicken',
+                               favorite_toy='Ball', breed=self.breeds[i % 2])
+
+    def test_dog_list_matches_serializer_bytes(self):
+        queryset = Dog.objects.order_by('id')
+        expected = JSONRenderer().render(DogSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(dog_representation.many(dog_representation.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_breed_list_matches_serializer_bytes(self):
+        queryset = Breed.objects.all()
+        expected = JSONRenderer().render(BreedSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(breed_representation.many(breed_representation.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_get_single_dog(self):
+        dog = Dog.objects.first()
+        self.assertEqual(dog_representation.get(Dog.objects.all(), pk=dog.pk), DogSerializer(dog).data)
+        self.assertIsNone(dog_representation.get(Dog.objects.all(), pk=0))
+
+    def test_sparse_representation(self):
+        sparse = dog_representation.sparse({'breed': ('size', 'name'), 'name': None})
+        self.assertIs(sparse, dog_representation.sparse({'name': None, 'breed': ('size', 'name')}))
+        self.assertEqual(sparse.columns, ('name', 'breed'))
+        dog = Dog.objects.first()
+        self.assertEqual(sparse.get(Dog.objects.all(), pk=dog.pk),
+                         {'name': dog.name, 'breed': {'name': dog.breed.name, 'size': dog.breed.size}})
+
@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from apps.api.catalog import breed_catalog
+from apps.api.models import Dog, Breed, BreedStat
+from apps.api.stats import rebuild_breed_stats
+
+
+def make_dog(breed, name='Rex', age=3, gender='Male', color='Brown'):
+    return Dog(name=name, age=age, gender=gender, color=color, favorite_food='Meat', favorite_toy='Ball', breed=breed)
+
+
+class BreedStatsTestCase(TestCase):
+    """
+    Сводная таблица статистики пород поддерживается триггерами при любом способе записи собак.
+    """
+
+    def setUp(self):
+        self.beagle = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                           shedding_amount=3, exercise_needs=4)
+        self.akita = Breed.objects.create(name='Akita', size='L', friendliness=3, trainability=2,
+                                          shedding_amount=4, exercise_needs=3)
+        self.url = reverse('breed-stats')
+        breed_catalog.clear()
+
+    def counts(self):
+        return {(stat.breed_id, stat.dimension, stat.value): stat.count
+                for stat in BreedStat.objects.filter(count__gt=0)}
+
+    def assertStatsConsistent(self):
+        """
+        Счётчики, поддерживаемые триггерами, совпадают с полным пересчётом.
+        """
+        counts = self.counts()
+        rebuild_breed_stats()
+        self.assertEqual(counts, self.counts())
+
+    def test_orm_writes(self):
+        dog = make_dog(self.beagle)
+        dog.save()
+        self.assertEqual(self.counts(), {
+            (self.beagle.pk, 'age', '3'): 1,
+            (self.beagle.pk, 'gender', 'Male'): 1,
+            (self.beagle.pk, 'color', 'Brown'): 1,
+        })
+
+        dog.color = 'Black'
+        dog.breed = self.akita
+        dog.save()
+        self.assertEqual(self.counts(), {
+            (self.akita.pk, 'age', '3'): 1,
+            (self.akita.pk, 'gender', 'Male'): 1,
+            (self.akita.pk, 'color', 'Black'): 1,
+        })
+
+        dog.delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_bulk_writes(self):
+        Dog.objects.bulk_create([make_dog(self.beagle, age=age % 3) for age in range(10)])
+        Dog.objects.filter(age=0).update(gender='Female', breed=self.akita)
+        Dog.objects.filter(age=1).update(name='Renamed')
+        Dog.objects.filter(age=2).delete()
+        self.assertEqual(self.counts()[self.akita.pk, 'gender', 'Female'], 4)
+        self.assertEqual(self.counts()[self.beagle.pk, 'age', '1'], 3)
+        self.assertStatsConsistent()
+
+    def test_api_writes(self):
+        dog = make_dog(self.beagle)
+        dog.save()
+        response = self.client.patch(reverse('dog-detail', kwargs={'dog_id': dog.pk}), {'age': 5},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts()[self.beagle.pk, 'age', '5'], 1)
+        self.assertStatsConsistent()
+
+        self.beagle.delete()
+        self.assertFalse(BreedStat.objects.exists())
+
+    def test_stats_endpoint(self):
+        Dog.objects.bulk_create([
+            make_dog(self.beagle, age=2, gender='Male', color='Brown'),
+            make_dog(self.beagle, age=4, gender='Female', color='Brown'),
+            make_dog(self.beagle, age=10, gender='Female', color='White'),
+        ])
+        breed_catalog.snapshot()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            {'breed_id': self.akita.pk, 'name': 'Akita', 'dog_count': 0,
+             'age': {'min': None, 'max': None, 'mean': None, 'distribution': {}}, 'gender': {}, 'color': {}},
+            {'breed_id': self.beagle.pk, 'name': 'Beagle', 'dog_count': 3,
+             'age': {'min': 2, 'max': 10, 'mean': 5.33, 'distribution': {'2': 1, '4': 1, '10': 1}},
+             'gender': {'Female': 2, 'Male': 1}, 'color': {'Brown': 2, 'White': 1}},
+        ])
+
+        etag = response['ETag']
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        make_dog(self.akita).save()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.json()[0]['dog_count'], 1)
+
+    def test_query_count_does_not_depend_on_dogs(self):
+        breed_catalog.snapshot()
+        Dog.objects.bulk_create([make_dog(self.beagle, age=age % 5) for age in range(50)])
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_refresh_command(self):
+        Dog.objects.bulk_create([make_dog(self.beagle), make_dog(self.akita, color='Black')])
+        counts = self.counts()
+        BreedStat.objects.update(count=100)
+        out = StringIO()
+        call_command('refresh_breed_stats', stdout=out)
+        self.assertEqual(self.counts(), counts)
+        self.assertIn('6', out.getvalue())
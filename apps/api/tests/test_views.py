@@ -1,10 +1,23 @@
+import base64
+import json
+import re
 import unittest
+from contextlib import ExitStack
+from unittest import mock
 
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
+from django.conf import settings
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
+from apps.api.catalog import breed_catalog
+from apps.api.controllers import BreedDetail
 from apps.api.models import Dog, Breed
+from apps.api.query_budget import QueryBudgetExceeded, get_query_budget
+from apps.api.seed import seed_dogs
 from apps.api.serializers import DogSerializer, BreedSerializer
 
 
@@ -68,6 +81,44 @@ class DogDetailTestCase(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_get_dog_query_count(self):
+        breed_catalog.snapshot()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dog-detail', kwargs={'dog_id': self.dog.pk}))
+        self.assertEqual(response.data['breed']['name'], self.breed.name)
+
+    def test_partial_update_dog_single_query(self):
+        breed_catalog.snapshot()
+        url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        with self.assertNumQueries(1):
+            response = self.client.patch(url, {'age': 7}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.dog.refresh_from_db()
+        self.assertEqual(response.data, DogSerializer(self.dog).data)
+        self.assertEqual((self.dog.age, self.dog.name, self.dog.version), (7, 'Rex', 2))
+        self.assertEqual(response['ETag'], self.client.get(url)['ETag'])
+
+    def test_partial_update_dog_breed_moves_dog_count(self):
+        other = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3, shedding_amount=3,
+                                     exercise_needs=4)
+        url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        response = self.client.patch(url, {'breed_id': other.pk}, format='json')
+        self.assertEqual(response.data['breed']['name'], 'Beagle')
+        self.assertNotIn('dog_count', response.data['breed'])
+        self.assertEqual(dict(Breed.objects.values_list('name', 'dog_count')), {'Golden Retriever': 0, 'Beagle': 1})
+
+        self.client.delete(url)
+        self.assertEqual(Breed.objects.get(pk=other.pk).dog_count, 0)
+
+    def test_partial_update_invalid_dog(self):
+        url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        response = self.client.patch(url, {'name': ''}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(url, {'breed_id': 999}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(reverse('dog-detail', kwargs={'dog_id': 999}), {'age': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_delete_valid_dog(self):
         response = self.client.delete(
             reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
@@ -118,6 +169,20 @@ class DogListTestCase(APITestCase):
         self.assertEqual(response.data, serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_all_dogs_query_count_is_constant(self):
+        breeds = [
+            Breed.objects.create(name=f'Breed {i}', size='M', friendliness=3, trainability=3,
+                                 shedding_amount=3, exercise_needs=3)
+            for i in range(10)
+        ]
+        breed_catalog.snapshot()
+        for i, breed in enumerate(breeds):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender='Male', color='Black', favorite_food='Meat',
+                               favorite_toy='Ball', breed=breed)
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('dog-list'))
+            self.assertEqual(len(response.data), i + 1)
+
     def test_create_valid_dog(self):
         response = self.client.post(
             reverse('dog-list'),
@@ -135,6 +200,536 @@ class DogListTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+def get_next_link(response):
+    match = re.search(r'<([^>]+)>; rel="next"', response.get('Link', ''))
+    return match.group(1) if match else None
+
+
+class DogBulkCreateTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breeds = [
+            Breed.objects.create(name=f'Breed {i}', size='M', friendliness=3, trainability=3,
+                                 shedding_amount=3, exercise_needs=3)
+            for i in range(3)
+        ]
+
+    def make_items(self, count):
+        return [
+            {'name': f'Dog {i}', 'age': i, 'gender': 'Male', 'color': 'Black', 'favorite_food': 'Meat',
+             'favorite_toy': 'Ball', 'breed_id': self.breeds[i % 3].pk}
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        breed_catalog.snapshot()
+        # Три INSERT и одно изменение счётчиков собак пород на весь запрос.
+        with self.assertNumQueries(3 + 1) as captured:
+            response = self.client.post(reverse('dog-list') + '?batch_size=10', self.make_items(25), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 25)
+        self.assertEqual(response.data[4]['breed']['name'], 'Breed 1')
+        self.assertEqual(Dog.objects.count(), 25)
+        self.assertEqual([breed.dog_count for breed in Breed.objects.order_by('id')], [9, 8, 8])
+        inserts = [query for query in captured.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_bulk_create_atomic_rejects_everything(self):
+        items = self.make_items(3)
+        items[1]['age'] = -1
+        items[2]['breed_id'] = 999
+        response = self.client.post(reverse('dog-list'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('age', response.data[1])
+        self.assertIn('breed_id', response.data[2])
+        self.assertEqual(Dog.objects.count(), 0)
+
+    def test_bulk_create_best_effort(self):
+        items = self.make_items(4)
+        items[2]['name'] = ''
+        items.append('not a dog')
+        response = self.client.post(reverse('dog-list') + '?mode=best_effort', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(response.data['created']), 3)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 4])
+        self.assertEqual(Dog.objects.count(), 3)
+
+    def test_bulk_create_best_effort_all_invalid(self):
+        items = self.make_items(2)
+        for item in items:
+            item['age'] = 'old'
+        response = self.client.post(reverse('dog-list') + '?mode=best_effort', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], [])
+
+    def test_bulk_create_unknown_mode(self):
+        response = self.client.post(reverse('dog-list') + '?mode=sometimes', self.make_items(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('mode', response.data)
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many_items(self):
+        response = self.client.post(reverse('dog-list'), self.make_items(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DogBulkUpdateDeleteTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breeds = [
+            Breed.objects.create(name=f'Breed {i}', size='M', friendliness=3, trainability=3,
+                                 shedding_amount=3, exercise_needs=3)
+            for i in range(2)
+        ]
+        self.dogs = Dog.objects.bulk_create([
+            Dog(name=f'Dog {i}', age=i, gender='Male', color='Black', favorite_food='Meat', favorite_toy='Ball',
+                breed=self.breeds[i % 2])
+            for i in range(20)
+        ])
+        breed_catalog.snapshot()
+
+    def test_bulk_patch_groups_homogeneous_changes(self):
+        items = [{'id': dog.pk, 'color': 'White'} for dog in self.dogs[:10]]
+        items += [{'id': dog.pk, 'age': 1, 'breed_id': self.breeds[0].pk} for dog in self.dogs[10:]]
+        # Смена породы добавляет блокировку строк группы и изменение счётчиков собак пород.
+        with self.assertNumQueries(1 + 2 + 2 + 2) as captured:
+            response = self.client.patch(reverse('dog-list'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 20, 'errors': []})
+        updates = [query for query in captured.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual([breed.dog_count for breed in Breed.objects.order_by('id')], [15, 5])
+        self.assertEqual(Dog.objects.filter(color='White').count(), 10)
+        self.assertEqual(Dog.objects.filter(age=1, breed=self.breeds[0]).count(), 10)
+        self.assertEqual(Dog.objects.get(pk=self.dogs[0].pk).version, 2)
+
+    def test_bulk_patch_ids_and_changes(self):
+        ids = [dog.pk for dog in self.dogs]
+        response = self.client.patch(reverse('dog-list'), {'ids': ids, 'changes': {'gender': 'Female'}},
+                                     format='json')
+        self.assertEqual(response.data['updated'], 20)
+        self.assertEqual(Dog.objects.filter(gender='Female').count(), 20)
+
+    def test_bulk_patch_atomic_errors(self):
+        items = [
+            {'id': self.dogs[0].pk, 'age': 50},
+            {'id': 0, 'age': 50},
+            {'id': self.dogs[1].pk, 'age': -1},
+            {'id': self.dogs[2].pk, 'nickname': 'Rex'},
+            {'id': self.dogs[0].pk, 'age': 60},
+        ]
+        response = self.client.patch(reverse('dog-list'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4])
+        self.assertFalse(Dog.objects.filter(age=50).exists())
+
+    def test_bulk_patch_best_effort(self):
+        items = [{'id': self.dogs[0].pk, 'age': 50}, {'id': 0, 'age': 50}]
+        response = self.client.patch(reverse('dog-list') + '?mode=best_effort', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(Dog.objects.get(pk=self.dogs[0].pk).age, 50)
+
+    def test_bulk_delete_by_ids(self):
+        ids = [dog.pk for dog in self.dogs[:15]]
+        # На пачку: DELETE с подсчётом собак по породам и изменение счётчиков пород; не на PostgreSQL
+        # перед DELETE строки блокируются и читаются.
+        per_batch = 2 if connection.vendor == 'postgresql' else 3
+        with self.assertNumQueries(2 * per_batch + 2):
+            response = self.client.delete(reverse('dog-list') + '?batch_size=10', {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'deleted': 15})
+        self.assertEqual([breed.dog_count for breed in Breed.objects.order_by('id')], [2, 3])
+        self.assertEqual(Dog.objects.count(), 5)
+
+    def test_bulk_delete_by_filter(self):
+        with self.assertNumQueries(2 if connection.vendor == 'postgresql' else 3):
+            response = self.client.delete(reverse('dog-list'), {'filter': {'breed_id': self.breeds[1].pk,
+                                                                           'age__gte': '10'}}, format='json')
+        self.assertEqual(response.data, {'deleted': 5})
+        self.assertEqual(Breed.objects.get(pk=self.breeds[1].pk).dog_count, 5)
+        self.assertEqual(Dog.objects.count(), 15)
+
+    def test_bulk_delete_requires_condition(self):
+        for data in [{}, {'filter': {}}, {'ids': []}, {'ids': ['a']}, {'filter': {'owner': 'me'}},
+                     {'filter': {'age__gte': 'old'}}]:
+            response = self.client.delete(reverse('dog-list'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertEqual(Dog.objects.count(), 20)
+
+
+class PaginationTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for name in ['Pug', 'Akita', 'Beagle', 'Akita', 'Collie']:
+            breed = Breed.objects.create(name=name, size='M', friendliness=3, trainability=3,
+                                         shedding_amount=3, exercise_needs=3)
+            Dog.objects.create(name=f'{name} dog', age=1, gender='Male', color='Black', favorite_food='Meat',
+                               favorite_toy='Ball', breed=breed)
+
+    def collect_pages(self, url):
+        items = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data), 2)
+            items.extend(response.data)
+            url = get_next_link(response)
+        return items
+
+    def test_dogs_are_paginated_by_id(self):
+        dogs = self.collect_pages(reverse('dog-list') + '?limit=2')
+        self.assertEqual([dog['id'] for dog in dogs], list(Dog.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_breeds_are_paginated_by_name_and_id(self):
+        breeds = self.collect_pages(reverse('breed-list') + '?limit=2')
+        expected = list(Breed.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual([breed['id'] for breed in breeds], expected)
+
+    def test_deep_page_query_count(self):
+        response = self.client.get(reverse('dog-list') + '?limit=2')
+        response = self.client.get(get_next_link(response))
+        with self.assertNumQueries(1):
+            response = self.client.get(get_next_link(response))
+        self.assertEqual(len(response.data), 1)
+        self.assertIsNone(get_next_link(response))
+
+    def test_breed_pages_are_served_from_catalog(self):
+        response = self.client.get(reverse('breed-list') + '?limit=2')
+        with self.assertNumQueries(1) as captured:
+            response = self.client.get(get_next_link(response))
+        self.assertIn('dog_count', captured.captured_queries[0]['sql'])
+        self.assertNotIn('"name"', captured.captured_queries[0]['sql'])
+        self.assertEqual([breed['name'] for breed in response.data], ['Beagle', 'Collie'])
+
+    def test_breed_page_after_deleted_breed(self):
+        response = self.client.get(reverse('breed-list') + '?limit=2')
+        Breed.objects.get(pk=response.data[-1]['id']).delete()
+        response = self.client.get(get_next_link(response))
+        self.assertEqual([breed['name'] for breed in response.data], ['Beagle', 'Collie'])
+
+    @override_settings(API_PAGE_SIZE=3)
+    def test_default_page_size(self):
+        response = self.client.get(reverse('dog-list'))
+        self.assertEqual(len(response.data), 3)
+        self.assertIsNotNone(get_next_link(response))
+
+    @override_settings(API_MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse('dog-list') + '?limit=100')
+        self.assertEqual(len(response.data), 4)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('dog-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor(self):
+        cursors = [
+            ('dog-list', '', ['abc']),
+            ('dog-list', '', [{'a': 1}]),
+            ('dog-list', '', [None]),
+            ('dog-list', '', [True]),
+            ('dog-list', '', [1.5]),
+            ('dog-list', '&ordering=name', ['A', 'x']),
+            ('dog-list', '&ordering=name', [None, None]),
+            ('dog-list', '&ordering=-age', ['x', 1]),
+            ('breed-list', '', [[1], [2]]),
+            ('breed-list', '', ['Beagle', 'x']),
+            ('breed-list', '', [None, None]),
+            ('breed-list', '', [{'a': 1}, 1]),
+        ]
+        for name, query, position in cursors:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            with self.subTest(url=name, query=query, position=position):
+                response = self.client.get(f'{reverse(name)}?cursor={cursor}{query}')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DogFilterTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.small = Breed.objects.create(name='Pug', size='S', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=2)
+        self.large = Breed.objects.create(name='Mastiff', size='L', friendliness=4, trainability=3,
+                                          shedding_amount=2, exercise_needs=3)
+        for i in range(6):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender=('Male', 'Female')[i % 2],
+                               color=('Black', 'White')[i % 3 == 0], favorite_food='Meat', favorite_toy='Ball',
+                               breed=(self.small, self.large)[i % 2])
+
+    def get_names(self, query):
+        response = self.client.get(reverse('dog-list') + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [dog['name'] for dog in response.data]
+
+    def test_filters(self):
+        self.assertEqual(self.get_names(f'?breed_id={self.large.pk}&age__gte=2'), ['Dog 3', 'Dog 5'])
+        self.assertEqual(self.get_names('?color=White&gender=Male'), ['Dog 0'])
+        self.assertEqual(self.get_names('?breed__size=S&age__lte=3'), ['Dog 0', 'Dog 2'])
+
+    def test_ordering_with_pagination(self):
+        response = self.client.get(reverse('dog-list') + '?gender=Male&ordering=-age&limit=2')
+        self.assertEqual([dog['name'] for dog in response.data], ['Dog 4', 'Dog 2'])
+        response = self.client.get(get_next_link(response))
+        self.assertEqual([dog['name'] for dog in response.data], ['Dog 0'])
+        self.assertIsNone(get_next_link(response))
+
+    def test_stream_is_filtered(self):
+        response = self.client.get(reverse('dog-list') + '?stream=1&breed__size=L&ordering=-age')
+        content = b''.join(response.streaming_content)
+        self.assertEqual([dog['name'] for dog in json.loads(content)], ['Dog 5', 'Dog 3', 'Dog 1'])
+
+    def test_invalid_parameters(self):
+        for query in ('?colour=Black', '?age__gte=old', '?ordering=color'):
+            response = self.client.get(reverse('dog-list') + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class DogFieldsetTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breed = Breed.objects.create(name='Corgi', size='S', friendliness=5, trainability=4,
+                                          shedding_amount=4, exercise_needs=3)
+        for i in range(5):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender='Male', color='Red', favorite_food='Meat',
+                               favorite_toy='Ball', breed=self.breed)
+        self.dog = Dog.objects.order_by('id').first()
+        breed_catalog.snapshot()
+
+    def get(self, url, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries[-1]['sql']
+
+    def test_list_fields(self):
+        response, sql = self.get(reverse('dog-list'), '?fields=name,age&limit=2')
+        self.assertEqual(response.json(), [{'name': 'Dog 0', 'age': 0}, {'name': 'Dog 1', 'age': 1}])
+        self.assertNotIn('favorite_food', sql)
+        self.assertNotIn('breed_id', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_pagination_without_key_fields(self):
+        response, _ = self.get(reverse('dog-list'), '?fields=name&ordering=-age&limit=2')
+        self.assertEqual(response.json(), [{'name': 'Dog 4'}, {'name': 'Dog 3'}])
+        response = self.client.get(get_next_link(response))
+        self.assertEqual(response.json(), [{'name': 'Dog 2'}, {'name': 'Dog 1'}])
+
+    def test_breed_fields(self):
+        breed = BreedSerializer(self.breed).data
+        del breed['dog_count']
+        response, sql = self.get(reverse('dog-detail', kwargs={'dog_id': self.dog.pk}), '?fields=id,breed.name')
+        self.assertEqual(response.json(), {'id': self.dog.pk, 'breed': {'name': 'Corgi'}})
+        self.assertNotIn('JOIN', sql)
+        response, _ = self.get(reverse('dog-detail', kwargs={'dog_id': self.dog.pk}), '?fields=id&expand=breed')
+        self.assertEqual(response.json(), {'id': self.dog.pk, 'breed': breed})
+        response, _ = self.get(reverse('dog-detail', kwargs={'dog_id': self.dog.pk}), '?expand=breed')
+        self.assertEqual(response.json(), DogSerializer(self.dog).data)
+
+    def test_search_and_stream(self):
+        # На PostgreSQL поиск находит и похожие имена, поэтому проверяется лучшее совпадение.
+        response, _ = self.get(reverse('dog-list'), '?q=dog%201&fields=id&limit=1')
+        self.assertEqual(response.json(), [{'id': Dog.objects.get(name='Dog 1').pk}])
+        response = self.client.get(reverse('dog-list') + '?stream=1&fields=name&age__lte=1')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(json.loads(content), [{'name': 'Dog 0'}, {'name': 'Dog 1'}])
+
+    def test_fields_change_etag(self):
+        url = reverse('dog-list')
+        etag = self.client.get(url + '?fields=id')['ETag']
+        self.assertNotEqual(self.client.get(url + '?fields=name')['ETag'], etag)
+        response = self.client.get(url + '?fields=id', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_fields(self):
+        for query in ('?fields=id,owner', '?fields=breed.dog_count', '?fields=id.name', '?fields=,', '?expand=name'):
+            response = self.client.get(reverse('dog-list') + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+
+class SearchTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breed = Breed.objects.create(name='Bernese Mountain Dog', size='L', friendliness=5, trainability=4,
+                                          shedding_amount=5, exercise_needs=3)
+        Breed.objects.create(name='Bernedoodle', size='M', friendliness=5, trainability=4, shedding_amount=2,
+                             exercise_needs=3)
+        for name, age in (('Barbie', 1), ('Rex', 2), ('Rexanne', 3), ('T-Rex', 4), ('Max', 5)):
+            Dog.objects.create(name=name, age=age, gender='Female', color='Black', favorite_food='Meat',
+                               favorite_toy='Ball', breed=self.breed)
+
+    def search(self, name, query):
+        response = self.client.get(reverse(name) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Link', response)
+        return [item['name'] for item in response.data]
+
+    def test_search_dogs_is_ranked(self):
+        self.assertEqual(self.search('dog-list', '?q=rex'), ['Rex', 'Rexanne', 'T-Rex'])
+
+    def test_search_dogs_with_filters_and_limit(self):
+        self.assertEqual(self.search('dog-list', '?q=rex&age__gte=3'), ['Rexanne', 'T-Rex'])
+        self.assertEqual(self.search('dog-list', '?q=rex&limit=1'), ['Rex'])
+        with override_settings(API_SEARCH_MAX_RESULTS=2):
+            self.assertEqual(len(self.search('dog-list', '?q=r&limit=50')), 2)
+
+    def test_search_breeds(self):
+        self.assertEqual(self.search('breed-list', '?q=berne'), ['Bernedoodle', 'Bernese Mountain Dog'])
+        self.assertEqual(self.search('breed-list', '?q=mountain'), ['Bernese Mountain Dog'])
+
+    def test_search_not_modified(self):
+        response = self.client.get(reverse('dog-list') + '?q=rex')
+        response = self.client.get(reverse('dog-list') + '?q=rex', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('dog-list') + '?q=%20')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(API_STREAM_CHUNK_SIZE=2)
+class DogStreamTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breed = Breed.objects.create(name='Husky', size='L', friendliness=4, trainability=3,
+                                          shedding_amount=5, exercise_needs=5)
+        for i in range(5):
+            Dog.objects.create(name=f'Dog {i}', age=i, gender='Female', color='White', favorite_food='Fish',
+                               favorite_toy='Rope', breed=self.breed)
+        self.expected = DogSerializer(Dog.objects.order_by('id'), many=True).data
+
+    def test_stream_json_array(self):
+        breed_catalog.snapshot()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dog-list') + '?stream=1&limit=1')
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), self.expected)
+
+    def test_stream_ndjson(self):
+        response = self.client.get(reverse('dog-list'), HTTP_ACCEPT='application/x-ndjson')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in content.splitlines()], self.expected)
+
+    def test_stream_empty_table(self):
+        Dog.objects.all().delete()
+        response = self.client.get(reverse('dog-list') + '?stream=1')
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+
+class ConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.breed = Breed.objects.create(name='Corgi', size='S', friendliness=5, trainability=4,
+                                          shedding_amount=4, exercise_needs=3)
+        self.dog = Dog.objects.create(name='Rex', age=5, gender='Male', color='Red', favorite_food='Bone',
+                                      favorite_toy='Ball', breed=self.breed)
+        self.payload = {
+            'name': 'Rexie',
+            'age': 6,
+            'gender': 'Male',
+            'color': 'Red',
+            'favorite_food': 'Chicken',
+            'favorite_toy': 'Frisbee',
+            'breed_id': self.breed.id
+        }
+        self.dog_url = reverse('dog-detail', kwargs={'dog_id': self.dog.pk})
+        breed_catalog.snapshot()
+
+    def test_dog_detail_not_modified(self):
+        response = self.client.get(self.dog_url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.dog_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('ETag', response)
+
+    def test_dog_etag_changes_with_dog_and_breed(self):
+        etag = self.client.get(self.dog_url)['ETag']
+        self.dog.age = 6
+        self.dog.save()
+        changed_dog = self.client.get(self.dog_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed_dog.status_code, status.HTTP_200_OK)
+        self.breed.friendliness = 4
+        self.breed.save()
+        changed_breed = self.client.get(self.dog_url, HTTP_IF_NONE_MATCH=changed_dog['ETag'])
+        self.assertEqual(changed_breed.status_code, status.HTTP_200_OK)
+
+    def test_dog_list_not_modified_without_loading_rows(self):
+        response = self.client.get(reverse('dog-list'))
+        with self.assertNumQueries(1) as captured:
+            response = self.client.get(reverse('dog-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('COUNT', captured.captured_queries[0]['sql'].upper())
+
+    def test_dog_list_etag_changes_on_delete(self):
+        Dog.objects.create(name='Max', age=2, gender='Male', color='Red', favorite_food='Bone',
+                           favorite_toy='Ball', breed=self.breed)
+        etag = self.client.get(reverse('dog-list'))['ETag']
+        self.dog.delete()
+        response = self.client.get(reverse('dog-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_dog_list_etag_depends_on_page(self):
+        first = self.client.get(reverse('dog-list'))['ETag']
+        second = self.client.get(reverse('dog-list') + '?limit=1')['ETag']
+        self.assertNotEqual(first, second)
+
+    def test_breed_list_and_detail_not_modified(self):
+        for url in [reverse('breed-list'), reverse('breed-detail', args=[self.breed.pk])]:
+            etag = self.client.get(url)['ETag']
+            # Из базы читаются только счётчики собак.
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_put_with_matching_etag(self):
+        etag = self.client.get(self.dog_url)['ETag']
+        response = self.client.put(self.dog_url, self.payload, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['ETag'], self.client.get(self.dog_url)['ETag'])
+        self.dog.refresh_from_db()
+        self.assertEqual(self.dog.version, 2)
+
+    def test_put_with_stale_etag(self):
+        etag = self.client.get(self.dog_url)['ETag']
+        self.dog.save()
+        response = self.client.put(self.dog_url, self.payload, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.dog.refresh_from_db()
+        self.assertEqual(self.dog.name, 'Rex')
+
+    def test_patch_with_if_match(self):
+        etag = self.client.get(self.dog_url)['ETag']
+        response = self.client.patch(self.dog_url, {'name': 'Max'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.dog_url, {'name': 'Bob'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.dog.refresh_from_db()
+        self.assertEqual(self.dog.name, 'Max')
+
+    def test_delete_with_stale_etag(self):
+        response = self.client.delete(self.dog_url, HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Dog.objects.filter(pk=self.dog.pk).exists())
+
+    def test_breed_update_and_delete_with_if_match(self):
+        url = reverse('breed-detail', args=[self.breed.pk])
+        etag = self.client.get(url)['ETag']
+        data = {'name': 'Corgi', 'size': 'S', 'friendliness': 4, 'trainability': 4, 'shedding_amount': 4,
+                'exercise_needs': 3}
+        response = self.client.put(url, data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(url, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(url, HTTP_IF_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
 class BreedAPITests(APITestCase):
 
     def setUp(self):
@@ -188,8 +783,209 @@ class BreedAPITests(APITestCase):
         self.breed.refresh_from_db()
         self.assertEqual(self.breed.friendliness, 4)
 
+    def test_partial_update_breed(self):
+        url = reverse('breed-detail', args=[self.breed.id])
+        self.assertEqual(self.client.get(url).data['friendliness'], self.breed.friendliness)
+        response = self.client.patch(url, {'friendliness': 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['friendliness'], 1)
+        self.assertEqual(self.client.get(url).data['friendliness'], 1)
+        self.breed.refresh_from_db()
+        self.assertEqual(self.breed.version, 2)
+
+    def test_breed_dog_count(self):
+        detail_url = reverse('breed-detail', args=[self.breed.id])
+        etags = {url: self.client.get(url)['ETag'] for url in [detail_url, reverse('breed-list')]}
+        self.assertEqual(self.client.get(detail_url).data['dog_count'], 0)
+        Dog.objects.create(name='Rex', age=5, gender='Male', color='Black', favorite_food='Bone',
+                           favorite_toy='Ball', breed=self.breed)
+
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['dog_count'], 1)
+        self.assertEqual(self.client.get(reverse('breed-list') + '?q=lab').data[0]['dog_count'], 1)
+
+        response = self.client.put(detail_url, {'name': 'Lab', 'size': 'L', 'friendliness': 5, 'trainability': 4,
+                                                'shedding_amount': 3, 'exercise_needs': 5, 'dog_count': 100},
+                                   format='json')
+        self.assertEqual(response.data['dog_count'], 1)
+
+    # Запросы собаки, созданной «другим запросом», считаются в бюджете PUT: без этого они дали бы
+    # предупреждение о превышении бюджета, которого в настоящем запросе нет.
+    @override_settings(API_QUERY_BUDGET_ACTION='off')
+    def test_update_breed_keeps_concurrent_dog_count(self):
+        Dog.objects.create(name='Rex', age=5, gender='Male', color='Black', favorite_food='Bone',
+                           favorite_toy='Ball', breed=self.breed)
+        get_object = BreedDetail.get_object
+
+        def get_object_then_add_dog(view, request, breed_id):
+            # Собака создаётся другим запросом между загрузкой породы и её сохранением.
+            breed = get_object(view, request, breed_id)
+            Dog.objects.create(name='Max', age=2, gender='Male', color='Brown', favorite_food='Fish',
+                               favorite_toy='Rope', breed_id=breed_id)
+            return breed
+
+        with mock.patch.object(BreedDetail, 'get_object', get_object_then_add_dog):
+            response = self.client.put(reverse('breed-detail', args=[self.breed.id]),
+                                       {'name': 'Lab', 'size': 'L', 'friendliness': 5, 'trainability': 4,
+                                        'shedding_amount': 3, 'exercise_needs': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['dog_count'], 2)
+        self.breed.refresh_from_db()
+        self.assertEqual((self.breed.name, self.breed.dog_count), ('Lab', 2))
+
+    def test_save_does_not_write_dog_count(self):
+        Dog.objects.create(name='Rex', age=5, gender='Male', color='Black', favorite_food='Bone',
+                           favorite_toy='Ball', breed=self.breed)
+        self.breed.friendliness = 1
+        self.breed.save()
+        self.breed.save(update_fields=['name', 'dog_count'])
+        self.assertEqual(Breed.objects.get(pk=self.breed.pk).dog_count, 1)
+
     def test_delete_breed(self):
         url = reverse('breed-detail', args=[self.breed.id])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Breed.objects.count(), 0)
+
+
+class QueryBudgetMixin:
+    """
+    Проверка бюджетов SQL-запросов из API_QUERY_BUDGETS на наборах данных из `dataset_sizes` собак.
+
+    На каждом размере запрос выполняется с холодным и с прогретым справочником пород. Число запросов
+    не должно превышать бюджет маршрута и не должно меняться с числом собак: рост означает N+1.
+    """
+    dataset_sizes = (1, 20, 100)
+    breeds = 5
+
+    def dataset_ids(self):
+        # Собака из середины таблицы, её порода, другая порода и порода с наибольшим числом собак.
+        dogs = Dog.objects.order_by('pk').values_list('pk', 'breed_id')
+        dog_id, dog_breed_id = dogs[len(dogs) // 2]
+        breeds = list(Breed.objects.order_by('-dog_count', 'pk').values_list('pk', flat=True)[:2])
+        return {
+            'dog_id': dog_id,
+            'breed_id': breeds[0],
+            'dog_breed_id': dog_breed_id,
+            'other_breed_id': next(pk for pk in breeds if pk != dog_breed_id),
+        }
+
+    def count_queries(self, method, url_name, url_kwargs, query, data):
+        ids = self.dataset_ids()
+        url = reverse(url_name, kwargs={name: ids[name] for name in url_kwargs}) + query
+        if data is not None:
+            data = {key: ids[value] if value in ids else value for key, value in data.items()}
+        with ExitStack() as stack:
+            captured = [stack.enter_context(CaptureQueriesContext(c)) for c in connections.all()]
+            response = self.client.generic(method, url, json.dumps(data) if data is not None else '',
+                                           content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f'{method} {url}: {response.status_code}')
+        return sum(len(context.captured_queries) for context in captured)
+
+    def assertQueryBudget(self, url_name, method='GET', url_kwargs=(), query='', data=None):
+        """
+        `url_kwargs` — имена параметров маршрута (dog_id, breed_id), `data` — тело запроса; значения-ключи
+        `dataset_ids` в нём заменяются ID из текущего набора данных.
+        """
+        budget = get_query_budget(url_name, method)
+        self.assertIsNotNone(budget, f'Нет бюджета запросов для {method} {url_name}')
+        counts = {}
+        for size in self.dataset_sizes:
+            seed_dogs(max(size - Dog.objects.count(), 0), 0 if Breed.objects.exists() else self.breeds, seed=size)
+            breed_catalog.invalidate()
+            cold = self.count_queries(method, url_name, url_kwargs, query, data)
+            warm = self.count_queries(method, url_name, url_kwargs, query, data)
+            self.assertLessEqual(max(cold, warm), budget,
+                                 f'{method} {url_name}{query}: {cold} SQL-запросов при бюджете {budget}')
+            counts[size] = (cold, warm)
+        self.assertEqual(len(set(counts.values())), 1,
+                         f'{method} {url_name}{query}: число запросов зависит от числа собак {counts}')
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    dog_payload = {'name': 'Rex', 'age': 5, 'gender': 'Male', 'color': 'Black', 'favorite_food': 'Bone',
+                   'favorite_toy': 'Ball', 'breed_id': 'dog_breed_id'}
+    breed_payload = {'name': 'Labrador', 'size': 'L', 'friendliness': 5, 'trainability': 4, 'shedding_amount': 3,
+                     'exercise_needs': 5}
+
+    def test_dog_list(self):
+        for query in ('', '?limit=5', '?breed_id=1&age__gte=2&ordering=-age,name', '?fields=id,name,breed.name',
+                      '?q=Max', '?stream=1&format=ndjson'):
+            with self.subTest(query=query):
+                self.assertQueryBudget('dog-list', query=query)
+
+    def test_dog_detail(self):
+        self.assertQueryBudget('dog-detail', url_kwargs=['dog_id'])
+        self.assertQueryBudget('dog-detail', 'PUT', ['dog_id'], data=self.dog_payload)
+        self.assertQueryBudget('dog-detail', 'PATCH', ['dog_id'], data={'age': 3})
+        self.assertQueryBudget('dog-detail', 'PATCH', ['dog_id'], data={'breed_id': 'other_breed_id'})
+        self.assertQueryBudget('dog-detail', 'DELETE', ['dog_id'])
+
+    def test_breeds(self):
+        self.assertQueryBudget('breed-list')
+        self.assertQueryBudget('breed-list', query='?q=lab')
+        self.assertQueryBudget('breed-detail', url_kwargs=['breed_id'])
+        self.assertQueryBudget('breed-detail', 'PUT', ['breed_id'], data=self.breed_payload)
+        self.assertQueryBudget('breed-detail', 'PATCH', ['breed_id'], data={'friendliness': 1})
+        self.assertQueryBudget('breed-stats')
+        self.assertQueryBudget('response-cache-stats')
+
+    def test_breed_create_and_delete(self):
+        for size in self.dataset_sizes:
+            seed_dogs(max(size - Dog.objects.count(), 0), 0 if Breed.objects.exists() else self.breeds, seed=size)
+            with self.assertNumQueries(get_query_budget('breed-list', 'POST')):
+                response = self.client.post(reverse('breed-list'), dict(self.breed_payload, name=f'New {size}'),
+                                            format='json')
+            # Удаление породы без собак: каскадное удаление собак — отдельная операция, зависящая от их числа.
+            with self.assertNumQueries(get_query_budget('breed-detail', 'DELETE')):
+                self.client.delete(reverse('breed-detail', args=[response.data['id']]))
+
+    def test_every_route_has_budget(self):
+        from apps.api.urls import urlpatterns
+
+        self.assertEqual({pattern.name for pattern in urlpatterns}, set(settings.API_QUERY_BUDGETS))
+
+
+class QueryBudgetMiddlewareTestCase(APITestCase):
+    def setUp(self):
+        self.breed = Breed.objects.create(name='Beagle', size='M', friendliness=5, trainability=3,
+                                          shedding_amount=3, exercise_needs=4)
+        breed_catalog.snapshot()
+
+    def test_headers(self):
+        response = self.client.get(reverse('dog-list'))
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries", total;dur=[\d.]+$')
+
+    def test_request_is_logged(self):
+        with self.assertLogs('apps.api.query_budget', 'INFO') as logs:
+            self.client.get(reverse('breed-detail', args=[self.breed.pk]))
+        record = logs.records[0]
+        self.assertEqual((record.method, record.view, record.status, record.queries, record.budget),
+                         ('GET', 'breed-detail', 200, 1, 2))
+        self.assertIn('view=breed-detail status=200 queries=1 db_ms=', record.getMessage())
+
+    @override_settings(API_QUERY_BUDGETS={'dog-list': {'GET': 0}})
+    def test_budget_exceeded_warns(self):
+        with self.assertLogs('apps.api.query_budget', 'WARNING') as logs:
+            response = self.client.get(reverse('dog-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(logs.records[0].getMessage(), 'GET dog-list: 1 SQL-запросов при бюджете 0')
+
+    @override_settings(API_QUERY_BUDGETS={'dog-list': {'GET': 0}}, API_QUERY_BUDGET_ACTION='raise')
+    def test_budget_exceeded_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'GET dog-list: 1 SQL-запросов при бюджете 0'):
+            self.client.get(reverse('dog-list'))
+        # HEAD без своего бюджета проверяется по бюджету GET.
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.head(reverse('dog-list'))
+
+    @override_settings(API_QUERY_BUDGETS={'dog-list': {'GET': 0}}, API_QUERY_BUDGET_ACTION='off')
+    def test_budget_check_off(self):
+        with self.assertNoLogs('apps.api.query_budget', 'WARNING'):
+            response = self.client.get(reverse('dog-list'))
+        self.assertEqual(response['X-Query-Count'], '1')
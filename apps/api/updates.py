@@ -0,0 +1,64 @@
+from django.db import connections, models, router
+from django.db.models import F, signals
+from django.utils import timezone
+
+# Бэкенды, поддерживающие UPDATE ... RETURNING (SQLite — начиная с 3.35).
+UPDATE_RETURNING_VENDORS = ('postgresql', 'sqlite')
+
+
+def versioned_update(queryset, attrs):
+    """
+    UPDATE выборки с увеличением версии и времени изменения строк.
+    """
+    return queryset.update(**attrs, version=F('version') + 1, updated_at=timezone.now())
+
+
+def supports_update_returning(connection):
+    return connection.vendor in UPDATE_RETURNING_VENDORS and connection.features.can_return_columns_from_insert
+
+
+def update_returning(model, pk, attrs):
+    """
+    Обновляет поля `attrs` одной строки, увеличивает её версию и возвращает обновлённый объект.
+
+    На PostgreSQL и SQLite это один запрос `UPDATE ... WHERE id = %s RETURNING *`; на остальных
+    бэкендах — UPDATE и SELECT. Если строки нет, возвращает None.
+
+    Для обновлённого объекта отправляется `post_save`, как после `save(update_fields=...)`:
+    по нему сбрасываются кэши справочника пород и ответов API.
+    """
+    connection = connections[router.db_for_write(model)]
+    instance = update_row(connection, model, pk, attrs)
+    if instance is not None:
+        signals.post_save.send(sender=model, instance=instance, created=False, raw=False, using=connection.alias,
+                               update_fields=frozenset(attrs))
+    return instance
+
+
+def update_row(connection, model, pk, attrs):
+    if not supports_update_returning(connection):
+        if not versioned_update(model._default_manager.db_manager(connection.alias).filter(pk=pk), attrs):
+            return None
+        return model._default_manager.db_manager(connection.alias).filter(pk=pk).first()
+
+    opts = model._meta
+    quote_name = connection.ops.quote_name
+    version_column = quote_name(opts.get_field('version').column)
+    assignments = [f'{version_column} = {version_column} + 1']
+    params = []
+    values = dict(attrs, updated_at=timezone.now())
+    for name, value in values.items():
+        field = opts.get_field(name)
+        if isinstance(value, models.Model):
+            value = value.pk
+        assignments.append(f'{quote_name(field.column)} = %s')
+        params.append(field.get_db_prep_save(value, connection))
+    params.append(opts.pk.get_db_prep_value(pk, connection))
+
+    sql = (
+        f'UPDATE {quote_name(opts.db_table)} SET {", ".join(assignments)} '
+        f'WHERE {quote_name(opts.pk.column)} = %s RETURNING *'
+    )
+    # RawQuerySet сопоставляет колонки с полями модели и применяет конвертеры бэкенда.
+    instances = list(model._default_manager.db_manager(connection.alias).raw(sql, params))
+    return instances[0] if instances else None
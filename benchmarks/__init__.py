@@ -0,0 +1,64 @@
+"""
+Бенчмарки производительности API.
+
+Скрипты запускаются из корня проекта, например `python -m benchmarks.bench_serializers`.
+Данные создаются во временной тестовой базе, настроенной так же, как для `manage.py test`.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dogs.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Создаёт тестовую базу на время бенчмарка и удаляет её после.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def make_dataset(dogs, breeds, batch_size=5000):
+    """
+    Заполняет базу `breeds` породами и `dogs` собаками.
+    """
+    from apps.api.models import Breed, Dog
+
+    breed_objects = Breed.objects.bulk_create([
+        Breed(name=f'Breed {i}', size='TSML'[i % 4], friendliness=i % 5 + 1, trainability=(i + 1) % 5 + 1,
+              shedding_amount=(i + 2) % 5 + 1, exercise_needs=(i + 3) % 5 + 1)
+        for i in range(breeds)
+    ])
+    breed_ids = [breed.pk for breed in breed_objects]
+    Dog.objects.bulk_create(
+        (Dog(name=f'Dog {i}', age=i % 16, gender=('Male', 'Female')[i % 2], color=('Black', 'White', 'Brown')[i % 3],
+             favorite_food='Chicken', favorite_toy='Ball', breed_id=breed_ids[i % breeds])
+         for i in range(dogs)),
+        batch_size=batch_size
+    )
+
+
+def measure(func, repeat):
+    """
+    Лучшее время выполнения `func` из `repeat` запусков, в секундах.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
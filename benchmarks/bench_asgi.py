@@ -0,0 +1,166 @@
+"""
+Сравнение синхронных и асинхронных контроллеров API под ASGI-сервером uvicorn.
+
+    python -m benchmarks.bench_asgi --dogs 20000 --breeds 200 --concurrency 64 --duration 10
+
+Для каждого режима (API_ASYNC_VIEWS=False и True) на временной тестовой базе запускается
+`uvicorn dogs.asgi:application`, и `--concurrency` соединений с keep-alive в течение `--duration`
+секунд отправляют GET-запросы к каждому маршруту. Печатаются запросы в секунду и задержки p50/p99.
+
+Нужен установленный uvicorn (`pip install uvicorn`) и база, доступная из другого процесса
+(PostgreSQL; SQLite в памяти не подходит).
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import make_dataset, setup, test_database
+
+
+async def read_response(reader):
+    """
+    Читает ответ HTTP/1.1 и возвращает (статус, закрыл ли сервер соединение).
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+async def worker(port, path, deadline, latencies, errors):
+    request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: application/json\r\n\r\n'.encode()
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        started = time.perf_counter()
+        try:
+            writer.write(request)
+            status, closed = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            errors.append(path)
+            writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(path)
+        if closed:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, path, concurrency, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(worker(port, path, deadline, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else float('nan')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'uvicorn не запустился на порту {port}')
+
+
+def start_server(port, async_views, db_name, workers):
+    env = dict(os.environ, DB_NAME=db_name, API_ASYNC_VIEWS=str(async_views))
+    command = [sys.executable, '-m', 'uvicorn', 'dogs.asgi:application', '--host', '127.0.0.1',
+               '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log']
+    process = subprocess.Popen(command, env=env)
+    try:
+        wait_for_server(port)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dogs', type=int, default=20000)
+    parser.add_argument('--breeds', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--limit', type=int, default=20, help='Размер страницы для списков')
+    args = parser.parse_args()
+
+    if importlib.util.find_spec('uvicorn') is None:
+        parser.exit(1, 'Для бенчмарка нужен uvicorn: pip install uvicorn\n')
+
+    setup()
+    from django.db import connection
+
+    from apps.api.models import Breed, Dog
+
+    with test_database():
+        make_dataset(args.dogs, args.breeds)
+        dog_id = Dog.objects.values_list('pk', flat=True).first()
+        breed_id = Breed.objects.values_list('pk', flat=True).first()
+        paths = [
+            f'/api/dogs/?limit={args.limit}',
+            f'/api/dogs/{dog_id}',
+            f'/api/breeds/?limit={args.limit}',
+            f'/api/breeds/{breed_id}',
+        ]
+        db_name = connection.settings_dict['NAME']
+
+        print(f'{"mode":<7}{"path":<28}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for async_views in (False, True):
+            port = free_port()
+            process = start_server(port, async_views, db_name, args.workers)
+            try:
+                for path in paths:
+                    # Прогрев: кэш справочника пород и соединения с базой в воркерах.
+                    asyncio.run(run_load(port, path, args.concurrency, 1))
+                    latencies, errors = asyncio.run(run_load(port, path, args.concurrency, args.duration))
+                    mode = 'async' if async_views else 'sync'
+                    print(f'{mode:<7}{path:<28}{len(latencies) / args.duration:>10,.0f}'
+                          f'{percentile(latencies, 0.5) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}'
+                          f'{len(errors):>8}')
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == '__main__':
+    main()
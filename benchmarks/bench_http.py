@@ -0,0 +1,243 @@
+"""
+Нагрузочный прогон всех маршрутов API на наборах данных разного размера с отчётом в JSON.
+
+    python -m benchmarks.bench_http --dogs 1000 100000 1000000 --duration 5 --output bench_http.json
+    python -m benchmarks.bench_http --compare old.json new.json
+
+Для каждого размера временная тестовая база дополняется собаками до нужного числа (`seed_dogs`), и каждый
+сценарий из `CASES` выполняется в отдельном процессе: запросы идут через полный стек Django (middleware,
+маршрутизация, рендеринг) без сетевого сервера, по одному, в течение `--duration` секунд после прогрева.
+В отчёт попадают пропускная способность (запросов/с), задержки p50/p99, число SQL-запросов на один запрос
+и пиковый RSS процесса. Отдельный процесс на сценарий нужен, чтобы пиковый RSS относился к нему, а не
+к заполнению базы или предыдущим сценариям. Каждый маршрут из `apps/api/urls.py` должен быть покрыт хотя бы
+одним сценарием. Записывающие сценарии (POST, PATCH) выполняются последними; PUT и DELETE не прогоняются.
+
+Нужна база, доступная из другого процесса (PostgreSQL; SQLite в памяти не подходит). `--compare` печатает
+изменение показателей между двумя отчётами, например до и после коммита.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+# Сценарии: (имя маршрута, название, метод, путь, тело). В путях подставляются `dog_id` и `breed_id`.
+CASES = [
+    ('dog-list', 'page', 'GET', '/api/dogs/?limit=20', None),
+    ('dog-list', 'page-1000', 'GET', '/api/dogs/?limit=1000', None),
+    ('dog-list', 'filter', 'GET', '/api/dogs/?breed_id={breed_id}&age__gte=3&age__lte=8&limit=20', None),
+    ('dog-list', 'ordering', 'GET', '/api/dogs/?ordering=-age,name&limit=20', None),
+    ('dog-list', 'fields', 'GET', '/api/dogs/?fields=id,name,breed.name&limit=100', None),
+    ('dog-list', 'search', 'GET', '/api/dogs/?q=Шар', None),
+    ('dog-list', 'stream', 'GET', '/api/dogs/?stream=1&breed_id={breed_id}', None),
+    ('dog-detail', 'get', 'GET', '/api/dogs/{dog_id}', None),
+    ('breed-list', 'page', 'GET', '/api/breeds/?limit=100', None),
+    ('breed-detail', 'get', 'GET', '/api/breeds/{breed_id}', None),
+    ('breed-stats', 'get', 'GET', '/api/breeds/stats/', None),
+    ('response-cache-stats', 'get', 'GET', '/api/cache/stats/', None),
+    ('dog-detail', 'patch', 'PATCH', '/api/dogs/{dog_id}', {'age': 5}),
+    ('breed-detail', 'patch', 'PATCH', '/api/breeds/{breed_id}', {'exercise_needs': 3}),
+    ('dog-list', 'create', 'POST', '/api/dogs/',
+     {'name': 'Bench', 'age': 3, 'gender': 'Male', 'color': 'Brown', 'favorite_food': 'Meat',
+      'favorite_toy': 'Ball', 'breed_id': '{breed_id}'}),
+]
+
+METRICS = ('throughput', 'p50_ms', 'p99_ms', 'queries', 'peak_rss_mb')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else None
+
+
+def peak_rss_mb():
+    # На Linux ru_maxrss в килобайтах, на macOS — в байтах.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        value = value.format(**ids)
+        return int(value) if value.isdigit() else value
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    return value
+
+
+def check_coverage():
+    """
+    Проверяет, что у каждого маршрута API есть сценарий.
+    """
+    from apps.api.urls import urlpatterns
+
+    missing = {pattern.name for pattern in urlpatterns} - {case[0] for case in CASES}
+    if missing:
+        raise SystemExit(f'Нет сценариев для маршрутов: {", ".join(sorted(missing))}')
+
+
+def send(client, method, path, body):
+    response = client.generic(method, path, json.dumps(body) if body is not None else '',
+                              content_type='application/json', HTTP_ACCEPT='application/json')
+    if response.streaming:
+        b''.join(response.streaming_content)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {path}: {response.status_code} {response.content[:200]!r}')
+    return response
+
+
+def run_case(case, duration):
+    """
+    Выполняется в отдельном процессе: прогрев, замер задержек в течение `duration` секунд
+    и подсчёт SQL-запросов одного запроса. Печатает результат в JSON.
+    """
+    setup()
+    from contextlib import ExitStack
+
+    from django.db import connections
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    method, path, body = case['method'], case['path'], case['body']
+    client = Client(HTTP_HOST='localhost')
+    for _ in range(3):
+        send(client, method, path, body)
+
+    with ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        send(client, method, path, body)
+    queries = sum(len(context.captured_queries) for context in captured)
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        request_started = time.perf_counter()
+        send(client, method, path, body)
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries': queries,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def spawn_case(case, duration, db_name):
+    env = dict(os.environ, DB_NAME=db_name)
+    command = [sys.executable, '-m', 'benchmarks.bench_http', '--run-case', json.dumps(case),
+               '--duration', str(duration)]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    setup()
+    import django
+    from django.db import connection
+
+    from apps.api.models import Breed, Dog
+    from apps.api.seed import seed_dogs
+
+    check_coverage()
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'duration': args.duration,
+        'results': [],
+    }
+    print(f'{"dogs":>9}  {"case":<34}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"queries":>9}{"RSS MB":>9}')
+    with test_database():
+        db_name = connection.settings_dict['NAME']
+        seeded = 0
+        for size in sorted(args.dogs):
+            seed_dogs(max(size - seeded, 0), args.breeds if not seeded else 0, seed=size)
+            # Собака и порода из середины таблицы: у первых ID нетипично короткие пути в индексах.
+            ids = {
+                'dog_id': Dog.objects.order_by('pk').values_list('pk', flat=True)[size // 2],
+                'breed_id': Breed.objects.order_by('-dog_count').values_list('pk', flat=True)[args.breeds // 2],
+            }
+            for name, label, method, path, body in CASES:
+                case = {'method': method, 'path': path.format(**ids), 'body': fill(body, ids)}
+                result = {'dogs': size, 'route': name, 'case': label, 'method': method, 'path': case['path'],
+                          **spawn_case(case, args.duration, db_name)}
+                report['results'].append(result)
+                print(f'{size:>9}  {f"{name} {label}":<34}{result["throughput"]:>10,.0f}{result["p50_ms"]:>10.2f}'
+                      f'{result["p99_ms"]:>10.2f}{result["queries"]:>9}{result["peak_rss_mb"]:>9.1f}')
+            # Записывающие сценарии добавили строки: следующий размер дополняется от фактического числа.
+            seeded = Dog.objects.count()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'Отчёт: {args.output}')
+
+
+def result_key(result):
+    return result['dogs'], result['route'], result['case']
+
+
+def compare(old_path, new_path):
+    """
+    Печатает изменение показателей для сценариев, которые есть в обоих отчётах.
+    """
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    old_results = {result_key(result): result for result in old['results']}
+    print(f'{old.get("commit")} -> {new.get("commit")}')
+    print(f'{"dogs":>9}  {"case":<34}' + ''.join(f'{metric:>14}' for metric in METRICS))
+    for result in new['results']:
+        before = old_results.get(result_key(result))
+        if before is None:
+            continue
+        changes = []
+        for metric in METRICS:
+            if before[metric]:
+                changes.append(f'{(result[metric] - before[metric]) / before[metric]:>+14.1%}')
+            else:
+                changes.append(f'{result[metric] - before[metric]:>+14}')
+        print(f'{result["dogs"]:>9}  {result["route"] + " " + result["case"]:<34}' + ''.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dogs', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--breeds', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=5, help='Секунд замера на сценарий')
+    parser.add_argument('--output', default='bench_http.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case(json.loads(args.run_case), args.duration)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
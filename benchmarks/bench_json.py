@@ -0,0 +1,80 @@
+"""
+Сравнение стандартных JSONRenderer/JSONParser и FastJSONRenderer/FastJSONParser на данных собак.
+
+    python -m benchmarks.bench_json --dogs 1000 10000 --repeat 5
+
+Рендеринг — страница списка собак с вложенной породой, как её отдаёт `GET /api/dogs/`; разбор — тело
+массового создания собак. База не нужна: данные собираются в памяти в том же виде, что выдаёт DogSerializer.
+"""
+import argparse
+import io
+
+from benchmarks import measure, setup
+
+COLORS = ('Black', 'White', 'Brown', 'Золотистый')
+
+
+def make_breed(i):
+    return {'id': i, 'name': f'Breed {i}', 'size': 'TSML'[i % 4], 'friendliness': i % 5 + 1,
+            'trainability': (i + 1) % 5 + 1, 'shedding_amount': (i + 2) % 5 + 1, 'exercise_needs': (i + 3) % 5 + 1}
+
+
+def make_dogs(count, breeds=200):
+    breed_list = [make_breed(i) for i in range(1, breeds + 1)]
+    return [
+        {'id': i, 'name': f'Dog {i}', 'age': i % 16, 'gender': ('Male', 'Female')[i % 2], 'color': COLORS[i % 4],
+         'favorite_food': 'Chicken', 'favorite_toy': 'Ball', 'breed': breed_list[i % breeds],
+         'breed_id': breed_list[i % breeds]['id']}
+        for i in range(1, count + 1)
+    ]
+
+
+def make_bulk_body(renderer, dogs):
+    return renderer.render([{key: value for key, value in dog.items() if key not in ('id', 'breed')} for dog in dogs])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dogs', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.api import renderers
+    from apps.api.parsers import FastJSONParser
+    from apps.api.renderers import FastJSONRenderer
+
+    if renderers.orjson is None:
+        print('orjson не установлен: быстрые классы работают как стандартные (pip install orjson).')
+
+    stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    stock_parser, fast_parser = JSONParser(), FastJSONParser()
+    context = {'encoding': 'utf-8'}
+
+    print(f'{"case":<8}{"dogs":>8}{"bytes":>12}{"stock MB/s":>12}{"fast MB/s":>12}{"speedup":>10}')
+    for count in args.dogs:
+        dogs = make_dogs(count)
+        body = make_bulk_body(stock_renderer, dogs)
+        rendered = stock_renderer.render(dogs)
+        assert fast_renderer.render(dogs) == rendered, 'результаты рендеринга различаются'
+        assert fast_parser.parse(io.BytesIO(body), None, context) == stock_parser.parse(io.BytesIO(body), None, context)
+
+        cases = [
+            ('render', len(rendered), lambda: stock_renderer.render(dogs), lambda: fast_renderer.render(dogs)),
+            ('parse', len(body),
+             lambda: stock_parser.parse(io.BytesIO(body), None, context),
+             lambda: fast_parser.parse(io.BytesIO(body), None, context)),
+        ]
+        for name, size, stock_path, fast_path in cases:
+            stock = measure(stock_path, args.repeat)
+            fast = measure(fast_path, args.repeat)
+            megabytes = size / 1e6
+            print(f'{name:<8}{count:>8}{size:>12,}{megabytes / stock:>12,.1f}{megabytes / fast:>12,.1f}'
+                  f'{stock / fast:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
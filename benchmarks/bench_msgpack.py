@@ -0,0 +1,51 @@
+"""
+Размер и скорость кодирования и разбора списков собак в JSON и MessagePack.
+
+    python -m benchmarks.bench_msgpack --dogs 10000 --repeat 5
+
+Кодирование — рендерерами API (JSONRenderer, FastJSONRenderer, MessagePackRenderer), разбор —
+парсерами API. Данные — список собак с вложенной породой, как в ответе `GET /api/dogs/`. База не нужна.
+"""
+import argparse
+import io
+
+from benchmarks import measure, setup
+from benchmarks.bench_json import make_dogs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dogs', type=int, nargs='+', default=[10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.api.parsers import FastJSONParser, MessagePackParser
+    from apps.api.renderers import FastJSONRenderer, MessagePackRenderer
+
+    formats = [
+        ('json', JSONRenderer(), JSONParser()),
+        ('json-fast', FastJSONRenderer(), FastJSONParser()),
+        ('msgpack', MessagePackRenderer(), MessagePackParser()),
+    ]
+    context = {'encoding': 'utf-8'}
+
+    print(f'{"format":<11}{"dogs":>8}{"bytes":>12}{"size":>8}{"encode ms":>11}{"decode ms":>11}')
+    for count in args.dogs:
+        dogs = make_dogs(count)
+        baseline = None
+        for name, renderer, body_parser in formats:
+            body = renderer.render(dogs)
+            assert body_parser.parse(io.BytesIO(body), None, context) == dogs, f'{name}: данные различаются'
+            baseline = baseline or len(body)
+            encode = measure(lambda: renderer.render(dogs), args.repeat)
+            decode = measure(lambda: body_parser.parse(io.BytesIO(body), None, context), args.repeat)
+            print(f'{name:<11}{count:>8}{len(body):>12,}{len(body) / baseline:>8.0%}'
+                  f'{encode * 1000:>11.1f}{decode * 1000:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
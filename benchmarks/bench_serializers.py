@@ -0,0 +1,45 @@
+"""
+Сравнение скорости DogSerializer/BreedSerializer и быстрого read-only представления.
+
+    python -m benchmarks.bench_serializers --dogs 20000 --breeds 200
+"""
+import argparse
+
+from benchmarks import make_dataset, measure, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dogs', type=int, default=20000)
+    parser.add_argument('--breeds', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.api.models import Breed, Dog
+    from apps.api.representations import breed_representation, dog_representation
+    from apps.api.serializers import BreedSerializer, DogSerializer
+
+    renderer = JSONRenderer()
+    with test_database():
+        make_dataset(args.dogs, args.breeds)
+        cases = [
+            ('dogs', args.dogs,
+             lambda: renderer.render(DogSerializer(Dog.objects.select_related('breed'), many=True).data),
+             lambda: renderer.render(dog_representation.many(dog_representation.values(Dog.objects.all())))),
+            ('breeds', args.breeds,
+             lambda: renderer.render(BreedSerializer(Breed.objects.all(), many=True).data),
+             lambda: renderer.render(breed_representation.many(breed_representation.values(Breed.objects.all())))),
+        ]
+        print(f'{"case":<8}{"rows":>10}{"serializer rows/s":>20}{"fast rows/s":>15}{"speedup":>10}')
+        for name, rows, serializer_path, fast_path in cases:
+            assert serializer_path() == fast_path(), f'{name}: представления различаются'
+            slow = measure(serializer_path, args.repeat)
+            fast = measure(fast_path, args.repeat)
+            print(f'{name:<8}{rows:>10}{rows / slow:>20,.0f}{rows / fast:>15,.0f}{slow / fast:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
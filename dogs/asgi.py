@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dogs.settings')
+# Синхронный код каждого запроса выполняется в отдельном потоке, а постоянное соединение привязано к потоку:
+# оно не переиспользовалось бы и оставалось открытым. Поэтому под ASGI постоянных соединений нет, и соединения
+# между запросами переиспользует только пул (DB_POOL, включён по умолчанию).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import copy
 from pathlib import Path
-from decouple import config
+
+from decouple import Choices, Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,8 +42,13 @@ INSTALLED_APPS = [
     'apps.api.apps.ApiConfig',
 ]
 
+# Метрики Prometheus (GET /metrics). При нескольких процессах-воркерах задайте PROMETHEUS_MULTIPROC_DIR (см. README)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.api.middleware.MetricsMiddleware',
+    'apps.api.middleware.QueryBudgetMiddleware',
+    'apps.api.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,17 +78,164 @@ TEMPLATES = [
 WSGI_APPLICATION = 'dogs.wsgi.application'
 
 # Database
-# https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'django.db.backends.postgresql',
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    }
+}
+
+# Пул соединений psycopg 3 на процесс: минимальный и максимальный размер пула, время жизни соединения
+# и ожидание свободного соединения в секундах. С DB_CONN_HEALTH_CHECKS Django передаёт пулу проверку
+# ConnectionPool.check_connection: соединение проверяется перед выдачей, разорванное заменяется новым.
+# Без пула (DB_POOL=False) соединение переиспользуется запросами одного потока DB_CONN_MAX_AGE секунд;
+# под ASGI (dogs/asgi.py) каждый запрос идёт в своём потоке, поэтому там постоянные соединения выключены
+# и соединения между запросами переиспользует только пул
+
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+
+if DB_POOL:
+    # Пул сам держит соединения открытыми; Django не допускает пул вместе с постоянными соединениями.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=600, cast=float),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        },
+    }
+
+# Реплики для чтения: через запятую host[:port][/name] (порт, имя базы и учётные данные, если не указаны, —
+# как у основной базы), их веса при выборе (по умолчанию равные) и сколько секунд после записи клиент читает
+# с основной базы. Запись, запросы на изменение и чтения после записи идут на основную базу, см. ReplicaRouter
+
+DB_REPLICAS = config('DB_REPLICAS', default='', cast=Csv())
+DB_REPLICA_WEIGHTS = config('DB_REPLICA_WEIGHTS', default='', cast=Csv(int))
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+DATABASE_REPLICAS = {}
+for index, replica in enumerate(DB_REPLICAS, 1):
+    address, _, name = replica.partition('/')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica{index}'] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS[f'replica{index}'] = DB_REPLICA_WEIGHTS[index - 1] if index <= len(DB_REPLICA_WEIGHTS) else 1
+
+DATABASE_ROUTERS = ['apps.api.routers.ReplicaRouter']
+
+# REST framework
+# JSON рендерится и разбирается через orjson, если он установлен (pip install orjson),
+# иначе — стандартными JSONRenderer и JSONParser; результат одинаковый.
+# MessagePack (application/msgpack) — в запросах и ответах для внутренних сервисов
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.api.renderers.FastJSONRenderer',
+        'apps.api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.api.parsers.FastJSONParser',
+        'apps.api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'EXCEPTION_HANDLER': 'apps.api.exceptions.exception_handler',
+}
+
+# Pagination
+# Размер страницы списков по умолчанию и верхняя граница для параметра ?limit=
+
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=100, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=1000, cast=int)
+
+# Количество строк, читаемых из курсора за раз при потоковой выдаче (?stream=1)
+
+API_STREAM_CHUNK_SIZE = config('API_STREAM_CHUNK_SIZE', default=2000, cast=int)
+
+# Массовые операции: размер пачки INSERT/UPDATE по умолчанию, верхняя граница ?batch_size=
+# и максимальное число элементов в одном запросе
+
+API_BULK_BATCH_SIZE = config('API_BULK_BATCH_SIZE', default=500, cast=int)
+API_BULK_MAX_BATCH_SIZE = config('API_BULK_MAX_BATCH_SIZE', default=5000, cast=int)
+API_BULK_MAX_ITEMS = config('API_BULK_MAX_ITEMS', default=10000, cast=int)
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Алиас общего кэша для версии справочника пород; пустое значение — кэш только в памяти процесса: воркер
+# не узнаёт об изменениях пород в других воркерах, и запись собаки в удалённую там породу получает 400
+
+API_BREED_CACHE_ALIAS = config('API_BREED_CACHE_ALIAS', default='')
+
+# Общий кэш отрисованных GET-ответов API: алиас кэша (пустое значение — кэш ответов выключен)
+# и время жизни ответа в секундах; ответы сбрасываются сигналами при записи собак и пород
+
+API_RESPONSE_CACHE_ALIAS = config('API_RESPONSE_CACHE_ALIAS', default='')
+API_RESPONSE_CACHE_TIMEOUT = config('API_RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Поиск ?q= по именам собак и названиям пород: число результатов по умолчанию, верхняя граница ?limit=
+# и использование индексов pg_trgm на PostgreSQL (миграция 0006 создаёт расширение и индексы)
+
+API_SEARCH_RESULTS = config('API_SEARCH_RESULTS', default=20, cast=int)
+API_SEARCH_MAX_RESULTS = config('API_SEARCH_MAX_RESULTS', default=100, cast=int)
+API_SEARCH_TRIGRAM = config('API_SEARCH_TRIGRAM', default=True, cast=bool)
+
+# Асинхронные контроллеры API; включать при запуске под ASGI (dogs.asgi:application)
+
+API_ASYNC_VIEWS = config('API_ASYNC_VIEWS', default=False, cast=bool)
+
+# Бюджеты SQL-запросов на запрос API: {имя маршрута: {метод: число запросов}}. QueryBudgetMiddleware
+# при превышении пишет предупреждение (warn), отвечает ошибкой (raise) или ничего не делает (off).
+# Бюджеты рассчитаны на холодный справочник пород и переход собаки в другую породу и учитывают точки
+# сохранения транзакций; тесты проверяют их на данных разного размера.
+# У массовых операций над /api/dogs/ бюджета нет: число запросов растёт с числом пачек
+
+API_QUERY_BUDGET_ACTION = config('API_QUERY_BUDGET_ACTION', default='warn', cast=Choices(['off', 'warn', 'raise']))
+API_QUERY_BUDGETS = {
+    'dog-list': {'GET': 2},
+    'dog-detail': {'GET': 2, 'PUT': 7, 'PATCH': 7, 'DELETE': 6},
+    'breed-list': {'GET': 2, 'POST': 1},
+    'breed-detail': {'GET': 2, 'PUT': 5, 'PATCH': 1, 'DELETE': 6},
+    'breed-stats': {'GET': 2},
+    'response-cache-stats': {'GET': 0},
+}
+
+# Журнал запросов API (apps.api.query_budget): показатели каждого запроса на уровне INFO,
+# превышения бюджета — WARNING
+
+API_QUERY_LOG_LEVEL = config('API_QUERY_LOG_LEVEL', default='WARNING')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'apps.api.query_budget': {'handlers': ['console'], 'level': API_QUERY_LOG_LEVEL},
+    },
 }
 
 # Password validation
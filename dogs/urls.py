@@ -14,10 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from apps.api.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('apps.api.urls'))
+    path('metrics', metrics_view, name='metrics'),
+    path('', include('apps.api.async_urls' if settings.API_ASYNC_VIEWS else 'apps.api.urls'))
 ]